@@ -1,8 +1,14 @@
-from typing import List, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+import asyncio
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from app.core.config import settings
 from app.core.llm import LLMClient
+from app.core.resilience import CircuitOpenError
+from app.core.briefings import briefing_fingerprint, cached_briefings, store_briefing
+from app.core.telemetry import record_fallback
 from app.models.employee import EmployeeProfile, Skill
 from app.models.project import Project
+from app.core.health import WEEKLY_CAPACITY_HOURS
 
 class EmployeeMatch(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -13,26 +19,53 @@ class EmployeeMatch(BaseModel):
     match_score: float = Field(description="Match score from 0-20")
     matched_skills: List[str] = Field(description="Skills that matched project requirements")
     suggested_task: str = Field(description="Specific project task title assigned to this person")
-    suggested_description: str = Field(description="Personalized, detailed implementation briefing for this specific task")
+    suggested_description: str = Field(default="", description="Personalized, detailed implementation briefing for this specific task")
     suggested_deadline: str = Field(description="Deadline for this task (e.g. '3 days', 'Next Friday')")
     suggested_hours: float = Field(default=8.0, description="Estimated hours left/required for this task")
     reasoning: str = Field(description="Explanation of why this employee's skills make them perfect for this SPECIFIC task")
 
+class BenchMatch(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    
+    """Compact score line for a qualified candidate outside the core team"""
+    employee_id: str = Field(description="Employee profile ID")
+    match_score: float = Field(description="Match score from 0-20")
+    matched_skills: List[str] = Field(default=[], description="Skills that matched project requirements")
+
 class MatchResponse(BaseModel):
     model_config = ConfigDict(extra='ignore')
     
     """Schema for a single matching response"""
     matches: List[EmployeeMatch] = Field(description="List of matched employees, sorted by score")
+    bench: List[BenchMatch] = Field(default=[], description="Compact mode: qualified candidates outside the core team")
     total_candidates: int = Field(description="Total number of candidates evaluated")
 
+    @model_validator(mode="before")
+    @classmethod
+    def _count_from_entries(cls, data: Any) -> Any:
+        # A response cut off by the token limit loses the trailing count: count the entries kept
+        if isinstance(data, dict) and "total_candidates" not in data:
+            data = {**data, "total_candidates": len(data.get("matches") or []) + len(data.get("bench") or [])}
+        return data
+
 class MatcherAgent:
     """
     AI Agent responsible for matching employees to projects.
     Uses LLM to analyze project requirements and employee profiles to find optimal matches.
+    
+    MATCH_PIPELINE=two_stage splits the work: a scoring pass (an LLM call without briefings,
+    optionally on MATCH_SCORING_MODEL, or the deterministic keyword scorer) picks the core
+    team and their tasks, then each assignee's briefing is written by its own small call,
+    in parallel, and cached per (task, skills) fingerprint for later re-matches.
     """
     
     def __init__(self):
-        self.llm = LLMClient()
+        self.llm = LLMClient(agent="matcher")
+        if settings.MATCH_PIPELINE == "two_stage" and settings.MATCH_SCORING_MODEL:
+            self.scoring_llm = LLMClient(agent="matcher", model=settings.MATCH_SCORING_MODEL)
+        else:
+            self.scoring_llm = self.llm
+        self.briefing_llm = LLMClient(agent="briefing")
 
     @staticmethod
     def _get_val(obj, key, default=None):
@@ -47,7 +80,8 @@ class MatcherAgent:
         self,
         project: Project,
         candidates: List[Dict[str, Any]],
-        tasks: List[Dict[str, Any]] = None
+        tasks: List[Dict[str, Any]] = None,
+        use_llm: bool = True
     ) -> Dict[str, Any]:
         """
         Match employees to a project based on skills and requirements.
@@ -55,14 +89,12 @@ class MatcherAgent:
         Args:
             project: Project document with requirements
             candidates: List of employee profiles with skills
+            use_llm: False skips the model and returns the keyword fallback (degraded mode)
         
         Returns:
             Dictionary containing matched employees with scores and reasoning
         """
         
-        # Format project requirements
-        required_skills = [f"{skill.skill_name} ({skill.level})" for skill in project.required_skills]
-        
         # Format candidate profiles
         candidate_summaries = []
         for candidate in candidates:
@@ -80,15 +112,106 @@ class MatcherAgent:
             name = self._get_val(profile, 'full_name', 'Unknown')
             spec = self._get_val(profile, 'specialization', 'Unassigned')
             
+            workload = candidate.get('workload') or {}
+            
             candidate_summaries.append({
                 'id': p_id,
                 'name': name,
                 'specialization': spec,
-                'skills': skill_list
+                'skills': skill_list,
+                'active_tasks': workload.get('active_tasks', 0),
+                'open_hours': workload.get('open_hours', 0.0)
             })
         
+        if settings.MATCH_PIPELINE == "two_stage":
+            return await self._match_two_stage(project, candidate_summaries, tasks, use_llm)
+        
+        if not use_llm:
+            record_fallback("matcher", "degraded")
+            return self._fallback_match(project, candidate_summaries, tasks)
+        
+        compact = settings.MATCH_RESPONSE_MODE == "compact"
+        prompt = self._match_prompt(project, candidate_summaries, tasks, compact)
+        
+        try:
+            # Generate structured response
+            result = await self.llm.generate_structured(
+                prompt=prompt,
+                response_schema=MatchResponse,
+                temperature=0.3 # Lower temperature for better constraint following
+            )
+            if compact:
+                return self._expand_compact(result, candidate_summaries)
+            return result
+        except Exception as e:
+            record_fallback("matcher", "circuit_open" if isinstance(e, CircuitOpenError) else "llm_error")
+            return self._fallback_match(project, candidate_summaries, tasks)
+
+    def _match_prompt(
+        self,
+        project: Project,
+        candidate_summaries: List[Dict[str, Any]],
+        tasks: List[Dict[str, Any]],
+        compact: bool,
+        briefings: bool = True
+    ) -> str:
+        """The matching prompt; `briefings=False` is the two-stage scoring pass (no suggested_description)"""
+        required_skills = [f"{skill.skill_name} ({skill.level})" for skill in project.required_skills]
+        if briefings:
+            briefing_rule = "   - **Personalized Briefing**: Create a `suggested_description` that is a rich, technical, and unique implementation guide for that specific task."
+            briefing_example = "Custom technical briefing for this employee and task"
+        else:
+            briefing_rule = "   - **No Briefings**: Leave `suggested_description` empty; briefings are written separately."
+            briefing_example = ""
+        
+        if compact:
+            # Output tokens dominate latency: only the core team gets full briefings
+            others_rule = (
+                "   - Do NOT write briefings for anyone outside the Core Team. List other candidates with a score > 0 "
+                "only in `bench` as a compact score line, and leave score-0 candidates out of the response entirely."
+            )
+            response_format = f"""Return `matches` for the Core Team ONLY. Return your response in the following JSON format:
+{{
+    "matches": [
+        {{
+            "employee_id": "candidate_id",
+            "employee_name": "Full Name",
+            "match_score": 18.5,
+            "matched_skills": ["skill1", "skill2"],
+            "suggested_task": "The specific task title from the pool",
+            "suggested_description": "{briefing_example}",
+            "suggested_deadline": "Realistic deadline",
+            "suggested_hours": 8.0,
+            "reasoning": "Why this specific match works"
+        }}
+    ],
+    "bench": [
+        {{"employee_id": "candidate_id", "match_score": 9.0, "matched_skills": ["skill1"]}}
+    ],
+    "total_candidates": {len(candidate_summaries)}
+}}"""
+        else:
+            others_rule = '   - For others (score 0), assign "Backup Support" or "General Integration" with 0 hours.'
+            response_format = f"""Return ALL candidates. Return your response in the following JSON format:
+{{
+    "matches": [
+        {{
+            "employee_id": "candidate_id",
+            "employee_name": "Full Name",
+            "match_score": 18.5,
+            "matched_skills": ["skill1", "skill2"],
+            "suggested_task": "The specific task title from the pool",
+            "suggested_description": "Custom technical briefing for this employee and task",
+            "suggested_deadline": "Realistic deadline",
+            "suggested_hours": 8.0,
+            "reasoning": "Why this specific match works"
+        }}
+    ],
+    "total_candidates": {len(candidate_summaries)}
+}}"""
+        
         # Construct the matching prompt
-        prompt = f"""You are an expert technical recruiter matching employees to projects.
+        return f"""You are an expert technical recruiter matching employees to projects.
 
 Project Requirements:
 - Title: {project.title}
@@ -114,40 +237,212 @@ Your task is to:
    - For the top {project.team_size} candidates (the Core Team), assign specific, distinct, and unique tasks from the Task Pool list.
    - **CRITICAL: ONE TASK PER PERSON**: Every Core Team member MUST be assigned a completely different task name from the pool. 
    - Ensure the Core Team covers the variety of Frontend UI, Backend Logic, Database, and Auth/Login if those exist in the pool.
-   - **Personalized Briefing**: Create a `suggested_description` that is a rich, technical, and unique implementation guide for that specific task.
+{briefing_rule}
    - **Deadlines**: Use the `deadline` provided in the Task Pool for the assigned task.
    - **Neural Load**: Assign the exact `estimated_hours` from the Task Pool as `suggested_hours`.
-   - For others (score 0), assign "Backup Support" or "General Integration" with 0 hours.
+{others_rule}
 5. **Zero Score Rule**: If a candidate has NO matching skills, score MUST be 0.
+6. **Capacity**: Each candidate's current load across ALL projects is listed. Between candidates of similar fit, prefer the one with fewer open hours; avoid putting anyone above {WEEKLY_CAPACITY_HOURS} open hours on the Core Team unless no one else has the skill.
+
+{response_format}"""
+
+    async def _match_two_stage(
+        self,
+        project: Project,
+        summaries: List[Dict[str, Any]],
+        tasks: List[Dict[str, Any]],
+        use_llm: bool
+    ) -> Dict[str, Any]:
+        """Score and assign (compact result), brief the core team, then expand to every candidate"""
+        if not use_llm:
+            record_fallback("matcher", "degraded")
+            result = self._score_keyword(project, summaries, tasks)
+        elif settings.MATCH_SCORING == "keyword":
+            result = self._score_keyword(project, summaries, tasks)
+        else:
+            try:
+                result = await self.scoring_llm.generate_structured(
+                    prompt=self._match_prompt(project, summaries, tasks, compact=True, briefings=False),
+                    response_schema=MatchResponse,
+                    temperature=0.3
+                )
+            except Exception as e:
+                circuit_open = isinstance(e, CircuitOpenError)
+                record_fallback("matcher", "circuit_open" if circuit_open else "llm_error")
+                result = self._score_keyword(project, summaries, tasks)
+                # The briefing calls would go to the same provider: cached briefings only
+                use_llm = not circuit_open
+
+        await self._attach_briefings(project, result["matches"], summaries, tasks, use_llm)
+        return self._expand_compact(result, summaries)
+
+    def _score_keyword(
+        self,
+        project: Project,
+        summaries: List[Dict[str, Any]],
+        tasks: List[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Deterministic scoring pass in the compact shape: the top team_size candidates with a
+        matching skill get distinct pool tasks (best required-skill overlap first), other
+        qualified candidates go to the bench.
+        """
+        required = [s.skill_name for s in project.required_skills]
+        scored = []
+        for cand in summaries:
+            cand_skills_str = " ".join(cand['skills']).lower()
+            matched = [req.title() for req in required if req.lower() in cand_skills_str]
+            scored.append((min(10.0 * len(matched), 20.0), cand, matched))
+        # Equal scores go to whoever has the least open work elsewhere
+        scored.sort(key=lambda row: (-row[0], row[1].get('open_hours', 0.0)))
+
+        pool = list(tasks or [])
+        core, bench = [], []
+        for score, cand, matched in scored:
+            if score <= 0:
+                break
+            if len(core) >= project.team_size:
+                bench.append({"employee_id": cand['id'], "match_score": score, "matched_skills": matched})
+                continue
+            task = self._pick_task(pool, cand)
+            core.append({
+                "employee_id": cand['id'],
+                "employee_name": cand['name'],
+                "match_score": score,
+                "matched_skills": matched,
+                "suggested_task": self._get_val(task, 'title', 'General Integration'),
+                "suggested_description": "",
+                "suggested_deadline": self._get_val(task, 'deadline') or "TBD",
+                "suggested_hours": float(self._get_val(task, 'estimated_hours', 8.0)),
+                "reasoning": f"Matched skills ({', '.join(matched)}) identified via keyword analysis."
+            })
+        return {"matches": core, "bench": bench, "total_candidates": len(summaries)}
+
+    def _pick_task(self, pool: List[Any], cand: Dict[str, Any]) -> Optional[Any]:
+        """Take the pool task whose required skills best overlap the candidate's (pool order on ties)"""
+        if not pool:
+            return None
+        cand_skills_str = " ".join(cand['skills']).lower()
+        overlap = [
+            sum(1 for skill in self._get_val(task, 'required_skills', []) if skill.lower() in cand_skills_str)
+            for task in pool
+        ]
+        return pool.pop(overlap.index(max(overlap)))
+
+    async def _attach_briefings(
+        self,
+        project: Project,
+        core: List[Dict[str, Any]],
+        summaries: List[Dict[str, Any]],
+        tasks: List[Dict[str, Any]],
+        use_llm: bool = True
+    ):
+        """
+        Fill `suggested_description` for the core team: from the briefing cache, else one
+        small LLM call per assignee (MATCH_BRIEFING_CONCURRENCY at a time). Without the LLM,
+        or if a call fails, the task's own description stands in and nothing is cached.
+        """
+        tasks_by_title = {str(self._get_val(t, 'title', '')).lower(): t for t in (tasks or [])}
+        skills_by_id = {c['id']: c['skills'] for c in summaries}
+
+        pending = []
+        for match in core:
+            planned = tasks_by_title.get(match["suggested_task"].lower())
+            task = {
+                "title": match["suggested_task"],
+                "description": self._get_val(planned, 'description', ''),
+                "required_skills": list(self._get_val(planned, 'required_skills', []) or [])
+            }
+            skills = skills_by_id.get(match["employee_id"], [])
+            pending.append((match, task, skills, briefing_fingerprint(project.title, project.description, task, skills)))
 
-Return ALL candidates. Return your response in the following JSON format:
-{{
-    "matches": [
-        {{
-            "employee_id": "candidate_id",
-            "employee_name": "Full Name",
-            "match_score": 18.5,
-            "matched_skills": ["skill1", "skill2"],
-            "suggested_task": "The specific task title from the pool",
-            "suggested_description": "Custom technical briefing for this employee and task",
-            "suggested_deadline": "Realistic deadline",
-            "suggested_hours": 8.0,
-            "reasoning": "Why this specific match works"
-        }}
-    ],
-    "total_candidates": {len(candidate_summaries)}
-}}"""
-        
         try:
-            # Generate structured response
-            result = await self.llm.generate_structured(
-                prompt=prompt,
-                response_schema=MatchResponse,
-                temperature=0.3 # Lower temperature for better constraint following
-            )
-            return result
+            cached = await cached_briefings([fingerprint for *_, fingerprint in pending])
         except Exception as e:
-            return self._fallback_match(project, candidate_summaries, tasks)
+            print(f"Warning: Briefing cache lookup failed: {e}")
+            cached = {}
+
+        slots = asyncio.Semaphore(max(1, settings.MATCH_BRIEFING_CONCURRENCY))
+
+        async def brief(match, task, skills, fingerprint):
+            if fingerprint in cached:
+                match["suggested_description"] = cached[fingerprint]
+                return
+            if use_llm:
+                try:
+                    async with slots:
+                        text = (await self.briefing_llm.generate_text(
+                            self._briefing_prompt(project, task, skills), temperature=0.4
+                        )).strip()
+                except Exception as e:
+                    print(f"Warning: Briefing for '{task['title']}' failed: {e}")
+                    text = ""
+                if text:
+                    match["suggested_description"] = text
+                    try:
+                        await store_briefing(fingerprint, task["title"], text)
+                    except Exception as e:
+                        print(f"Warning: Briefing cache write failed: {e}")
+                    return
+            if not match.get("suggested_description"):
+                match["suggested_description"] = task["description"] or "Initial implementation of assigned module."
+
+        await asyncio.gather(*(brief(*item) for item in pending))
+
+    def _briefing_prompt(self, project: Project, task: Dict[str, Any], skills: List[str]) -> str:
+        # No names: the briefing is cached and reused for anyone with the same skills on this task
+        # of this project (briefing_fingerprint covers every input below)
+        return f"""You are a senior tech lead writing a task briefing for one engineer on the project "{project.title}".
+
+Project Description: {project.description}
+
+Task: {task['title']}
+Task Description: {task['description'] or 'Not specified'}
+Task Required Skills: {', '.join(task['required_skills']) or 'Not specified'}
+
+Engineer's Skills: {', '.join(skills) or 'No skills listed'}
+
+Write a rich, technical implementation briefing for this engineer and task in 4-6 sentences: what to build,
+the concrete steps, pitfalls to watch for, and how their skills apply (or what to pick up first where they are missing).
+Address the engineer as "you". Plain text only, no headings or markdown."""
+
+    def _expand_compact(self, result: Dict[str, Any], summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Rebuild the full response shape from a compact one: bench lines and omitted candidates
+        become score rows with placeholder task fields, so callers see every candidate as before.
+        """
+        names = {c['id']: c['name'] for c in summaries}
+        matches = list(result.get("matches", []))
+        seen = {m["employee_id"] for m in matches}
+        for bench in result.get("bench", []):
+            if bench["employee_id"] in seen or bench["employee_id"] not in names:
+                continue
+            seen.add(bench["employee_id"])
+            matches.append({
+                "employee_id": bench["employee_id"],
+                "employee_name": names[bench["employee_id"]],
+                "match_score": bench["match_score"],
+                "matched_skills": bench["matched_skills"],
+                "suggested_task": "Backup Support",
+                "suggested_description": "",
+                "suggested_deadline": "TBD",
+                "suggested_hours": 0.0,
+                "reasoning": "Qualified, but not selected for the core team."
+            })
+        for cand in summaries:
+            if cand['id'] not in seen:
+                matches.append({
+                    "employee_id": cand['id'],
+                    "employee_name": cand['name'],
+                    "match_score": 0.0,
+                    "matched_skills": [],
+                    "suggested_task": "Backup Support",
+                    "suggested_description": "",
+                    "suggested_deadline": "TBD",
+                    "suggested_hours": 0.0,
+                    "reasoning": "No matching skills found."
+                })
+        return {"matches": matches, "total_candidates": len(summaries)}
 
     def _fallback_match(
         self,
@@ -189,7 +484,9 @@ Return ALL candidates. Return your response in the following JSON format:
                 "reasoning": f"Matched skills ({', '.join(matched_skills)}) identified via keyword analysis." if score > 0 else "No matching skills found."
             })
         
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
+        # Equal scores go to whoever has the least open work elsewhere
+        load_by_id = {cand['id']: cand.get('open_hours', 0.0) for cand in summaries}
+        matches.sort(key=lambda x: (-x['match_score'], load_by_id.get(x['employee_id'], 0.0)))
         return {
             "matches": matches[:10],
             "total_candidates": len(summaries)
@@ -202,7 +499,8 @@ Return ALL candidates. Return your response in the following JSON format:
             formatted.append(
                 f"{i}. {candidate['name']} (ID: {candidate['id']})\n"
                 f"   Specialization: {candidate['specialization']}\n"
-                f"   Skills: {skills_str}"
+                f"   Skills: {skills_str}\n"
+                f"   Current Load: {candidate.get('active_tasks', 0)} active tasks, {candidate.get('open_hours', 0.0):g} open hours"
             )
         return '\n\n'.join(formatted)
 
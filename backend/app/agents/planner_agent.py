@@ -1,5 +1,5 @@
 from typing import List, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from app.core.llm import LLMClient
 
 class GeneratedTask(BaseModel):
@@ -12,6 +12,7 @@ class GeneratedTask(BaseModel):
     required_skills: List[str] = Field(description="Skills required for this task")
     priority: str = Field(description="Priority level: high, medium, or low")
     deadline: str = Field(description="Relative deadline (e.g. 'Day 2', 'Week 1', 'After Feature X')")
+    depends_on: List[str] = Field(default=[], description="Titles of tasks that must be finished before this one can start")
 
 class PlanResponse(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -21,6 +22,36 @@ class PlanResponse(BaseModel):
     total_estimated_hours: float = Field(description="Total project hours")
     recommended_team_size: int = Field(description="Recommended team size")
 
+    @model_validator(mode="before")
+    @classmethod
+    def _total_from_tasks(cls, data: Any) -> Any:
+        # A response cut off by the token limit loses the trailing total: it is the sum of the tasks kept
+        if isinstance(data, dict) and "total_estimated_hours" not in data and isinstance(data.get("tasks"), list):
+            data = {**data, "total_estimated_hours": sum(
+                float(task.get("estimated_hours") or 0) for task in data["tasks"] if isinstance(task, dict)
+            )}
+        return data
+
+class ReplanTask(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    
+    """Schema for a remaining-scope task in an incremental replan"""
+    key: str = Field(default="", description="Key of the existing task this revises; empty for a new task")
+    title: str = Field(description="Task title")
+    description: str = Field(default="", description="New description; empty keeps the existing one")
+    estimated_hours: float = Field(description="Estimated hours still required")
+    required_skills: List[str] = Field(default=[], description="Skills required for this task")
+    priority: str = Field(default="medium", description="Priority level: critical, high, medium, or low")
+    deadline: str = Field(description="Relative deadline from now (e.g. 'Day 2')")
+    depends_on: List[str] = Field(default=[], description="Titles of tasks that must be finished before this one can start")
+
+class ReplanResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    
+    """Schema for an incremental replanning response (remaining scope only)"""
+    tasks: List[ReplanTask] = Field(description="Revised remaining tasks")
+    recommended_team_size: int = Field(default=0, description="Recommended team size")
+
 class PlannerAgent:
     """
     AI Agent responsible for breaking down projects into actionable tasks.
@@ -28,7 +59,7 @@ class PlannerAgent:
     """
     
     def __init__(self):
-        self.llm = LLMClient()
+        self.llm = LLMClient(agent="planner")
     
     async def plan(
         self, 
@@ -37,11 +68,22 @@ class PlannerAgent:
         required_skills: List[str],
         experience_required: float,
         days_remaining: int = 7,
-        is_overdue: bool = False
+        is_overdue: bool = False,
+        slippage_days: float = 0,
+        critical_path: List[str] = None
     ) -> Dict[str, Any]:
         """
         Generate a detailed project plan with technical tasks.
+        `slippage_days`/`critical_path` come from the current critical-path schedule and
+        steer a replan toward shortening the chain that is actually late.
         """
+        schedule_context = ""
+        if slippage_days > 0 and critical_path:
+            schedule_context = (
+                f"\nSchedule Risk: The current critical path finishes {slippage_days:g} days AFTER the deadline.\n"
+                f"Critical chain (in order): {' -> '.join(critical_path)}\n"
+                f"Shorten or parallelize this chain first.\n"
+            )
         
         # Construct the planning prompt
         if is_overdue:
@@ -51,7 +93,7 @@ Project: {project_title}
 Context: {project_description}
 Expertise Level: {experience_required} years
 Current Status: PROJECT IS OVERDUE (Original Deadline Missed).
-
+{schedule_context}
 Your goal is to create a RECOVERY PLAN to minimize damage and complete the project as fast as possible.
 
 CRITICAL RECOVERY RULES:
@@ -67,9 +109,11 @@ For each task, provide:
 4. Required Skills: Technologies needed.
 5. Priority: MUST be 'critical' or 'high'.
 6. Deadline: Relative from NOW (e.g. "Day 1 (Recovery)", "Day 3 (Recovery)").
+7. Depends On: Titles of the tasks (from your list) that must finish first. Empty if it can start immediately.
 
 Return ONLY a valid JSON object:
 {{
+    "recommended_team_size": 3,
     "tasks": [
         {{
             "title": "Critical Recovery Task",
@@ -77,11 +121,11 @@ Return ONLY a valid JSON object:
             "estimated_hours": 4.0,
             "required_skills": ["Python", "SQL"],
             "priority": "critical",
-            "deadline": "Day 1 (Recovery)"
+            "deadline": "Day 1 (Recovery)",
+            "depends_on": []
         }}
     ],
-    "total_estimated_hours": 40.0,
-    "recommended_team_size": 3
+    "total_estimated_hours": 40.0
 }}"""
         else:
             prompt = f"""You are an expert technical architect and project manager.
@@ -90,7 +134,7 @@ Project: {project_title}
 Context: {project_description}
 Expertise Level: {experience_required} years
 Project Duration: {days_remaining} days remaining until final deadline.
-
+{schedule_context}
 Your goal is to decompose this project into EXACTLY 10 technical tasks that follow a logical implementation sequence.
 
 CRITICAL LOGIC RULES:
@@ -118,9 +162,11 @@ For each task, provide:
 4. Required Skills: Specific technologies needed.
 5. Priority: Based on path-to-launch importance.
 6. Deadline: Relative timing in the project lifecycle (MUST be within Day 1 to Day {days_remaining}).
+7. Depends On: Exact titles of earlier tasks in your list that must finish before this one starts (e.g. deployment depends on the features it ships). Empty for tasks that can start immediately.
 
 Return ONLY a valid JSON object:
 {{
+    "recommended_team_size": 4,
     "tasks": [
         {{
             "title": "Specific Task Name",
@@ -128,11 +174,11 @@ Return ONLY a valid JSON object:
             "estimated_hours": 8.0,
             "required_skills": ["React", "FastAPI"],
             "priority": "high",
-            "deadline": "Day 2"
+            "deadline": "Day 2",
+            "depends_on": ["Title of a prerequisite task"]
         }}
     ],
-    "total_estimated_hours": 120.0,
-    "recommended_team_size": 4
+    "total_estimated_hours": 120.0
 }}"""
         
         try:
@@ -147,3 +193,88 @@ Return ONLY a valid JSON object:
             
         except Exception as e:
             raise RuntimeError(f"Planning failed: {str(e)}")
+
+    async def replan(
+        self,
+        project_title: str,
+        project_description: str,
+        experience_required: float,
+        fixed_tasks: List[Dict[str, Any]],
+        remaining_tasks: List[Dict[str, Any]],
+        days_remaining: int = 7,
+        is_overdue: bool = False,
+        slippage_days: float = 0,
+        critical_path: List[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Re-plan only the unfinished scope. Completed and in-progress work is passed as a
+        one-line-per-task summary and never regenerated; remaining tasks are sent with
+        their keys so the response can be merged back by identity, not by title.
+        """
+        done_lines = "\n".join(
+            f"- [{t['status']}] {t['title']}" for t in fixed_tasks
+        ) or "- (none)"
+        remaining_lines = "\n".join(
+            f"- key={t['key']} | {t['title']} | {t['estimated_hours']:g}h | {t['priority']} | "
+            f"{t.get('deadline') or 'TBD'} | skills: {', '.join(t.get('required_skills') or []) or '-'}"
+            + (f" | after: {', '.join(t['depends_on_titles'])}" if t.get('depends_on_titles') else "")
+            for t in remaining_tasks
+        ) or "- (none)"
+        
+        timeline = (
+            "PROJECT IS OVERDUE: produce an aggressive recovery schedule for the remaining scope."
+            if is_overdue else f"{days_remaining} days remain until the final deadline."
+        )
+        schedule_context = ""
+        if slippage_days > 0 and critical_path:
+            schedule_context = (
+                f"The critical path currently finishes {slippage_days:g} days late: "
+                f"{' -> '.join(critical_path)}. Shorten or parallelize it first.\n"
+            )
+        
+        prompt = f"""You are an expert technical project manager revising an in-flight plan.
+
+Project: {project_title}
+Context: {project_description}
+Expertise Level: {experience_required} years
+Timeline: {timeline}
+{schedule_context}
+Already done or underway (FIXED - do not return these):
+{done_lines}
+
+Remaining scope (key | title | hours | priority | deadline | skills | prerequisites):
+{remaining_lines}
+
+Revise ONLY the remaining scope:
+1. Keep a task by returning it with its `key`. Adjust hours, priority, deadline or prerequisites as needed.
+2. Leave `description` empty ("") for kept tasks unless the work itself changes.
+3. Add a missing task by returning it with an empty `key` and a full description.
+4. Drop a task that is no longer needed by leaving it out.
+5. Deadlines are relative from NOW ('Day 1', 'Day 3', ...) and MUST fit the timeline.
+6. `depends_on` lists exact titles of prerequisite tasks (fixed or remaining).
+
+Return ONLY a valid JSON object:
+{{
+    "tasks": [
+        {{
+            "key": "existing key or empty",
+            "title": "Task title",
+            "description": "",
+            "estimated_hours": 6.0,
+            "required_skills": ["React"],
+            "priority": "high",
+            "deadline": "Day 2",
+            "depends_on": []
+        }}
+    ],
+    "recommended_team_size": 3
+}}"""
+        
+        try:
+            return await self.llm.generate_structured(
+                prompt=prompt,
+                response_schema=ReplanResponse,
+                temperature=0.4
+            )
+        except Exception as e:
+            raise RuntimeError(f"Replanning failed: {str(e)}")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from app.models.user import User, UserRole
 from app.core.security import get_password_hash, verify_password, create_access_token, create_refresh_token
+from app.core.matching import bump_roster_version
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter()
@@ -46,6 +47,7 @@ async def signup(user_data: UserSignup):
         avatar_url=""
     )
     await profile.insert()
+    await bump_roster_version()
 
     # Generate tokens
     access_token = create_access_token(data={"user_id": str(user.id), "role": user.role})
@@ -6,6 +6,7 @@ from app.api.deps import get_current_user, RoleChecker
 from beanie import PydanticObjectId
 from beanie.operators import In
 from app.core.serialization import serialize_doc
+from app.core.matching import bump_roster_version
 from datetime import datetime
 
 router = APIRouter()
@@ -32,6 +33,7 @@ async def create_profile(
         avatar_url=profile_data.avatar_url
     )
     await profile.insert()
+    await bump_roster_version()
     return serialize_doc(profile)
 
 @router.put("/profile")
@@ -76,6 +78,9 @@ async def update_profile_and_skills(
         ]
         if new_skills:
             await Skill.insert_many(new_skills)
+    
+    # Persisted match runs were computed against the old profile/skills
+    await bump_roster_version()
             
     return {"status": "success", "message": "Profile and skills updated"}
 
@@ -92,6 +97,7 @@ async def get_my_profile(current_user: User = Depends(get_current_user)):
             avatar_url=""
         )
         await profile.insert()
+        await bump_roster_version()
     
     skills = await Skill.find(Skill.employee_id == profile.id).to_list()
     
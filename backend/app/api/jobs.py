@@ -0,0 +1,75 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.models.user import User, UserRole
+from app.models.job import Job, JobStatus
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.db.database import get_collection
+from beanie import PydanticObjectId
+from app.core.serialization import serialize_doc
+
+router = APIRouter()
+
+def _job_view(job: Job) -> dict:
+    return serialize_doc({
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    })
+
+async def _get_own_job(job_id: PydanticObjectId, current_user: User) -> Job:
+    job = await Job.get(job_id)
+    if not job or (current_user.role != UserRole.ADMIN and job.created_by != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/", response_model=List[dict])
+async def list_my_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Recent jobs submitted by the current user, newest first"""
+    criteria = [Job.created_by == current_user.id]
+    if status:
+        criteria.append(Job.status == status)
+    jobs = await Job.find(*criteria).sort(-Job.created_at).limit(limit).to_list()
+    return [_job_view(job) for job in jobs]
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job(
+    job_id: PydanticObjectId,
+    current_user: User = Depends(get_current_user)
+):
+    """Job status; `result` holds the endpoint's response body once the job succeeded"""
+    job = await _get_own_job(job_id, current_user)
+    return _job_view(job)
+
+@router.delete("/{job_id}")
+async def cancel_job(
+    job_id: PydanticObjectId,
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a job that no worker has picked up yet"""
+    job = await _get_own_job(job_id, current_user)
+    now = datetime.utcnow()
+    result = await get_collection(Job).update_one(
+        {"_id": job.id, "status": JobStatus.QUEUED},
+        {"$set": {
+            "status": JobStatus.CANCELLED,
+            "finished_at": now,
+            "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS)
+        }}
+    )
+    if not result.modified_count:
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    return {"status": "success", "message": "Job cancelled"}
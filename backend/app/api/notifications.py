@@ -1,4 +1,5 @@
 from typing import List
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from app.models.user import User
 from app.models.notification import Notification, NotificationCreate
@@ -54,6 +55,7 @@ async def mark_notification_read(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     notification.read = True
+    notification.read_at = datetime.utcnow()
     await notification.save()
     
     return {"status": "success", "message": "Notification marked as read"}
@@ -65,16 +67,13 @@ async def mark_all_read(current_user: User = Depends(get_current_user)):
     if not profile:
         return {"status": "success", "message": "No notifications to mark"}
     
-    notifications = await Notification.find(
+    result = await Notification.find(
         Notification.employee_id == profile.id,
         Notification.read == False
-    ).to_list()
-    
-    for notification in notifications:
-        notification.read = True
-        await notification.save()
+    ).update({"$set": {Notification.read: True, Notification.read_at: datetime.utcnow()}})
+    marked = result.modified_count if result else 0
     
-    return {"status": "success", "message": f"Marked {len(notifications)} notifications as read"}
+    return {"status": "success", "message": f"Marked {marked} notifications as read"}
 
 @router.delete("/{notification_id}")
 async def delete_notification(
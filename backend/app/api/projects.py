@@ -1,19 +1,41 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from fastapi.encoders import jsonable_encoder
 from app.models.user import User, UserRole
-from app.models.project import Project, ProjectCreate, ProjectUpdate, ProjectStatus
+from app.models.project import Project, ProjectCreate, ProjectUpdate, ProjectStatus, ProjectTask, HealthSnapshot, ReplanPatch, ReplanApplication
 from app.models.employee import EmployeeProfile, Skill, SkillLevel
 from app.api.deps import get_current_user, RoleChecker
 from app.agents.planner_agent import PlannerAgent
 from app.agents.matcher_agent import MatcherAgent
 from beanie import PydanticObjectId
 from beanie.operators import In
-from datetime import datetime
+from datetime import datetime, timedelta
+from uuid import uuid4
+from pymongo.errors import DuplicateKeyError
+from beanie.exceptions import DocumentNotFound
 
 from bson import ObjectId
 from app.core.serialization import serialize_doc
-from pydantic import BaseModel
+from app.core.deadlines import normalize_project_schedule, normalize_project_deadline, planning_window, project_deadline
+from app.core.schedule import build_project_tasks, refresh_schedule, schedule_slippage_days
+from app.core.forecast import simulate_completion
+from app.core.replan import FIXED_STATUSES, replan_inputs, merge_incremental_plan, diff_plans, apply_patch
+from app.core.schedule import normalize_title
+from app.core.config import settings
+from app.db.database import run_in_transaction
+from app.core.workload import sync_project_workload
+from app.core.matching import (
+    load_candidates, latest_match_run, current_roster_version, match_fingerprint, run_match, compute_match_run,
+    refresh_match_run, store_match_run, create_plan_handoff, claim_plan_handoff
+)
+from app.core.background import spawn
+from app.core.jobs import job_queue, job_ticket
+from app.core.planning import get_or_create_plan, cached_plan_for, speculate_plan, plan_inputs, plan_fingerprint
+from app.core.admission import Admission, admit, get_gate, overloaded
+from app.core.telemetry import record_fallback
+from app.core.health import build_health_snapshot, refresh_health_snapshot, portfolio_health_pipeline, evaluate_portfolio_row
+from pydantic import BaseModel, ValidationError
 from app.models.notification import Notification, NotificationType
 
 class TaskStatusUpdate(BaseModel):
@@ -29,8 +51,14 @@ class DeadlineExtension(BaseModel):
     new_deadline: str
     reason: Optional[str] = None
 
+class HealthSnapshotView(BaseModel):
+    health_snapshot: Optional[HealthSnapshot] = None
+
 router = APIRouter()
 
+MATCH_RUN_STATUS_HEADER = "X-Match-Run-Status"
+PLAN_HANDOFF_HEADER = "X-Plan-Handoff-Token"
+
 is_admin = RoleChecker([UserRole.ADMIN])
 is_authenticated = get_current_user
 
@@ -39,8 +67,33 @@ async def create_project(
     project_data: ProjectCreate,
     current_user: User = Depends(is_admin)
 ):
-    project = Project(**project_data.dict())
+    project = Project(**project_data.dict(exclude={"handoff_token"}))
+    
+    # Reuse the plan and matches match-preview already computed for this draft
+    handoff = None
+    if project_data.handoff_token:
+        handoff = await claim_plan_handoff(project_data.handoff_token, current_user.id, project)
+        if handoff and handoff.planned and not project.tasks:
+            project.tasks = handoff.tasks
+            project.plan_start = handoff.created_at
+    
+    project.tasks = build_project_tasks(project.tasks)
+    normalize_project_schedule(project)
+    refresh_schedule(project)
+    await refresh_health_snapshot(project)
     await project.insert()
+    await sync_project_workload(project)
+    if not project.tasks:
+        # Have a plan ready by the time the admin opens decomposition or matching
+        speculate_plan(project)
+    
+    if handoff and handoff.planned:
+        matches = handoff.matches
+        if project.assigned_team:
+            # /match only considers the assigned team once one is set
+            team = {str(e) for e in project.assigned_team}
+            matches = [m for m in matches if str(m["profile"].get("_id") or m["profile"].get("id")) in team]
+        await store_match_run(project, matches, handoff.roster_version)
     return serialize_doc(project)
 
 @router.get("/", response_model=List[dict])
@@ -121,6 +174,69 @@ async def get_my_projects(current_user: User = Depends(is_authenticated)):
         
     return serialize_doc(projects)
 
+@router.get("/health", response_model=List[dict])
+async def get_portfolio_health(
+    health: Optional[List[str]] = Query(None, description="Only return projects in these health states"),
+    status: Optional[ProjectStatus] = None,
+    current_user: User = Depends(is_admin)
+):
+    """
+    Health of every project from one aggregation: tasks are unwound and grouped per
+    project and assignee server-side, joined with the workload index, then the same
+    rules as /{project_id}/health apply.
+    """
+    match = {"status": status.value} if status else {}
+    now = datetime.utcnow()
+    rows = await Project.aggregate(portfolio_health_pipeline(match, now, health)).to_list()
+    
+    results = [evaluate_portfolio_row(row, now) for row in rows]
+    if health:
+        # The pipeline already filtered; this only decides rows with a legacy deadline string
+        wanted = set(health)
+        results = [r for r in results if r["health"] in wanted]
+    return results
+
+@router.get("/tasks/due-soon", response_model=List[dict])
+async def get_tasks_due_soon(
+    days: int = Query(3, ge=0, le=90),
+    include_overdue: bool = False,
+    current_user: User = Depends(is_authenticated)
+):
+    """
+    Open tasks due within `days`, from the resolved `tasks.due_at` dates.
+    Employees see their own tasks; admins see every task.
+    """
+    now = datetime.utcnow()
+    due_range = {"$lte": now + timedelta(days=days)}
+    if not include_overdue:
+        due_range["$gte"] = now
+    criteria = {"due_at": due_range, "status": {"$ne": "completed"}}
+    
+    if current_user.role != UserRole.ADMIN:
+        profile = await EmployeeProfile.find_one(EmployeeProfile.user_id == current_user.id)
+        if not profile:
+            return []
+        criteria["assigned_to"] = profile.id
+    
+    projects = await Project.find({"tasks": {"$elemMatch": criteria}}).to_list()
+    
+    results = []
+    for project in projects:
+        for task in project.tasks:
+            if task.status == "completed" or not task.due_at or task.due_at > due_range["$lte"]:
+                continue
+            if not include_overdue and task.due_at < now:
+                continue
+            if "assigned_to" in criteria and task.assigned_to != criteria["assigned_to"]:
+                continue
+            results.append({
+                "project_id": str(project.id),
+                "project_title": project.title,
+                "task": serialize_doc(task)
+            })
+    results.sort(key=lambda r: r["task"]["due_at"])
+    return results
+
 @router.get("/{project_id}", response_model=dict)
 async def get_project(
     project_id: PydanticObjectId,
@@ -159,10 +275,21 @@ async def update_project(
     
     update_dict = update_data.dict(exclude_unset=True)
     if update_dict:
+        old_plan_key = plan_fingerprint(plan_inputs(project))
         for key, value in update_dict.items():
             setattr(project, key, value)
+        if "tasks" in update_dict:
+            project.tasks = build_project_tasks(update_dict["tasks"])
+        if "tasks" in update_dict or "deadline" in update_dict:
+            normalize_project_schedule(project)
+            refresh_schedule(project)
         project.updated_at = datetime.utcnow()
+        await refresh_health_snapshot(project)
         await project.save()
+        await sync_project_workload(project)
+        # Drafts are still heading for planning; get ahead of it when the planner inputs changed
+        if project.status == ProjectStatus.DRAFT and plan_fingerprint(plan_inputs(project)) != old_plan_key:
+            speculate_plan(project)
     
     return serialize_doc(project)
 
@@ -183,18 +310,16 @@ async def update_task_status(
             raise HTTPException(status_code=403, detail="You are not assigned to this project")
 
     # Find and update the task
-    task_found = False
-    for task in project.tasks:
-        if task.title == update_data.task_title:
-            task.status = update_data.status
-            task_found = True
-            break
-    
-    if not task_found:
+    changed_task = next((t for t in project.tasks if t.title == update_data.task_title), None)
+    if not changed_task:
         raise HTTPException(status_code=404, detail=f"Task '{update_data.task_title}' not found in project")
+    changed_task.status = update_data.status
     
     project.updated_at = datetime.utcnow()
+    refresh_schedule(project, changed_task_key=changed_task.key)
+    await refresh_health_snapshot(project)
     await project.save()
+    await sync_project_workload(project)
     
     return serialize_doc(project)
 
@@ -208,38 +333,33 @@ async def delete_project(
         raise HTTPException(status_code=404, detail="Project not found")
     
     await project.delete()
+    await sync_project_workload(project, removed=True)
     return {"message": "Project deleted successfully"}
 
 @router.post("/{project_id}/plan")
 async def generate_project_plan(
     project_id: PydanticObjectId,
-    current_user: User = Depends(is_admin)
+    refresh: bool = False,
+    current_user: User = Depends(is_admin),
+    admission: Admission = Depends(admit("plan", degrade=True))
 ):
-    """Generate AI-powered project plan with tasks"""
+    """
+    Generate AI-powered project plan with tasks: the cached/speculative plan for the current
+    inputs when there is one, a fresh plan with `refresh=true` (explicit regenerate). Under
+    overload only a cached plan is served.
+    """
     project = await Project.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    if admission.degraded:
+        plan = await cached_plan_for(project)
+        if plan is None:
+            raise overloaded(admission)
+        return plan
+    
     try:
-        planner = PlannerAgent()
-        required_skills = [skill.skill_name for skill in project.required_skills]
-        
-        # Calculate days remaining
-        days_remaining = 7
-        if project.deadline:
-            try:
-                deadline_dt = datetime.fromisoformat(project.deadline.replace('Z', '+00:00'))
-                days_remaining = (deadline_dt.date() - datetime.utcnow().date()).days
-                days_remaining = max(1, days_remaining)
-            except: pass
-
-        plan = await planner.plan(
-            project_title=project.title,
-            project_description=project.description,
-            required_skills=required_skills,
-            experience_required=project.experience_required,
-            days_remaining=days_remaining
-        )
+        plan = await get_or_create_plan(project, refresh=refresh)
         
         return plan
     except Exception as e:
@@ -251,93 +371,46 @@ async def generate_project_plan(
 @router.get("/{project_id}/match")
 async def match_employees_to_project(
     project_id: PydanticObjectId,
-    current_user: User = Depends(is_admin)
+    response: Response,
+    refresh: bool = False,
+    current_user: User = Depends(is_admin),
+    admission: Admission = Depends(admit("match", degrade=True))
 ):
-    """AI-powered employee matching for project"""
+    """
+    AI-powered employee matching for project.
+    Served from the latest persisted MatchRun when its fingerprint still matches
+    (X-Match-Run-Status: fresh). A stale run is returned immediately while a new one is
+    computed in the background (stale); with no run yet, or `refresh`, the matcher runs
+    inline (computed). Under overload the latest run is served as-is, or keyword matching
+    is computed without the LLM (degraded).
+    """
     project = await Project.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # If the project has an assigned team, we ONLY match those employees
-    if project.assigned_team:
-        profiles = await EmployeeProfile.find(In(EmployeeProfile.id, project.assigned_team)).to_list()
-    else:
-        # Get all employee users first to exclude admins
-        employees_users = await User.find(User.role == UserRole.EMPLOYEE).to_list()
-        employee_user_ids = [u.id for u in employees_users]
-        profiles = await EmployeeProfile.find(In(EmployeeProfile.user_id, employee_user_ids)).to_list()
-    
-    candidates = []
-    for profile in profiles:
-        skills = await Skill.find(Skill.employee_id == profile.id).to_list()
-        candidates.append({
-            "profile": profile,
-            "skills": skills
-        })
+    if admission.degraded:
+        latest = await latest_match_run(project.id)
+        response.headers[MATCH_RUN_STATUS_HEADER] = "degraded"
+        if latest:
+            return latest.matches
+        matches, _ = await run_match(project, degraded=True)
+        return matches
     
-    if not candidates:
-        return {"matches": [], "total_candidates": 0}
+    if not refresh:
+        latest = await latest_match_run(project.id)
+        if latest:
+            roster_version = await current_roster_version()
+            if latest.fingerprint == match_fingerprint(project, roster_version):
+                response.headers[MATCH_RUN_STATUS_HEADER] = "fresh"
+                return latest.matches
+            spawn(f"match-run:{project.id}", refresh_match_run, project.id)
+            response.headers[MATCH_RUN_STATUS_HEADER] = "stale"
+            return latest.matches
     
-    # 1. Use existing tasks if available, otherwise generate
-    tasks = project.tasks or []
-    if not tasks:
-        try:
-            planner = PlannerAgent()
-            required_skills_list = [skill.skill_name for skill in project.required_skills]
-            
-            # Calculate days remaining
-            days_remaining = 7
-            if project.deadline:
-                try:
-                    deadline_dt = datetime.fromisoformat(project.deadline.replace('Z', '+00:00'))
-                    days_remaining = (deadline_dt.date() - datetime.utcnow().date()).days
-                    days_remaining = max(1, days_remaining)
-                except: pass
-
-            plan = await planner.plan(
-                project_title=project.title,
-                project_description=project.description,
-                required_skills=required_skills_list,
-                experience_required=project.experience_required,
-                days_remaining=days_remaining
-            )
-            tasks = plan.get("tasks", [])
-            # Persist these tasks so they stay consistent
-            project.tasks = tasks
-            await project.save()
-        except Exception as e:
-            print(f"Warning: Task planning failed: {e}")
-            tasks = [{"title": "General System Integration", "description": "Execute core project modules", "required_skills": []}]
-
     try:
-        # 2. Match with tasks
-        matcher = MatcherAgent()
-        result = await matcher.match(project=project, candidates=candidates, tasks=tasks)
-        
-        # Enrich matches with full profile data and filter for Core Team (score > 0)
-        enriched_matches = []
-        for match in result.get("matches", []):
-            if match["match_score"] <= 0:
-                continue
-                
-            # Find the candidate profile
-            candidate = next(
-                (c for c in candidates if str(c["profile"].id) == match["employee_id"]),
-                None
-            )
-            if candidate:
-                enriched_matches.append({
-                    "profile": candidate["profile"],
-                    "skills": candidate["skills"],
-                    "score": match["match_score"],
-                    "matched_skills": match["matched_skills"],
-                    "suggested_task": match["suggested_task"],
-                    "suggested_description": match.get("suggested_description", ""),
-                    "suggested_deadline": match.get("suggested_deadline", "TBD"),
-                    "reasoning": match["reasoning"]
-                })
-        
-        return enriched_matches
+        matches = await compute_match_run(project)
+        response.headers[MATCH_RUN_STATUS_HEADER] = "computed"
+        return matches
         
     except Exception as e:
         raise HTTPException(
@@ -348,13 +421,22 @@ async def match_employees_to_project(
 @router.post("/match-preview")
 async def match_preview(
     project_data: ProjectCreate,
-    current_user: User = Depends(is_admin)
+    response: Response,
+    current_user: User = Depends(is_admin),
+    admission: Admission = Depends(admit("match_preview", degrade=True))
 ):
-    """AI-powered matching for unsaved project drafts"""
+    """
+    AI-powered matching for unsaved project drafts.
+    The plan and matches are parked under a short-lived token (X-Plan-Handoff-Token) that
+    create_project accepts as `handoff_token`, so saving the draft doesn't plan and match again.
+    Under overload the preview uses a cached plan and keyword matching, and issues no token.
+    """
     print(f"DEBUG: match-preview called with title: {project_data.title}")
     
     # Create temporary project object (not saved to DB)
-    project = Project(**project_data.dict())
+    project = Project(**project_data.dict(exclude={"handoff_token"}))
+    normalize_project_deadline(project)
+    roster_version = await current_roster_version()
     
     
     # Get all employee users first to exclude admins
@@ -366,15 +448,9 @@ async def match_preview(
     profiles = await EmployeeProfile.find(In(EmployeeProfile.user_id, employee_user_ids)).to_list()
     print(f"DEBUG: Found {len(profiles)} profiles linked to these users")
     
-    candidates = []
-    
-    for profile in profiles:
-        skills = await Skill.find(Skill.employee_id == profile.id).to_list()
-        print(f"DEBUG: Candidate {profile.full_name} has {len(skills)} skills: {[s.skill_name for s in skills]}")
-        candidates.append({
-            "profile": profile,
-            "skills": skills
-        })
+    candidates = await load_candidates(profiles)
+    for c in candidates:
+        print(f"DEBUG: Candidate {c['profile'].full_name} has {len(c['skills'])} skills: {[s.skill_name for s in c['skills']]}")
     
     if not candidates:
         print("DEBUG: No candidates found for matching")
@@ -384,36 +460,30 @@ async def match_preview(
     print(f"DEBUG: Required skills: {[s.skill_name for s in project.required_skills]}")
     
     tasks = []
-    try:
-        # 1. Generate tasks for the draft
-        planner = PlannerAgent()
-        required_skills_list = [skill.skill_name for skill in project.required_skills]
-        
-        # Calculate days remaining
-        days_remaining = 7
-        if project.deadline:
-            try:
-                deadline_dt = datetime.fromisoformat(project.deadline.replace('Z', '+00:00'))
-                days_remaining = (deadline_dt.date() - datetime.utcnow().date()).days
-                days_remaining = max(1, days_remaining)
-            except: pass
-
-        plan = await planner.plan(
-            project_title=project.title,
-            project_description=project.description,
-            required_skills=required_skills_list,
-            experience_required=project.experience_required,
-            days_remaining=days_remaining
-        )
-        tasks = plan.get("tasks", [])
-    except Exception as e:
-        print(f"Warning: Draft planning failed: {e}")
-        tasks = [{"title": "Initial Implementation Phase", "description": "Begin core project logic", "required_skills": []}]
+    planned = True
+    placeholder = [{"title": "Initial Implementation Phase", "description": "Begin core project logic", "required_skills": []}]
+    if admission.degraded:
+        # Overloaded: no planner call, only a plan already cached for these inputs
+        plan = await cached_plan_for(project)
+        if not plan:
+            record_fallback("planner", "degraded")
+        tasks = plan.get("tasks", []) if plan else placeholder
+        planned = False
+    else:
+        try:
+            # 1. Generate tasks for the draft (cached per planner inputs: the preview re-runs on every draft edit)
+            plan = await get_or_create_plan(project)
+            tasks = plan.get("tasks", [])
+        except Exception as e:
+            print(f"Warning: Draft planning failed: {e}")
+            record_fallback("planner", "llm_error")
+            tasks = placeholder
+            planned = False
 
     try:
         # 2. Match with tasks
         matcher = MatcherAgent()
-        result = await matcher.match(project=project, candidates=candidates, tasks=tasks)
+        result = await matcher.match(project=project, candidates=candidates, tasks=tasks, use_llm=not admission.degraded)
         
         print(f"DEBUG: Matcher returned {len(result.get('matches', []))} matches")
         
@@ -448,6 +518,9 @@ async def match_preview(
                 print(f"DEBUG: Could not find candidate profile for ID {match['employee_id']}")
         
         print(f"DEBUG: Returning {len(enriched_matches)} enriched matches")
+        if not admission.degraded:
+            token = await create_plan_handoff(current_user.id, project, tasks, enriched_matches, roster_version, planned)
+            response.headers[PLAN_HANDOFF_HEADER] = token
         return enriched_matches
         
     except Exception as e:
@@ -473,7 +546,10 @@ async def extend_project_deadline(
     try:
         old_deadline = project.deadline
         project.deadline = extension_data.new_deadline
+        normalize_project_schedule(project)
+        refresh_schedule(project)
         project.updated_at = datetime.utcnow()
+        await refresh_health_snapshot(project)
         await project.save()
         
         # Notify team members if project is finalized (active)
@@ -509,150 +585,86 @@ async def get_project_health(
     """
     Evaluate project health based on tasks, deadlines, and workload.
     
-    Health States:
-    - stable (🟢): All metrics within acceptable thresholds
-    - warning (🟡): Minor risks detected (workload > 75%, deadline < 7 days)
-    - critical (🔴): Major risks (overdue, unassigned tasks, overload > 90%)
-    
-    Risk Score Calculation:
-    - Task progress < expected progress: +30 points
-    - Employee load > 90%: +40 points
-    - Deadline risk (< 3 days): +20 points
-    - Unassigned/blocked tasks: +50 points
+    The evaluation (see app/core/health.py) is stored on the project whenever its
+    tasks, assignments or deadline change, so this is normally a single projected read.
+    The snapshot is only recomputed here once its date-dependent metrics have expired.
     
     Threshold: risk_score > 50 triggers replanning
     """
+    view = await Project.find_one(Project.id == project_id).project(HealthSnapshotView)
+    if not view:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    now = datetime.utcnow()
+    snapshot = view.health_snapshot
+    if snapshot is None or snapshot.valid_until <= now:
+        project = await Project.get(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        snapshot = await build_health_snapshot(project, now)
+        await project.set({Project.health_snapshot: snapshot.model_dump()})
+    
+    return HealthResponse(
+        health=snapshot.health,
+        issues=snapshot.issues,
+        metrics=snapshot.metrics
+    )
+
+@router.get("/{project_id}/schedule")
+async def get_project_schedule(
+    project_id: PydanticObjectId,
+    current_user: User = Depends(is_authenticated)
+):
+    """Critical-path schedule: earliest/latest start, slack and projected finish per task"""
     project = await Project.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    issues = []
-    health = "stable"
-    risk_score = 0
-    
-    total_tasks = len(project.tasks)
-    if total_tasks == 0:
-        return HealthResponse(
-            health="stable", 
-            issues=[], 
-            metrics={
-                "total_tasks": 0, 
-                "completed": 0, 
-                "risk_score": 0,
-                "progress": 0,
-                "expected_progress": 0,
-                "max_load": 0
-            }
-        )
-        
-    completed_tasks = len([t for t in project.tasks if t.status == "completed"])
-    in_progress_tasks = len([t for t in project.tasks if t.status == "in_progress"])
-    progress = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
+    schedule = project.schedule
+    if not schedule or schedule["origin"].date() != datetime.utcnow().date():
+        schedule = refresh_schedule(project)
+        await project.set({Project.schedule: schedule})
     
-    # Calculate expected progress based on time elapsed
-    expected_progress = 0
-    days_left = None
-    if project.deadline:
-        try:
-            deadline_dt = datetime.fromisoformat(project.deadline.replace('Z', '+00:00'))
-            # Assume project started when created
-            created_dt = project.created_at if hasattr(project, 'created_at') else datetime.utcnow()
-            total_duration = (deadline_dt - created_dt).days
-            elapsed = (datetime.utcnow() - created_dt).days
-            
-            if total_duration > 0:
-                expected_progress = (elapsed / total_duration) * 100
-                expected_progress = min(100, max(0, expected_progress))
-            
-            days_left = (deadline_dt.date() - datetime.utcnow().date()).days
-        except:
-            pass
-    
-    # 1. Task Progress vs Expected Progress
-    if expected_progress > 0 and progress < (expected_progress - 15):
-        issues.append("progress_behind_schedule")
-        risk_score += 30
-        if health == "stable": health = "warning"
-    
-    # 2. Deadline Risk
-    if days_left is not None:
-        if days_left < 0:
-            issues.append("deadline_overdue")
-            risk_score += 50
-            health = "overdue" # New strict state
-        elif days_left < 3:
-            issues.append("deadline_critical")
-            risk_score += 20
-            health = "critical"
-        elif days_left < 7:
-            issues.append("deadline_approaching")
-            risk_score += 10
-            if health == "stable": health = "warning"
-
-    # 3. Unassigned Tasks (Critical Issue)
-    unassigned_tasks = [t for t in project.tasks if not t.assigned_to and t.status != "completed"]
-    if len(unassigned_tasks) > 0:
-        issues.append("unassigned_tasks")
-        risk_score += 50
-        health = "critical"
-    
-    # 4. Employee Workload Analysis
-    employee_loads = {}
-    employee_hours = {}
-    
-    for t in project.tasks:
-        if t.assigned_to and t.status != "completed":
-            eid = str(t.assigned_to)
-            employee_loads[eid] = employee_loads.get(eid, 0) + 1
-            
-            # Track estimated hours
-            hours = getattr(t, 'estimated_hours', 8)
-            employee_hours[eid] = employee_hours.get(eid, 0) + hours
-    
-    max_load = max(employee_loads.values()) if employee_loads else 0
-    max_hours = max(employee_hours.values()) if employee_hours else 0
-    
-    # Check for overload (> 4 active tasks or > 40 hours)
-    for eid, load in employee_loads.items():
-        hours = employee_hours.get(eid, 0)
-        load_percentage = (hours / 40) * 100 if hours > 0 else 0  # Assume 40h/week capacity
-        
-        if load > 5 or load_percentage > 90:
-            issues.append("capacity_critical_overload")
-            risk_score += 40
-            health = "critical"
-        elif load > 3 or load_percentage > 75:
-            issues.append("capacity_near_limit")
-            risk_score += 15
-            if health == "stable": health = "warning"
-    
-    # 5. Blocked/Dependency Issues (if we had dependency tracking)
-    # For now, we'll check for tasks stuck in "in_progress" for too long
-    # This is a placeholder for future dependency tracking
+    return serialize_doc({
+        **schedule,
+        "deadline_at": project_deadline(project),
+        "slippage_days": schedule_slippage_days(project)
+    })
+
+@router.get("/{project_id}/forecast")
+async def forecast_project_completion(
+    project_id: PydanticObjectId,
+    simulations: Optional[int] = Query(None, ge=100, le=50000),
+    seed: Optional[int] = None,
+    current_user: User = Depends(is_authenticated)
+):
+    """P50/P80/P95 finish dates from a Monte Carlo run over task durations, dependencies and assignee capacity"""
+    project = await Project.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
     
-    return HealthResponse(
-        health=health,
-        issues=list(set(issues)),
-        metrics={
-            "progress": round(progress, 1),
-            "expected_progress": round(expected_progress, 1),
-            "days_left": days_left if days_left is not None else 0,
-            "max_load": max_load,
-            "max_hours": max_hours,
-            "risk_score": risk_score,
-            "total_tasks": total_tasks,
-            "completed": completed_tasks,
-            "in_progress": in_progress_tasks,
-            "unassigned": len(unassigned_tasks)
-        }
+    # NumPy work off the event loop, so other requests and background jobs keep running
+    forecast = await asyncio.to_thread(
+        simulate_completion,
+        project.tasks,
+        simulations=simulations or settings.FORECAST_SIMULATIONS,
+        deadline_at=project_deadline(project),
+        seed=seed
     )
+    return serialize_doc(forecast)
 
 @router.post("/{project_id}/replan-simulate")
 async def simulate_replan_project(
     project_id: PydanticObjectId,
-    current_user: User = Depends(is_admin)
+    mode: str = Query("incremental", pattern="^(incremental|full)$"),
+    current_user: User = Depends(is_admin),
+    admission: Admission = Depends(admit("replan_simulate"))
 ):
-    """Simulate project replanning without saving changes"""
+    """
+    Simulate project replanning without saving changes.
+    `incremental` (default) keeps completed and in-progress tasks fixed and only re-plans
+    the remaining scope, merged back by task key; `full` regenerates the whole plan.
+    """
     project = await Project.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -662,46 +674,58 @@ async def simulate_replan_project(
         required_skills_list = [skill.skill_name for skill in project.required_skills]
         
         
-        days_remaining = 7
-        is_overdue = False
+        # Overdue projects get a default 7-day recovery sprint
+        days_remaining, is_overdue = planning_window(project)
         
-        if project.deadline:
-            try:
-                deadline_dt = datetime.fromisoformat(project.deadline.replace('Z', '+00:00'))
-                delta_days = (deadline_dt.date() - datetime.utcnow().date()).days
-                
-                if delta_days < 0:
-                    is_overdue = True
-                    days_remaining = 7 # Default recovery sprint
-                else:
-                    days_remaining = max(1, delta_days)
-            except: pass
-
-        plan = await planner.plan(
-            project_title=project.title,
-            project_description=project.description,
-            required_skills=required_skills_list,
-            experience_required=project.experience_required,
-            days_remaining=days_remaining,
-            is_overdue=is_overdue
-        )
-        tasks = plan.get("tasks", [])
+        # Critical-path slippage tells the planner which chain is actually late
+        schedule = project.schedule or refresh_schedule(project)
+        slippage_days = schedule_slippage_days(project) or 0
+        titles = {t.key: t.title for t in project.tasks}
+        critical_path = [titles[k] for k in schedule.get("critical_path", []) if k in titles]
+
+        if mode == "incremental" and project.tasks:
+            plan = await planner.replan(
+                project_title=project.title,
+                project_description=project.description,
+                experience_required=project.experience_required,
+                days_remaining=days_remaining,
+                is_overdue=is_overdue,
+                slippage_days=slippage_days,
+                critical_path=critical_path,
+                **replan_inputs(project)
+            )
+            tasks = serialize_doc(merge_incremental_plan(project, plan.get("tasks", [])))
+            # Fixed tasks keep their assignees; only the open scope is re-matched
+            match_tasks = [t for t in tasks if t["status"] not in FIXED_STATUSES]
+        else:
+            mode = "full"
+            plan = await planner.plan(
+                project_title=project.title,
+                project_description=project.description,
+                required_skills=required_skills_list,
+                experience_required=project.experience_required,
+                days_remaining=days_remaining,
+                is_overdue=is_overdue,
+                slippage_days=slippage_days,
+                critical_path=critical_path
+            )
+            tasks = plan.get("tasks", [])
+            match_tasks = tasks
         
         # Get all candidates for matching simulation
         employees_users = await User.find(User.role == UserRole.EMPLOYEE).to_list()
         employee_user_ids = [u.id for u in employees_users]
         profiles = await EmployeeProfile.find(In(EmployeeProfile.user_id, employee_user_ids)).to_list()
-        candidates = []
-        for profile in profiles:
-            skills = await Skill.find(Skill.employee_id == profile.id).to_list()
-            candidates.append({"profile": profile, "skills": skills})
+        candidates = await load_candidates(profiles)
 
         matcher = MatcherAgent()
-        result = await matcher.match(project=project, candidates=candidates, tasks=tasks)
+        result = await matcher.match(project=project, candidates=candidates, tasks=match_tasks)
         
+        candidates_by_id = {str(c["profile"].id): c for c in candidates}
         enriched_matches = []
+        assignments = {}
         for match in result.get("matches", []):
-            candidate = next((c for c in candidates if str(c["profile"].id) == match["employee_id"]), None)
+            candidate = candidates_by_id.get(match["employee_id"])
             if candidate:
                 enriched_matches.append({
                     "profile": serialize_doc(candidate["profile"]),
@@ -711,15 +735,21 @@ async def simulate_replan_project(
                     "suggested_task": match["suggested_task"],
                     "reasoning": match["reasoning"]
                 })
+                assignments.setdefault(normalize_title(match["suggested_task"]), candidate["profile"].id)
         
-        # Identify changes (Simulation Diff)
-        # In a real app, we'd compare old and new plans.
-        # For now, we'll return the proposed plan.
+        # Simulation diff: what apply will actually change, keyed by task
+        patch = diff_plans(project.tasks, tasks, assignments, base_updated_at=project.updated_at)
         
         return {
             "proposed_tasks": tasks,
             "proposed_assignments": enriched_matches,
-            "summary": f"Proposed re-distribution of {len(tasks)} tasks across {len(enriched_matches)} agents."
+            "patch": serialize_doc(patch),
+            "schedule_slippage_days": slippage_days,
+            "mode": mode,
+            "summary": (
+                f"Proposed re-distribution of {len(match_tasks)} tasks across {len(enriched_matches)} agents: "
+                f"{len(patch.added)} added, {len(patch.removed)} removed, {len(patch.changed)} changed, {len(patch.moves)} reassigned."
+            )
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
@@ -727,83 +757,65 @@ async def simulate_replan_project(
 @router.post("/{project_id}/replan-apply")
 async def apply_replan_project(
     project_id: PydanticObjectId,
-    plan_data: dict, # Expects { tasks: [], assignments: [] }
+    plan_data: dict, # Expects { patch: {} } from replan-simulate, or legacy { tasks: [], assignments: [] }
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(is_admin)
 ):
     """
     Apply a simulated replan to the project.
     This will:
-    1. Update project tasks with new assignments
+    1. Apply the task patch (added/removed/changed tasks and reassignments)
     2. Update assigned team list
     3. Set project status to FINALIZED (deploy to portfolio)
     4. Send notifications to all employees about their new tasks
+    The project update, the notification batch and the ReplanApplication history entry are
+    written in one transaction. Retrying with the same Idempotency-Key returns the stored
+    result without applying anything again.
     """
     project = await Project.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    if idempotency_key:
+        previous = await ReplanApplication.find_one(
+            ReplanApplication.project_id == project.id,
+            ReplanApplication.idempotency_key == idempotency_key
+        )
+        if previous:
+            return previous.result
+    
+    patch = None
+    if plan_data.get("patch"):
+        try:
+            patch = ReplanPatch(**plan_data["patch"])
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid replan patch: {str(e)}")
+        if patch.base_updated_at and patch.base_updated_at != project.updated_at:
+            raise HTTPException(status_code=409, detail="Project changed since this replan was simulated. Run the simulation again.")
+    # The write below only lands if the project is still at this version
+    loaded_updated_at = project.updated_at
+    
     try:
-        tasks = plan_data.get("tasks", [])
-        assignments = plan_data.get("assignments", [])
-        
-        # Task Preservation & Rerouting Logic
-        current_tasks = {t.title: t for t in project.tasks}
-        updated_tasks = []
-        task_assignments = {}
-        rerouted_notifications = []
-        new_task_count = 0
-
-
-        for t_dict in tasks:
-            title = t_dict["title"]
-            # Preserve status if task already exists
-            status = "backlog"
-            old_assignee = None
-            if title in current_tasks:
-                status = current_tasks[title].status
-                old_assignee = current_tasks[title].assigned_to
-            else:
-                new_task_count += 1
-
-            # Find new assignment
-            match = next((a for a in assignments if a["suggested_task"] == title), None)
-            if match:
-                profile_data = match["profile"]
-                # Handle both _id and id formats
-                pid = profile_data.get("_id") or profile_data.get("id")
-                if not pid:
-                    continue
-                    
-                new_assignee_id = PydanticObjectId(pid)
-                
-                # Check for Reroute
-                if old_assignee and old_assignee != new_assignee_id:
-                    rerouted_notifications.append({
-                        "employee_id": old_assignee,
-                        "title": f"🔄 Task Rerouted - {title}",
-                        "message": f"Task '{title}' has been moved to another agent for optimization."
-                    })
-
-                t_dict["assigned_to"] = new_assignee_id
-                t_dict["status"] = status # Preserved status
-                
-                if new_assignee_id not in task_assignments:
-                    task_assignments[new_assignee_id] = []
-                task_assignments[new_assignee_id].append(t_dict)
-
-            updated_tasks.append(t_dict)
-            
-        project.tasks = updated_tasks
-        
-        # Update assigned team list
-        new_team_ids = set()
-        for a in assignments:
-            profile_data = a["profile"]
-            pid = profile_data.get("_id") or profile_data.get("id")
-            if pid:
-                new_team_ids.add(PydanticObjectId(pid))
-                
-        project.assigned_team = list(new_team_ids)
+        if patch is None:
+            # Legacy payload: full proposed task list plus matcher assignments
+            assignments = {}
+            for a in plan_data.get("assignments", []):
+                pid = a["profile"].get("_id") or a["profile"].get("id")
+                if pid:
+                    assignments.setdefault(normalize_title(a["suggested_task"]), PydanticObjectId(pid))
+            patch = diff_plans(project.tasks, plan_data.get("tasks", []), assignments)
+        
+        # Task Preservation & Rerouting Logic: applied straight from the keyed patch
+        outcome = apply_patch(project, patch)
+        new_task_count = outcome["added"]
+        rerouted_count = len(outcome["rerouted"])
+        
+        project.plan_start = datetime.utcnow()
+        normalize_project_schedule(project)
+        refresh_schedule(project)
+        
+        # Update assigned team list: everyone who holds a task after the replan
+        project.assigned_team = list({t.assigned_to for t in project.tasks if t.assigned_to})
         
         # 🚀 FINALIZE PROJECT (Deploy to Portfolio)
         project.status = ProjectStatus.FINALIZED
@@ -817,7 +829,6 @@ async def apply_replan_project(
         
         # Construct summary
         changes = []
-        rerouted_count = len(rerouted_notifications)
         if rerouted_count > 0: changes.append(f"{rerouted_count} tasks rerouted")
         if new_task_count > 0: changes.append(f"{new_task_count} new tasks added")
         
@@ -831,47 +842,83 @@ async def apply_replan_project(
         })
 
         project.updated_at = datetime.utcnow()
-        await project.save()
+        await refresh_health_snapshot(project)
         
-        # 📧 SEND NOTIFICATIONS TO EMPLOYEES
-        notifications_sent = 0
-        for employee_id, tasks_list in task_assignments.items():
-            # Create notification for each employee
-            task_titles = [t["title"] for t in tasks_list]
-            task_count = len(tasks_list)
-            
-            notification = Notification(
+        # 📧 NOTIFICATIONS: built up front, inserted as one batch
+        notifications = []
+        for employee_id, task_titles in outcome["assigned"].items():
+            task_count = len(task_titles)
+            notifications.append(Notification(
                 employee_id=employee_id,
                 project_id=project.id,
                 notification_type=NotificationType.REPLANNING_APPLIED,
                 title=f"🔄 New Tasks Assigned - {project.title}",
                 message=f"You have been assigned {task_count} task{'s' if task_count > 1 else ''} in the replanned project '{project.title}': {', '.join(task_titles[:3])}{'...' if task_count > 3 else ''}",
                 read=False
-            )
-            await notification.insert()
-            notifications_sent += 1
-        
-        # 📧 SEND REROUTED NOTIFICATIONS
-        for r_notif in rerouted_notifications:
-            notification = Notification(
-                employee_id=r_notif["employee_id"],
+            ))
+        for employee_id, title in outcome["rerouted"]:
+            notifications.append(Notification(
+                employee_id=employee_id,
                 project_id=project.id,
                 notification_type=NotificationType.TASK_REROUTED,
-                title=r_notif["title"],
-                message=r_notif["message"],
+                title=f"🔄 Task Rerouted - {title}",
+                message=f"Task '{title}' has been moved to another agent for optimization.",
                 read=False
-            )
-            await notification.insert()
-            notifications_sent += 1
+            ))
         
-        return {
+        result = {
             "status": "success", 
             "message": f"Neural replan applied successfully. Project deployed to portfolio.",
             "project_status": "finalized",
-            "notifications_sent": notifications_sent,
-            "tasks_updated": len(updated_tasks),
+            "notifications_sent": len(notifications),
+            "tasks_updated": len(patch.added) + len(patch.changed) + len(patch.moves),
+            "tasks_removed": len(patch.removed),
             "team_size": len(project.assigned_team)
         }
+        application = ReplanApplication(
+            project_id=project.id,
+            idempotency_key=idempotency_key or uuid4().hex,
+            patch=patch.model_dump(),
+            result=result
+        )
+        
+        async def write(session):
+            # The history entry goes first: its unique key is the idempotency claim, which
+            # keeps retries safe even on a standalone server without transactions
+            await application.insert(session=session)
+            try:
+                # Conditional on the version read above: a concurrent edit raises DocumentNotFound
+                await Project.find_one(
+                    Project.id == project.id,
+                    Project.updated_at == loaded_updated_at
+                ).replace_one(project, session=session)
+                if notifications:
+                    await Notification.insert_many(notifications, session=session)
+            except Exception:
+                if session is None:
+                    await application.delete()
+                raise
+        
+        try:
+            await run_in_transaction(write)
+        except DuplicateKeyError:
+            # A concurrent retry with the same key won the race
+            previous = await ReplanApplication.find_one(
+                ReplanApplication.project_id == project.id,
+                ReplanApplication.idempotency_key == application.idempotency_key
+            )
+            if previous:
+                return previous.result
+            raise
+        except DocumentNotFound:
+            raise HTTPException(status_code=409, detail="Project changed while the replan was being applied. Run the simulation again.")
+        
+        await sync_project_workload(project)
+        return result
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid replan patch: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to apply plan: {str(e)}")
 
@@ -879,41 +926,132 @@ async def apply_replan_project(
 @router.post("/{project_id}/decompose")
 async def decompose_project(
     project_id: PydanticObjectId,
-    current_user: User = Depends(is_admin)
+    refresh: bool = False,
+    current_user: User = Depends(is_admin),
+    admission: Admission = Depends(admit("decompose"))
 ):
-    """Explicit task decomposition agent endpoint"""
+    """Explicit task decomposition agent endpoint (reuses the cached plan unless `refresh=true`)"""
     project = await Project.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     try:
-        planner = PlannerAgent()
-        required_skills_list = [skill.skill_name for skill in project.required_skills]
-        
-        # Calculate days remaining
-        days_remaining = 7
-        if project.deadline:
-            try:
-                deadline_dt = datetime.fromisoformat(project.deadline.replace('Z', '+00:00'))
-                days_remaining = (deadline_dt.date() - datetime.utcnow().date()).days
-                days_remaining = max(1, days_remaining)
-            except: pass
-
-        plan = await planner.plan(
-            project_title=project.title,
-            project_description=project.description,
-            required_skills=required_skills_list,
-            experience_required=project.experience_required,
-            days_remaining=days_remaining
-        )
+        plan = await get_or_create_plan(project, refresh=refresh)
         
         # Save tasks to project for persistence
         tasks = plan.get("tasks", [])
-        project.tasks = tasks
+        project.tasks = build_project_tasks(tasks)
+        project.plan_start = datetime.utcnow()
+        normalize_project_schedule(project)
+        refresh_schedule(project)
+        await refresh_health_snapshot(project)
         await project.save()
+        await sync_project_workload(project)
         
         return plan
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Decomposition failed: {str(e)}")
 
+
+# ---- Async variants: enqueue the same work on the job queue and return a job id ----
+# Workers call the route functions above directly, so results are identical to the sync
+# endpoints; header-borne values (match run status, handoff token) are folded into the result.
+# Workers share each endpoint's admission gate but wait for a slot instead of being shed.
+
+async def _job_plan(payload: dict, user: User):
+    async with get_gate("plan").hold():
+        return await generate_project_plan(
+            PydanticObjectId(payload["project_id"]), refresh=payload.get("refresh", False),
+            admission=Admission("plan"), current_user=user
+        )
+
+async def _job_decompose(payload: dict, user: User):
+    async with get_gate("decompose").hold():
+        return await decompose_project(
+            PydanticObjectId(payload["project_id"]), refresh=payload.get("refresh", False),
+            admission=Admission("decompose"), current_user=user
+        )
+
+async def _job_match(payload: dict, user: User):
+    response = Response()
+    async with get_gate("match").hold():
+        matches = await match_employees_to_project(
+            PydanticObjectId(payload["project_id"]), response, refresh=payload.get("refresh", False),
+            admission=Admission("match"), current_user=user
+        )
+    return {"matches": matches, "match_run_status": response.headers.get(MATCH_RUN_STATUS_HEADER)}
+
+async def _job_match_preview(payload: dict, user: User):
+    response = Response()
+    async with get_gate("match_preview").hold():
+        matches = await match_preview(
+            ProjectCreate(**payload["project"]), response, admission=Admission("match_preview"), current_user=user
+        )
+    return {"matches": matches, "handoff_token": response.headers.get(PLAN_HANDOFF_HEADER)}
+
+async def _job_replan_simulate(payload: dict, user: User):
+    async with get_gate("replan_simulate").hold():
+        return await simulate_replan_project(
+            PydanticObjectId(payload["project_id"]), mode=payload.get("mode", "incremental"),
+            admission=Admission("replan_simulate"), current_user=user
+        )
+
+# Previews back an admin waiting on the form; the rest are explicit project actions
+job_queue.register("match_preview", _job_match_preview, priority=8)
+job_queue.register("match", _job_match, priority=6)
+job_queue.register("plan", _job_plan, priority=5)
+job_queue.register("decompose", _job_decompose, priority=5)
+job_queue.register("replan_simulate", _job_replan_simulate, priority=5)
+
+async def _enqueue_for_project(kind: str, project_id: PydanticObjectId, current_user: User, **payload) -> dict:
+    if not await Project.find_one(Project.id == project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    job = await job_queue.enqueue(kind, {"project_id": str(project_id), **payload}, created_by=current_user.id)
+    return job_ticket(job)
+
+@router.post("/match-preview/async", status_code=status.HTTP_202_ACCEPTED)
+async def match_preview_async(
+    project_data: ProjectCreate,
+    current_user: User = Depends(is_admin)
+):
+    """Queued /match-preview; the job result is {matches, handoff_token}"""
+    job = await job_queue.enqueue("match_preview", {"project": project_data.dict()}, created_by=current_user.id)
+    return job_ticket(job)
+
+@router.post("/{project_id}/plan/async", status_code=status.HTTP_202_ACCEPTED)
+async def generate_project_plan_async(
+    project_id: PydanticObjectId,
+    refresh: bool = False,
+    current_user: User = Depends(is_admin)
+):
+    """Queued /{project_id}/plan"""
+    return await _enqueue_for_project("plan", project_id, current_user, refresh=refresh)
+
+@router.post("/{project_id}/decompose/async", status_code=status.HTTP_202_ACCEPTED)
+async def decompose_project_async(
+    project_id: PydanticObjectId,
+    refresh: bool = False,
+    current_user: User = Depends(is_admin)
+):
+    """Queued /{project_id}/decompose"""
+    return await _enqueue_for_project("decompose", project_id, current_user, refresh=refresh)
+
+@router.post("/{project_id}/match/async", status_code=status.HTTP_202_ACCEPTED)
+async def match_employees_to_project_async(
+    project_id: PydanticObjectId,
+    refresh: bool = False,
+    current_user: User = Depends(is_admin)
+):
+    """Queued /{project_id}/match; the job result is {matches, match_run_status}"""
+    return await _enqueue_for_project("match", project_id, current_user, refresh=refresh)
+
+@router.post("/{project_id}/replan-simulate/async", status_code=status.HTTP_202_ACCEPTED)
+async def simulate_replan_project_async(
+    project_id: PydanticObjectId,
+    mode: str = Query("incremental", pattern="^(incremental|full)$"),
+    current_user: User = Depends(is_admin)
+):
+    """Queued /{project_id}/replan-simulate (the worker holds the gate, so enqueueing is never shed)"""
+    return await _enqueue_for_project("replan_simulate", project_id, current_user, mode=mode)
+
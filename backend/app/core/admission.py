@@ -0,0 +1,139 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict
+from fastapi import HTTPException, Response, status
+from app.core.config import settings
+from app.core.telemetry import admission_in_flight, admission_queued, admission_rejected
+
+DEGRADED_HEADER = "X-Degraded"
+
+class Overloaded(Exception):
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(f"{endpoint} is overloaded")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+class AdmissionGate:
+    """
+    Concurrency limit for one LLM-backed endpoint with a bounded wait queue.
+    Requests beyond `limit` wait up to `queue_timeout` seconds for a slot, but only
+    `queue_size` of them at a time: the rest are rejected immediately, so a burst turns
+    into fast 429s instead of everyone timing out at the provider.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max(1, limit))
+        self.active = 0
+        self.waiting = 0
+        self.avg_seconds = 10.0 # EWMA of time a slot is held; seeds Retry-After
+        self._publish()
+
+    def _publish(self):
+        admission_in_flight.set(self.active, endpoint=self.name)
+        admission_queued.set(self.waiting, endpoint=self.name)
+
+    def _reject(self) -> Overloaded:
+        admission_rejected.inc(endpoint=self.name)
+        return Overloaded(self.name, self.retry_after())
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + 1) / max(1, self.limit)
+        return max(1, min(60, math.ceil(self.avg_seconds * backlog)))
+
+    async def acquire(self) -> float:
+        """Take a slot (waiting in the bounded queue if needed); returns the start time for release()"""
+        if self.limit > 0:
+            if self._slots.locked():
+                if self.waiting >= self.queue_size:
+                    raise self._reject()
+                self.waiting += 1
+                self._publish()
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+                except asyncio.TimeoutError:
+                    raise self._reject()
+                finally:
+                    self.waiting -= 1
+                    self._publish()
+            else:
+                await self._slots.acquire()
+        self.active += 1
+        self._publish()
+        return time.monotonic()
+
+    def release(self, started: float):
+        self.active -= 1
+        self._publish()
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.monotonic() - started)
+        if self.limit > 0:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def hold(self):
+        """Wait for a slot without the queue bound (job workers: already limited by worker count)"""
+        if self.limit > 0:
+            await self._slots.acquire()
+        self.active += 1
+        self._publish()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(started)
+
+_gates: Dict[str, AdmissionGate] = {}
+
+def get_gate(endpoint: str) -> AdmissionGate:
+    if endpoint not in _gates:
+        _gates[endpoint] = AdmissionGate(
+            endpoint,
+            settings.ADMISSION_CONCURRENCY,
+            settings.ADMISSION_QUEUE_SIZE,
+            settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        )
+    return _gates[endpoint]
+
+@dataclass
+class Admission:
+    endpoint: str
+    degraded: bool = False # Admitted without a slot: serve cached/deterministic results only
+    retry_after: int = 0
+
+def overloaded(admission: Admission) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"'{admission.endpoint}' is at capacity. Retry shortly.",
+        headers={"Retry-After": str(admission.retry_after)}
+    )
+
+def admit(endpoint: str, degrade: bool = False):
+    """
+    Route dependency holding an admission slot for the whole request. Over capacity it
+    rejects with 429 + Retry-After, or, with `degrade`, admits the request in degraded mode
+    (X-Degraded: overload) so the route can answer from caches or deterministic fallbacks.
+    Declare it after the auth dependency: FastAPI resolves dependencies in order, and a
+    request that auth will reject must not take (or queue for) a slot.
+    """
+    async def dependency(response: Response):
+        gate = get_gate(endpoint)
+        try:
+            started = await gate.acquire()
+        except Overloaded as e:
+            admission = Admission(endpoint, degraded=True, retry_after=e.retry_after)
+            if not degrade:
+                raise overloaded(admission)
+            response.headers[DEGRADED_HEADER] = "overload"
+            yield admission
+            return
+        try:
+            yield Admission(endpoint)
+        finally:
+            gate.release(started)
+    return dependency
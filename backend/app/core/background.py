@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# In-flight background work by key; also keeps strong references so tasks aren't GC'd mid-run
+_running: Dict[str, asyncio.Task] = {}
+
+def spawn(key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> bool:
+    """
+    Run `func(*args, **kwargs)` in the background unless work with the same key is already
+    running. Returns False when deduplicated. Failures are logged, never raised.
+    """
+    running = _running.get(key)
+    if running and not running.done():
+        return False
+
+    async def runner():
+        try:
+            await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"BACKGROUND: '{key}' failed: {e}")
+        finally:
+            _running.pop(key, None)
+
+    _running[key] = asyncio.create_task(runner())
+    return True
+
+def is_running(key: str) -> bool:
+    running = _running.get(key)
+    return bool(running and not running.done())
+
+async def join(key: str, timeout: Optional[float] = None) -> bool:
+    """
+    Wait for in-flight work under `key` (shielded: a caller giving up doesn't cancel it).
+    Returns True if there was something to wait for and it finished in time.
+    """
+    running = _running.get(key)
+    if not running or running.done():
+        return False
+    try:
+        await asyncio.wait_for(asyncio.shield(running), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+async def shutdown():
+    """Cancel outstanding background work (app shutdown)"""
+    tasks = list(_running.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _running.clear()
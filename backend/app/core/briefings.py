@@ -0,0 +1,45 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List
+from app.core.config import settings
+from app.db.database import get_collection
+from app.models.match import BriefingCache
+
+def briefing_fingerprint(project_title: str, project_description: str, task: Dict, skills: List[str]) -> str:
+    """
+    The briefing prompt's inputs: the project it names, the task as planned and the assignee's
+    skill set (not who they are)
+    """
+    inputs = {
+        "project_title": project_title,
+        "project_description": project_description,
+        "title": task.get("title", ""),
+        "description": task.get("description", ""),
+        "required_skills": sorted(task.get("required_skills", [])),
+        "skills": sorted(skill.lower() for skill in skills)
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+async def cached_briefings(fingerprints: List[str]) -> Dict[str, str]:
+    """fingerprint -> briefing for the unexpired entries among `fingerprints`"""
+    if not fingerprints:
+        return {}
+    cursor = get_collection(BriefingCache).find(
+        {"fingerprint": {"$in": fingerprints}, "expires_at": {"$gt": datetime.utcnow()}},
+        {"fingerprint": 1, "briefing": 1}
+    )
+    return {doc["fingerprint"]: doc["briefing"] async for doc in cursor}
+
+async def store_briefing(fingerprint: str, task_title: str, briefing: str):
+    now = datetime.utcnow()
+    await get_collection(BriefingCache).update_one(
+        {"fingerprint": fingerprint},
+        {"$set": {
+            "task_title": task_title,
+            "briefing": briefing,
+            "created_at": now,
+            "expires_at": now + timedelta(days=settings.BRIEFING_CACHE_TTL_DAYS)
+        }},
+        upsert=True
+    )
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.llm_providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded response for this prompt"""
+
+def interaction_key(prompt: str, schema_name: Optional[str], json_mode: bool) -> str:
+    return hashlib.sha256(f"{schema_name or ''}|{int(json_mode)}|{prompt}".encode()).hexdigest()
+
+class Cassette:
+    """
+    Recorded LLM interactions, one JSON line each: prompt hash, provider, model, latency and
+    response text (prompts are not stored). Later lines win for a repeated key, so a cassette
+    can be re-recorded by appending.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock() # Provider calls run in worker threads
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries[entry["key"]] = entry
+        return self._entries
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(key)
+
+    def record(self, entry: dict):
+        with self._lock:
+            self._load()[entry["key"]] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+_cassettes: Dict[str, Cassette] = {}
+
+def get_cassette(path: Optional[str] = None) -> Cassette:
+    path = path or settings.LLM_CASSETTE_PATH
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+class RecordingProvider(LLMProvider):
+    """LLM_CASSETTE_MODE=record: call the real provider and append each response to the cassette"""
+
+    def __init__(self, inner: LLMProvider, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.name = inner.name
+        self.api_key = inner.api_key
+        self.model_name = inner.model_name
+
+    def complete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        started = time.monotonic()
+        text = self.inner.complete(prompt, temperature, json_mode, timeout, schema_name)
+        self.cassette.record({
+            "key": interaction_key(prompt, schema_name, json_mode),
+            "provider": self.name,
+            "model": self.model_name,
+            "schema": schema_name,
+            "prompt_chars": len(prompt),
+            "latency_ms": round((time.monotonic() - started) * 1000),
+            "recorded_at": datetime.utcnow().isoformat(),
+            "response": text
+        })
+        return text
+
+class ReplayProvider(LLMProvider):
+    """
+    LLM_CASSETTE_MODE=replay: answer from the cassette with no network or API key, optionally
+    sleeping for the recorded latency (LLM_CASSETTE_REPLAY_LATENCY). A prompt that was never
+    recorded raises CassetteMiss, which the agents treat like any other LLM failure.
+    """
+
+    def __init__(self, name: str, cassette: Cassette):
+        super().__init__(api_key="")
+        self.name = name
+        self.cassette = cassette
+        self.model_name = "cassette"
+
+    def _entry(self, prompt: str, json_mode: bool, schema_name: Optional[str]) -> dict:
+        entry = self.cassette.get(interaction_key(prompt, schema_name, json_mode))
+        if entry is None:
+            logger.warning("LLM cassette miss for %s prompt (%d chars)", schema_name or "text", len(prompt))
+            raise CassetteMiss(f"No recorded response in {self.cassette.path}")
+        return entry
+
+    def _latency(self, entry: dict) -> float:
+        return entry.get("latency_ms", 0) / 1000 if settings.LLM_CASSETTE_REPLAY_LATENCY else 0.0
+
+    def complete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        entry = self._entry(prompt, json_mode, schema_name)
+        latency = self._latency(entry)
+        time.sleep(min(latency, timeout))
+        if latency >= timeout:
+            raise TimeoutError(f"Recorded latency exceeds {timeout:.1f}s")
+        return entry["response"]
+
+    async def acomplete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        entry = self._entry(prompt, json_mode, schema_name)
+        latency = self._latency(entry)
+        await asyncio.sleep(min(latency, timeout))
+        if latency >= timeout:
+            raise TimeoutError(f"Recorded latency exceeds {timeout:.1f}s")
+        return entry["response"]
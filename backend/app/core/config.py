@@ -19,6 +19,69 @@ class Settings(BaseSettings):
     # LLM Configuration
     LLM_PROVIDER: str = "gemini"
     LLM_API_KEY: Optional[str] = None
+    LLM_SECONDARY_PROVIDER: Optional[str] = None # Hedge/failover target ("gemini" or "groq"); unset disables hedging
+    GEMINI_API_KEY: Optional[str] = None # Per-provider keys; the primary falls back to LLM_API_KEY
+    GROQ_API_KEY: Optional[str] = None
+    LLM_HEDGE_DELAY_SECONDS: float = 4.0 # Wait this long for the primary before also asking the secondary
+    # LLM_PROVIDER=stub: offline deterministic responses for load tests / CI
+    LLM_STUB_LATENCY_MS: float = 800 # Median latency; 0 answers instantly
+    LLM_STUB_LATENCY_SIGMA: float = 0.5 # Log-normal spread (tail heaviness)
+    LLM_STUB_TOKENS_PER_SECOND: float = 0 # Simulated generation speed; 0 disables
+    LLM_STUB_FAILURE_RATE: float = 0.0 # Fraction of calls failing with a retryable 503
+    LLM_CASSETTE_MODE: str = "off" # "record" appends responses to the cassette, "replay" serves them offline
+    LLM_CASSETTE_PATH: str = "cassettes/llm.jsonl"
+    LLM_CASSETTE_REPLAY_LATENCY: bool = False # Sleep for each interaction's recorded latency on replay
+
+    # Notification retention
+    NOTIFICATION_READ_TTL_DAYS: int = 30 # Read notifications are expired by a TTL index
+    NOTIFICATION_ARCHIVE_AFTER_DAYS: int = 90 # Unread notifications older than this are archived
+    NOTIFICATION_ARCHIVE_INTERVAL_MINUTES: int = 60 # 0 disables the archival job
+    NOTIFICATION_ARCHIVE_BATCH_SIZE: int = 500
+
+    # Project health
+    HEALTH_SNAPSHOT_MAX_AGE_MINUTES: int = 60 # Upper bound on how long a stored snapshot is served
+    DEADLINE_SWEEP_INTERVAL_MINUTES: int = 15 # 0 disables the background deadline/health sweep
+    DEADLINE_ALERT_DAYS: int = 7 # Sweep projects due within this many days (and overdue ones)
+    FORECAST_SIMULATIONS: int = 20000 # Default Monte Carlo runs for /projects/{id}/forecast
+
+    # LLM call policy
+    LLM_TIMEOUT_SECONDS: float = 30.0 # Deadline per provider call attempt
+    LLM_TOTAL_DEADLINE_SECONDS: float = 60.0 # Deadline for a call including retries
+    LLM_MAX_RETRIES: int = 2 # Retries after the first attempt (timeouts, 429, 5xx, connection errors)
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5 # Full-jitter exponential backoff base
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5 # Consecutive failed calls (after retries) that open the circuit
+    LLM_BREAKER_RESET_SECONDS: float = 30.0 # How long an open circuit fails fast before a probe call
+    LLM_RATE_LIMIT_BACKEND: str = "memory" # "memory" (per process) or "mongo" (quota shared by all workers)
+    LLM_REQUESTS_PER_MINUTE: int = 0 # Per-provider request quota; 0 disables
+    LLM_TOKENS_PER_MINUTE: int = 0 # Per-provider token quota (estimated); 0 disables
+    LLM_RESPONSE_TOKENS_ESTIMATE: int = 2000 # Output tokens charged per call on top of the prompt estimate
+
+    # Planning
+    PLAN_CACHE_TTL_HOURS: int = 24 # Cached planner output per plan fingerprint
+    SPECULATIVE_PLANNING_CONCURRENCY: int = 1 # Background plans in flight at once; 0 disables speculation
+
+    # Job queue
+    JOB_WORKERS: int = 2 # Worker tasks inside the API process; 0 = run `python -m app.worker` separately
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300 # Lease length; renewed while the job runs
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: int = 5 # Doubled per attempt
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0 # Idle wait between claim attempts
+    JOB_RESULT_TTL_HOURS: int = 24 # Finished jobs (and their results) are kept this long
+
+    # Admission control (LLM-backed endpoints)
+    ADMISSION_CONCURRENCY: int = 4 # Requests per endpoint calling the LLM at once; 0 disables the limit
+    ADMISSION_QUEUE_SIZE: int = 8 # Requests allowed to wait for a slot; beyond this they are shed (429/degraded)
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 15.0 # Longest wait for a slot before shedding
+
+    # Matching
+    PLAN_HANDOFF_TTL_MINUTES: int = 30 # How long a match-preview result can be claimed by project creation
+    MATCH_RESPONSE_MODE: str = "compact" # "compact": briefings for the core team only, score lines for the rest; "full": briefings for everyone
+    MATCH_PIPELINE: str = "two_stage" # "two_stage": score and assign first, then brief the core team in parallel; "single": one LLM call
+    MATCH_SCORING: str = "llm" # Two-stage scoring pass: "llm" (no briefings in the prompt) or "keyword" (deterministic, no LLM call)
+    MATCH_SCORING_MODEL: Optional[str] = None # Faster model for the LLM scoring pass (primary provider); unset uses GEMINI_MODEL / GROQ_MODEL
+    MATCH_BRIEFING_CONCURRENCY: int = 4 # Briefing calls in flight at once per match
+    BRIEFING_CACHE_TTL_DAYS: int = 30 # Briefings are cached per (task, employee skills) fingerprint
 
     model_config = SettingsConfigDict(env_file=str(ENV_FILE), extra="ignore")
 
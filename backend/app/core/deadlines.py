@@ -0,0 +1,113 @@
+import re
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# "Day 3", "Day 1-2", "Days 3–4", "Day 1 (Recovery)" -> the last day of the range
+_DAY_RE = re.compile(r"\bdays?\s*(\d+)(?:\s*[-–]\s*(\d+))?", re.IGNORECASE)
+_WEEK_RE = re.compile(r"\bweeks?\s*(\d+)(?:\s*[-–]\s*(\d+))?", re.IGNORECASE)
+# "3 days", "2 weeks", "4 hours"
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(hour|hr|day|week)s?\b", re.IGNORECASE)
+
+def parse_deadline(deadline: Optional[str]) -> Optional[datetime]:
+    """ISO deadline string -> naive UTC datetime (None if missing or unparseable)"""
+    if not deadline:
+        return None
+    try:
+        deadline_dt = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return None
+    if deadline_dt.tzinfo is not None:
+        deadline_dt = deadline_dt.replace(tzinfo=None) - deadline_dt.utcoffset()
+    return deadline_dt
+
+def _start_of_day(dt: datetime) -> datetime:
+    return datetime.combine(dt.date(), datetime.min.time())
+
+def resolve_task_due(label: Optional[str], start: datetime) -> Optional[datetime]:
+    """
+    Resolve a planner deadline label to an absolute due date.
+    Relative labels count from `start`: "Day N" is due at the end of day N (day 1 is the
+    start day), "Week N" at the end of its seventh day. Labels that name no point in
+    time ("TBD", "After Feature X") resolve to None.
+    """
+    if not label:
+        return None
+    text = label.strip()
+
+    absolute = parse_deadline(text)
+    if absolute:
+        return absolute
+
+    day_zero = _start_of_day(start)
+    match = _DAY_RE.search(text)
+    if match:
+        day = int(match.group(2) or match.group(1))
+        return day_zero + timedelta(days=max(day, 1))
+
+    match = _WEEK_RE.search(text)
+    if match:
+        week = int(match.group(2) or match.group(1))
+        return day_zero + timedelta(days=7 * max(week, 1))
+
+    match = _DURATION_RE.search(text)
+    if match:
+        amount, unit = float(match.group(1)), match.group(2).lower()
+        if unit in ("hour", "hr"):
+            return start + timedelta(hours=amount)
+        return day_zero + timedelta(days=amount * (7 if unit == "week" else 1))
+
+    lowered = text.lower()
+    for index, name in enumerate(WEEKDAYS):
+        if name in lowered:
+            ahead = (index - start.weekday()) % 7 or 7
+            return day_zero + timedelta(days=ahead + 1)
+
+    return None
+
+def days_until(deadline_at: Optional[datetime], now: Optional[datetime] = None) -> Optional[int]:
+    if not deadline_at:
+        return None
+    now = now or datetime.utcnow()
+    return (deadline_at.date() - now.date()).days
+
+def project_deadline(project) -> Optional[datetime]:
+    """`deadline_at`, or the parsed `deadline` string for projects not yet normalised"""
+    return getattr(project, "deadline_at", None) or parse_deadline(project.deadline)
+
+def planning_days(project, now: Optional[datetime] = None, default_days: int = 7) -> int:
+    """Days left for a regular plan (at least 1; `default_days` without a deadline)"""
+    delta_days = days_until(project_deadline(project), now)
+    if delta_days is None:
+        return default_days
+    return max(1, delta_days)
+
+def planning_window(project, now: Optional[datetime] = None, default_days: int = 7) -> Tuple[int, bool]:
+    """
+    (days_remaining, is_overdue) for the planner. Overdue projects get a default
+    recovery sprint of `default_days`.
+    """
+    delta_days = days_until(project_deadline(project), now)
+    if delta_days is None:
+        return default_days, False
+    if delta_days < 0:
+        return default_days, True
+    return max(1, delta_days), False
+
+def normalize_project_deadline(project) -> Optional[datetime]:
+    """Keep the indexed `deadline_at` in step with the user-facing `deadline` string"""
+    project.deadline_at = parse_deadline(project.deadline)
+    return project.deadline_at
+
+def normalize_project_schedule(project, now: Optional[datetime] = None):
+    """
+    Parse every deadline on the project once, at write time: the project deadline into
+    `deadline_at` and each task's relative label into `due_at`, counted from `plan_start`
+    (when the current task list was generated; defaults to project creation).
+    """
+    normalize_project_deadline(project)
+    if not project.plan_start:
+        project.plan_start = getattr(project, "created_at", None) or now or datetime.utcnow()
+    for task in project.tasks:
+        task.due_at = resolve_task_due(task.deadline, project.plan_start)
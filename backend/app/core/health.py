@@ -0,0 +1,505 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.deadlines import parse_deadline, project_deadline
+from app.models.project import Project, HealthSnapshot
+from app.core.workload import get_workloads, portfolio_hours
+from app.models.employee import EmployeeWorkload
+
+WEEKLY_CAPACITY_HOURS = 40 # Assume 40h/week capacity per employee
+
+# The health rules' thresholds, shared by evaluate_health() and its aggregation form
+# _health_state_expr() (the /health filter): change them here, never in either function
+HEALTH_THRESHOLDS = {
+    "progress_lag_pct": 15, # Progress this far behind the time-based expectation: warning
+    "deadline_critical_days": 3, # Fewer days left: critical
+    "deadline_warning_days": 7, # Fewer days left: warning
+    "slippage_critical_days": 2, # Critical path finishing more days past the deadline: critical
+    "tasks_critical": 5, # More open tasks on one assignee: critical
+    "tasks_warning": 3,
+    "load_critical_pct": 90, # More of WEEKLY_CAPACITY_HOURS on one assignee: critical
+    "load_warning_pct": 75
+}
+
+def _get(task, key, default=None):
+    if isinstance(task, dict):
+        return task.get(key, default)
+    return getattr(task, key, default)
+
+def summarize_tasks(tasks: List[Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Single pass over a project's tasks collecting everything the health rules need"""
+    now = now or datetime.utcnow()
+    summary = {
+        "total": 0,
+        "completed": 0,
+        "in_progress": 0,
+        "unassigned": 0,
+        "past_due": 0, # open tasks whose resolved due date has passed
+        "loads": {}, # employee id -> open task count
+        "hours": {}  # employee id -> open estimated hours
+    }
+    for t in tasks:
+        summary["total"] += 1
+        status = _get(t, "status", "backlog")
+        if status == "completed":
+            summary["completed"] += 1
+            continue
+        if status == "in_progress":
+            summary["in_progress"] += 1
+        due_at = _get(t, "due_at")
+        if due_at and due_at < now:
+            summary["past_due"] += 1
+
+        assignee = _get(t, "assigned_to")
+        if not assignee:
+            summary["unassigned"] += 1
+            continue
+        eid = str(assignee)
+        summary["loads"][eid] = summary["loads"].get(eid, 0) + 1
+        summary["hours"][eid] = summary["hours"].get(eid, 0) + (_get(t, "estimated_hours", 8) or 0)
+    return summary
+
+def evaluate_health(
+    summary: Dict[str, Any],
+    deadline_dt: Optional[datetime],
+    created_at: Optional[datetime],
+    now: Optional[datetime] = None,
+    portfolio_hours: Optional[Dict[str, float]] = None,
+    projected_finish: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Apply the health rules to a task summary.
+    `portfolio_hours` (employee id -> open hours across all projects, from the workload
+    index) makes the capacity check account for work assigned elsewhere.
+    `projected_finish` (end of the critical path) flags slippage past the deadline.
+
+    Health States (thresholds from HEALTH_THRESHOLDS):
+    - stable (🟢): All metrics within acceptable thresholds
+    - warning (🟡): Minor risks detected (workload > 75%, deadline < 7 days)
+    - critical (🔴): Major risks (overdue, unassigned tasks, overload > 90%)
+
+    Risk Score Calculation:
+    - Task progress < expected progress: +30 points
+    - Employee load > 90%: +40 points
+    - Deadline risk (< 3 days): +20 points
+    - Unassigned/blocked tasks: +50 points
+    """
+    now = now or datetime.utcnow()
+    limits = HEALTH_THRESHOLDS
+    total_tasks = summary["total"]
+    if total_tasks == 0:
+        return {
+            "health": "stable",
+            "issues": [],
+            "metrics": {
+                "total_tasks": 0,
+                "completed": 0,
+                "risk_score": 0,
+                "progress": 0,
+                "expected_progress": 0,
+                "max_load": 0
+            }
+        }
+
+    issues = []
+    health = "stable"
+    risk_score = 0
+
+    completed_tasks = summary["completed"]
+    progress = (completed_tasks / total_tasks) * 100
+
+    # Calculate expected progress based on time elapsed
+    expected_progress = 0
+    days_left = None
+    if deadline_dt:
+        # Assume project started when created
+        created_dt = created_at or now
+        total_duration = (deadline_dt - created_dt).days
+        elapsed = (now - created_dt).days
+
+        if total_duration > 0:
+            expected_progress = (elapsed / total_duration) * 100
+            expected_progress = min(100, max(0, expected_progress))
+
+        days_left = (deadline_dt.date() - now.date()).days
+
+    # 1. Task Progress vs Expected Progress
+    if expected_progress > 0 and progress < (expected_progress - limits["progress_lag_pct"]):
+        issues.append("progress_behind_schedule")
+        risk_score += 30
+        if health == "stable": health = "warning"
+
+    # 2. Deadline Risk
+    if days_left is not None:
+        if days_left < 0:
+            issues.append("deadline_overdue")
+            risk_score += 50
+            health = "overdue" # New strict state
+        elif days_left < limits["deadline_critical_days"]:
+            issues.append("deadline_critical")
+            risk_score += 20
+            health = "critical"
+        elif days_left < limits["deadline_warning_days"]:
+            issues.append("deadline_approaching")
+            risk_score += 10
+            if health == "stable": health = "warning"
+
+    # 2b. Critical path slippage: remaining dependent work cannot finish by the deadline
+    slippage_days = None
+    if projected_finish and deadline_dt:
+        slippage_days = round((projected_finish - deadline_dt).total_seconds() / 86400, 1)
+        if slippage_days > 0:
+            issues.append("critical_path_slippage")
+            risk_score += 30
+            if slippage_days > limits["slippage_critical_days"]:
+                if health != "overdue": health = "critical"
+            elif health == "stable":
+                health = "warning"
+
+    # 3. Unassigned Tasks (Critical Issue)
+    if summary["unassigned"] > 0:
+        issues.append("unassigned_tasks")
+        risk_score += 50
+        health = "critical"
+
+    # 3b. Individual tasks past their resolved due date
+    past_due = summary.get("past_due", 0)
+    if past_due > 0:
+        issues.append("tasks_past_due")
+        risk_score += 20
+        if health == "stable": health = "warning"
+
+    # 4. Employee Workload Analysis
+    employee_loads = summary["loads"]
+    employee_hours = summary["hours"]
+    max_load = max(employee_loads.values()) if employee_loads else 0
+    max_hours = max(employee_hours.values()) if employee_hours else 0
+    portfolio_hours = portfolio_hours or {}
+    max_portfolio_hours = max(
+        (max(portfolio_hours.get(eid, 0), employee_hours.get(eid, 0)) for eid in employee_loads),
+        default=0
+    )
+
+    # Check for overload (> 4 active tasks or > 40 hours)
+    for eid, load in employee_loads.items():
+        hours = max(employee_hours.get(eid, 0), portfolio_hours.get(eid, 0))
+        load_percentage = (hours / WEEKLY_CAPACITY_HOURS) * 100 if hours > 0 else 0
+
+        if load > limits["tasks_critical"] or load_percentage > limits["load_critical_pct"]:
+            issues.append("capacity_critical_overload")
+            risk_score += 40
+            health = "critical"
+        elif load > limits["tasks_warning"] or load_percentage > limits["load_warning_pct"]:
+            issues.append("capacity_near_limit")
+            risk_score += 15
+            if health == "stable": health = "warning"
+
+    return {
+        "health": health,
+        "issues": list(set(issues)),
+        "metrics": {
+            "progress": round(progress, 1),
+            "expected_progress": round(expected_progress, 1),
+            "days_left": days_left if days_left is not None else 0,
+            "max_load": max_load,
+            "max_hours": max_hours,
+            "max_portfolio_hours": max_portfolio_hours,
+            "risk_score": risk_score,
+            "total_tasks": total_tasks,
+            "completed": completed_tasks,
+            "in_progress": summary["in_progress"],
+            "unassigned": summary["unassigned"],
+            "past_due": past_due,
+            "projected_finish": projected_finish.isoformat() if projected_finish else None,
+            "slippage_days": slippage_days
+        }
+    }
+
+def snapshot_valid_until(
+    deadline_dt: Optional[datetime],
+    created_at: Optional[datetime],
+    now: datetime,
+    next_due: Optional[datetime] = None
+) -> datetime:
+    """
+    The date-dependent metrics are whole-day counts, so a snapshot stays exact until
+    the next UTC midnight (days_left) or the next whole day since creation
+    (expected_progress), whichever comes first, capped by HEALTH_SNAPSHOT_MAX_AGE_MINUTES.
+    `next_due` (the earliest upcoming open task due date) ends it early for past_due.
+    """
+    valid_until = now + timedelta(minutes=settings.HEALTH_SNAPSHOT_MAX_AGE_MINUTES)
+    if next_due and next_due > now:
+        valid_until = min(valid_until, next_due)
+    if deadline_dt:
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        valid_until = min(valid_until, next_midnight)
+        if created_at and created_at <= now:
+            elapsed_days = (now - created_at).days
+            valid_until = min(valid_until, created_at + timedelta(days=elapsed_days + 1))
+    return valid_until
+
+def compute_project_health(
+    project: Project,
+    now: Optional[datetime] = None,
+    portfolio_hours: Optional[Dict[str, float]] = None
+) -> HealthSnapshot:
+    now = now or datetime.utcnow()
+    deadline_dt = project_deadline(project)
+    created_at = getattr(project, "created_at", None)
+    projected_finish = project.schedule.get("projected_finish") if project.schedule else None
+    result = evaluate_health(
+        summarize_tasks(project.tasks, now), deadline_dt, created_at, now, portfolio_hours, projected_finish
+    )
+    next_due = min(
+        (t.due_at for t in project.tasks if t.due_at and t.due_at > now and t.status != "completed"),
+        default=None
+    )
+    return HealthSnapshot(
+        **result,
+        computed_at=now,
+        valid_until=snapshot_valid_until(deadline_dt, created_at, now, next_due)
+    )
+
+async def build_health_snapshot(project: Project, now: Optional[datetime] = None) -> HealthSnapshot:
+    """compute_project_health with cross-project load read from the workload index"""
+    assignees = {str(_get(t, "assigned_to")) for t in project.tasks if _get(t, "assigned_to")}
+    workloads = await get_workloads(assignees)
+    return compute_project_health(project, now, portfolio_hours(workloads, project))
+
+async def refresh_health_snapshot(project: Project, now: Optional[datetime] = None) -> HealthSnapshot:
+    """Recompute and attach the snapshot; the caller persists it with its own save()"""
+    project.health_snapshot = await build_health_snapshot(project, now)
+    return project.health_snapshot
+
+_MS_PER_DAY = 86400000
+_EPOCH = datetime(1970, 1, 1)
+
+def _floor_days(later: Any, earlier: Any) -> Dict[str, Any]:
+    """timedelta.days of (later - earlier) as an aggregation expression"""
+    return {"$floor": {"$divide": [{"$subtract": [later, earlier]}, _MS_PER_DAY]}}
+
+def _health_state_expr(now: datetime) -> Dict[str, Any]:
+    """
+    evaluate_health()'s resulting state as an aggregation expression over a portfolio row,
+    so a health filter runs server-side. Every threshold comes from HEALTH_THRESHOLDS; the
+    branch order is evaluate_health()'s precedence (unassigned/overload critical, then
+    overdue, then deadline/slippage critical, then warning). Null when the deadline is only
+    a legacy string not yet normalised into deadline_at: those rows are decided by
+    parse_deadline in Python.
+    """
+    limits = HEALTH_THRESHOLDS
+    has_deadline = {"$ne": [{"$ifNull": ["$deadline_at", None]}, None]}
+    created = {"$ifNull": ["$created_at", now]}
+    total_duration = _floor_days("$deadline_at", created)
+    expected = {"$cond": [
+        {"$and": [has_deadline, {"$gt": [total_duration, 0]}]},
+        {"$min": [100, {"$max": [0, {"$multiply": [{"$divide": [_floor_days(now, created), total_duration]}, 100]}]}]},
+        0
+    ]}
+    progress = {"$multiply": [{"$divide": ["$completed", "$total"]}, 100]}
+    days_left = {"$cond": [
+        has_deadline,
+        # deadline_at.date() - now.date(), in whole UTC days since the epoch
+        {"$subtract": [_floor_days("$deadline_at", _EPOCH), (now - _EPOCH).days]},
+        None
+    ]}
+    slippage = {"$cond": [
+        {"$and": [has_deadline, {"$ne": [{"$ifNull": ["$projected_finish", None]}, None]}]},
+        {"$round": [{"$divide": [{"$subtract": ["$projected_finish", "$deadline_at"]}, _MS_PER_DAY]}, 1]},
+        0
+    ]}
+
+    def any_employee(max_tasks: int, max_load_pct: float) -> Dict[str, Any]:
+        # On the larger of project and portfolio hours, as evaluate_health() does
+        max_hours = WEEKLY_CAPACITY_HOURS * max_load_pct / 100
+        return {"$in": [True, {"$map": {
+            "input": "$workload",
+            "as": "w",
+            "in": {"$or": [
+                {"$gt": ["$$w.tasks", max_tasks]},
+                {"$gt": [{"$max": ["$$w.hours", "$$w.portfolio_hours"]}, max_hours]}
+            ]}
+        }}]}
+
+    return {"$let": {
+        "vars": {"days_left": days_left, "slippage": slippage},
+        "in": {"$switch": {
+            "branches": [
+                {"case": {"$eq": ["$total", 0]}, "then": "stable"},
+                {"case": {"$and": [
+                    {"$eq": [{"$ifNull": ["$deadline_at", None]}, None]},
+                    {"$gt": [{"$ifNull": ["$deadline", ""]}, ""]}
+                ]}, "then": None},
+                {"case": {"$or": [
+                    {"$gt": ["$unassigned", 0]},
+                    any_employee(limits["tasks_critical"], limits["load_critical_pct"])
+                ]}, "then": "critical"},
+                {"case": {"$and": [has_deadline, {"$lt": ["$$days_left", 0]}]}, "then": "overdue"},
+                {"case": {"$or": [
+                    {"$and": [has_deadline, {"$lt": ["$$days_left", limits["deadline_critical_days"]]}]},
+                    {"$gt": ["$$slippage", limits["slippage_critical_days"]]}
+                ]}, "then": "critical"},
+                {"case": {"$or": [
+                    {"$and": [{"$gt": [expected, 0]}, {"$lt": [progress, {"$subtract": [expected, limits["progress_lag_pct"]]}]}]},
+                    {"$and": [has_deadline, {"$lt": ["$$days_left", limits["deadline_warning_days"]]}]},
+                    {"$gt": ["$$slippage", 0]},
+                    {"$gt": ["$past_due", 0]},
+                    any_employee(limits["tasks_warning"], limits["load_warning_pct"])
+                ]}, "then": "warning"}
+            ],
+            "default": "stable"
+        }}
+    }}
+
+def portfolio_health_pipeline(
+    match: Optional[Dict[str, Any]] = None,
+    now: Optional[datetime] = None,
+    health: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Aggregation producing, per project, the same counts summarize_tasks() builds in Python:
+    tasks are unwound once, grouped per (project, open assignee), then folded per project.
+    Each assignee's portfolio-wide hours are joined from the workload index, and `health`
+    keeps only projects in those states.
+    """
+    now = now or datetime.utcnow()
+    open_task = {"$and": [
+        {"$ifNull": ["$tasks", False]},
+        {"$ne": ["$tasks.status", "completed"]}
+    ]}
+    assigned_open_task = {"$and": [open_task, {"$ifNull": ["$tasks.assigned_to", False]}]}
+    # A missing due_at falls back to `now`, which is never "< now"
+    past_due_task = {"$and": [open_task, {"$lt": [{"$ifNull": ["$tasks.due_at", now]}, now]}]}
+
+    pipeline = [
+        {"$match": match or {}},
+        {"$project": {
+            "title": 1, "status": 1, "deadline": 1, "deadline_at": 1, "created_at": 1, "tasks": 1,
+            "projected_finish": "$schedule.projected_finish"
+        }},
+        {"$unwind": {"path": "$tasks", "preserveNullAndEmptyArrays": True}},
+        {"$group": {
+            "_id": {
+                "project": "$_id",
+                "assignee": {"$cond": [assigned_open_task, "$tasks.assigned_to", None]}
+            },
+            "title": {"$first": "$title"},
+            "status": {"$first": "$status"},
+            "deadline": {"$first": "$deadline"},
+            "deadline_at": {"$first": "$deadline_at"},
+            "created_at": {"$first": "$created_at"},
+            "projected_finish": {"$first": "$projected_finish"},
+            "total": {"$sum": {"$cond": [{"$ifNull": ["$tasks", False]}, 1, 0]}},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$tasks.status", "completed"]}, 1, 0]}},
+            "in_progress": {"$sum": {"$cond": [{"$eq": ["$tasks.status", "in_progress"]}, 1, 0]}},
+            "unassigned": {"$sum": {"$cond": [
+                {"$and": [open_task, {"$eq": [{"$ifNull": ["$tasks.assigned_to", None]}, None]}]}, 1, 0
+            ]}},
+            "past_due": {"$sum": {"$cond": [past_due_task, 1, 0]}},
+            "open_tasks": {"$sum": {"$cond": [assigned_open_task, 1, 0]}},
+            "open_hours": {"$sum": {"$cond": [assigned_open_task, {"$ifNull": ["$tasks.estimated_hours", 8]}, 0]}}
+        }},
+        {"$group": {
+            "_id": "$_id.project",
+            "title": {"$first": "$title"},
+            "status": {"$first": "$status"},
+            "deadline": {"$first": "$deadline"},
+            "deadline_at": {"$first": "$deadline_at"},
+            "created_at": {"$first": "$created_at"},
+            "projected_finish": {"$first": "$projected_finish"},
+            "total": {"$sum": "$total"},
+            "completed": {"$sum": "$completed"},
+            "in_progress": {"$sum": "$in_progress"},
+            "unassigned": {"$sum": "$unassigned"},
+            "past_due": {"$sum": "$past_due"},
+            "workload": {"$push": {
+                "employee_id": "$_id.assignee",
+                "tasks": "$open_tasks",
+                "hours": "$open_hours"
+            }}
+        }},
+        {"$project": {
+            "title": 1, "status": 1, "deadline": 1, "deadline_at": 1, "created_at": 1, "projected_finish": 1,
+            "total": 1, "completed": 1, "in_progress": 1, "unassigned": 1, "past_due": 1,
+            "workload": {"$filter": {
+                "input": "$workload",
+                "as": "w",
+                "cond": {"$ne": ["$$w.employee_id", None]}
+            }}
+        }},
+        {"$lookup": {
+            "from": EmployeeWorkload.Settings.name,
+            "localField": "workload.employee_id",
+            "foreignField": "employee_id",
+            "as": "portfolio"
+        }},
+        # Same as portfolio_hours(): the index total minus this project's indexed entry, plus its live hours
+        {"$set": {"workload": {"$map": {
+            "input": "$workload",
+            "as": "w",
+            "in": {"$mergeObjects": ["$$w", {"portfolio_hours": {"$let": {
+                "vars": {"index": {"$arrayElemAt": [
+                    {"$filter": {"input": "$portfolio", "as": "p", "cond": {"$eq": ["$$p.employee_id", "$$w.employee_id"]}}},
+                    0
+                ]}},
+                "in": {"$add": [
+                    "$$w.hours",
+                    {"$ifNull": ["$$index.open_hours", 0]},
+                    {"$multiply": [-1, {"$sum": {"$map": {
+                        "input": {"$filter": {
+                            "input": {"$ifNull": ["$$index.projects", []]},
+                            "as": "entry",
+                            "cond": {"$eq": ["$$entry.project_id", "$_id"]}
+                        }},
+                        "as": "entry",
+                        "in": "$$entry.open_hours"
+                    }}}]}
+                ]}
+            }}}]}
+        }}}},
+        {"$unset": "portfolio"}
+    ]
+    if health:
+        pipeline += [
+            {"$set": {"health_state": _health_state_expr(now)}},
+            # Null: legacy deadline string, evaluated (and filtered) in Python
+            {"$match": {"health_state": {"$in": list(health) + [None]}}}
+        ]
+    return pipeline + [{"$sort": {"title": 1}}]
+
+def evaluate_portfolio_row(row: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Turn one aggregated project row into the /health payload shape"""
+    workload = row.get("workload", [])
+    summary = {
+        "total": row.get("total", 0),
+        "completed": row.get("completed", 0),
+        "in_progress": row.get("in_progress", 0),
+        "unassigned": row.get("unassigned", 0),
+        "past_due": row.get("past_due", 0),
+        "loads": {str(w["employee_id"]): w["tasks"] for w in workload},
+        "hours": {str(w["employee_id"]): w["hours"] for w in workload}
+    }
+    result = evaluate_health(
+        summary,
+        row.get("deadline_at") or parse_deadline(row.get("deadline")),
+        row.get("created_at"),
+        now,
+        {str(w["employee_id"]): w.get("portfolio_hours", w["hours"]) for w in workload},
+        row.get("projected_finish")
+    )
+    return {
+        "project_id": str(row["_id"]),
+        "title": row.get("title"),
+        "status": row.get("status"),
+        "deadline": row.get("deadline"),
+        **result,
+        "workload": [
+            {
+                "employee_id": str(w["employee_id"]),
+                "active_tasks": w["tasks"],
+                "open_hours": w["hours"],
+                "portfolio_hours": w.get("portfolio_hours", w["hours"])
+            }
+            for w in workload
+        ]
+    }
@@ -0,0 +1,224 @@
+import asyncio
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument, ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure
+from app.core.config import settings
+from app.core.ratelimit import RateLimitTimeout
+from app.core.resilience import CircuitOpenError, is_retryable
+from app.db.database import get_collection
+from app.models.job import Job, JobStatus
+from app.models.user import User
+
+JobHandler = Callable[[dict, Optional[User]], Awaitable[Any]]
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (bad input, missing project)"""
+
+def _causes(error: BaseException):
+    """The error and what it wraps: routes re-raise failures as HTTPException(500) inside `except`"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    Retry only failures that can clear by themselves: 429 (overloaded), an open LLM circuit,
+    exhausted quota, timeouts, connection and 5xx provider/database errors anywhere in the
+    chain. 4xx responses, bad model output (JSON/schema) and bugs fail the job at once
+    instead of repeating full LLM calls.
+    """
+    if isinstance(error, PermanentJobError):
+        return True
+    for cause in _causes(error):
+        if isinstance(cause, HTTPException):
+            if cause.status_code == 429:
+                return False
+            if cause.status_code < 500:
+                return True
+            continue # A route's 500 wrapper: judge what it wrapped
+        if isinstance(cause, (CircuitOpenError, RateLimitTimeout, ConnectionFailure)) or is_retryable(cause):
+            return False
+    return True
+
+def _describe(error: Exception) -> str:
+    return str(getattr(error, "detail", None) or error)
+
+class JobQueue:
+    """
+    Mongo-backed queue for agent work. Workers run as tasks in the API process
+    (JOB_WORKERS) and/or in separate `python -m app.worker` processes; all of them claim
+    from the same collection, so LLM throughput scales independently of the API tier.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, JobHandler] = {}
+        self.priorities: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._last_recovery = 0.0
+
+    def register(self, kind: str, handler: JobHandler, priority: int = 5):
+        self.handlers[kind] = handler
+        self.priorities[kind] = priority
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        created_by=None,
+        priority: Optional[int] = None
+    ) -> Job:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(
+            kind=kind,
+            payload=jsonable_encoder(payload),
+            priority=self.priorities[kind] if priority is None else priority,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            created_by=created_by
+        )
+        await job.insert()
+        return job
+
+    async def claim(self, worker_id: str) -> Optional[Job]:
+        """Atomically take the highest-priority due job and lease it to `worker_id`"""
+        now = datetime.utcnow()
+        doc = await get_collection(Job).find_one_and_update(
+            {"status": JobStatus.QUEUED, "run_after": {"$lte": now}, "kind": {"$in": list(self.handlers)}},
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "worker_id": worker_id,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        return Job.model_validate(doc) if doc else None
+
+    async def recover_expired_leases(self) -> int:
+        """Requeue running jobs whose lease lapsed, or fail them once out of attempts"""
+        now = datetime.utcnow()
+        collection = get_collection(Job)
+        expired = {"status": JobStatus.RUNNING, "lease_expires_at": {"$lt": now}}
+        requeued = await collection.update_many(
+            {**expired, "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": JobStatus.QUEUED, "worker_id": None, "error": "Lease expired"}}
+        )
+        failed = await collection.update_many(
+            expired,
+            {"$set": {
+                "status": JobStatus.FAILED,
+                "error": "Lease expired on final attempt",
+                "finished_at": now,
+                "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS)
+            }}
+        )
+        return requeued.modified_count + failed.modified_count
+
+    async def _finish(self, job: Job, worker_id: str, fields: dict):
+        # Guarded on the lease owner: a worker that lost its lease must not overwrite the new run
+        await get_collection(Job).update_one(
+            {"_id": job.id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {"$set": fields}
+        )
+
+    async def _heartbeat(self, job: Job, worker_id: str):
+        interval = max(1, settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3)
+        while True:
+            await asyncio.sleep(interval)
+            await get_collection(Job).update_one(
+                {"_id": job.id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)}}
+            )
+
+    async def execute(self, job: Job, worker_id: str):
+        heartbeat = asyncio.create_task(self._heartbeat(job, worker_id))
+        try:
+            user = await User.get(job.created_by) if job.created_by else None
+            result = await self.handlers[job.kind](job.payload, user)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            now = datetime.utcnow()
+            if _is_permanent(e) or job.attempts >= job.max_attempts:
+                print(f"JOBS: {job.kind} {job.id} failed: {_describe(e)}")
+                await self._finish(job, worker_id, {
+                    "status": JobStatus.FAILED,
+                    "error": _describe(e),
+                    "finished_at": now,
+                    "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS)
+                })
+            else:
+                backoff = settings.JOB_RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1))
+                print(f"JOBS: {job.kind} {job.id} attempt {job.attempts} failed, retrying in {backoff}s: {_describe(e)}")
+                await self._finish(job, worker_id, {
+                    "status": JobStatus.QUEUED,
+                    "error": _describe(e),
+                    "worker_id": None,
+                    "run_after": now + timedelta(seconds=backoff)
+                })
+        else:
+            now = datetime.utcnow()
+            await self._finish(job, worker_id, {
+                "status": JobStatus.SUCCEEDED,
+                "result": jsonable_encoder(result),
+                "error": None,
+                "finished_at": now,
+                "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS)
+            })
+        finally:
+            heartbeat.cancel()
+
+    async def work(self, worker_id: str):
+        """Worker loop: claim, run, repeat; sleeps when the queue is empty"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if loop.time() - self._last_recovery > settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3:
+                    self._last_recovery = loop.time()
+                    await self.recover_expired_leases()
+                job = await self.claim(worker_id)
+                if job:
+                    await self.execute(job, worker_id)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Database hiccups must not kill the worker
+                print(f"JOBS: worker {worker_id} error: {e}")
+                traceback.print_exc()
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+
+    def start(self, workers: int):
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        for n in range(workers):
+            self._tasks.append(asyncio.create_task(self.work(f"{base}:{n}"), name=f"job-worker:{n}"))
+
+    async def stop(self):
+        # Cancelled jobs keep their lease until it expires, then another worker retries them
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def serve(self, workers: int):
+        """Run workers until cancelled (standalone worker process)"""
+        self.start(workers)
+        await asyncio.gather(*self._tasks)
+
+def job_ticket(job: Job) -> dict:
+    """202 response body for an enqueued job"""
+    return {"job_id": str(job.id), "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+job_queue = JobQueue()
@@ -0,0 +1,191 @@
+"""
+Tolerant parsing for model output. A response that is almost JSON (markdown fences, prose
+around the object, a trailing comma, or cut off mid-array by the token limit) is repaired
+instead of discarding the whole multi-second call, and list items that fail the schema are
+dropped individually rather than failing the response.
+"""
+import json
+import typing
+from typing import Any, List, Optional, Tuple
+from pydantic import BaseModel, ValidationError
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+def _is_scalar(token: str) -> bool:
+    try:
+        return not isinstance(json.loads(token), (dict, list))
+    except json.JSONDecodeError:
+        return False
+
+def _scan(text: str, start: int) -> Tuple[Optional[int], List[Tuple[int, List[str]]], List[str]]:
+    """
+    Walk the JSON value starting at `start`. Returns (end index if the outermost value closed,
+    cut points after each complete element (container, string value, or number/literal ended
+    by a delimiter) and after each comma, with the open-bracket stack there, open-bracket stack at the end of the text).
+    """
+    stack: List[str] = []
+    expect_key: List[bool] = [] # Per open bracket: an object whose next string is a key
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = False
+    string_is_key = False
+    escaped = False
+    token_start = None # Start of the number/literal being read
+
+    def end_token(i: int):
+        nonlocal token_start
+        if token_start is not None and _is_scalar(text[token_start:i]):
+            cuts.append((i, list(stack)))
+        token_start = None
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    cuts.append((i + 1, list(stack)))
+            continue
+        if ch in ' \t\r\n{}[],:"':
+            end_token(i)
+        elif token_start is None:
+            token_start = i
+        if ch == '"':
+            in_string = True
+            string_is_key = bool(expect_key) and expect_key[-1]
+        elif ch in _CLOSERS:
+            stack.append(ch)
+            expect_key.append(ch == "{")
+        elif ch in "}]":
+            if not stack:
+                return i, cuts, stack
+            stack.pop()
+            expect_key.pop()
+            if not stack:
+                return i, cuts, stack
+            cuts.append((i + 1, list(stack)))
+        elif ch == ":" and expect_key:
+            expect_key[-1] = False
+        elif ch == ",":
+            if expect_key:
+                expect_key[-1] = stack[-1] == "{"
+            cuts.append((i, list(stack)))
+    # A number or literal running into the end of the text may itself be cut short ("12" of
+    # "120", "tru"): only a delimiter proves it complete, so no cut there
+    return None, cuts, stack
+
+def _drop_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, outside strings"""
+    out = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(ch)
+    return "".join(out)
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Best-effort JSON text for a model response: the outermost object/array with leading prose
+    and trailing garbage removed, stray trailing commas dropped, and a truncated value cut back
+    to its last complete element and closed. None when there is no JSON to recover.
+
+    >>> repair_json('[1,2,')
+    '[1,2]'
+    >>> repair_json('[1,2')
+    '[1]'
+    >>> repair_json('{"a":{"b":1}')
+    '{"a":{"b":1}}'
+    >>> repair_json('{"tasks":[],"total":12')
+    '{"tasks":[]}'
+    """
+    text = _strip_fences(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    start = min(starts)
+    end, cuts, stack = _scan(text, start)
+    if end is not None:
+        return _drop_trailing_commas(text[start:end + 1])
+    if not cuts:
+        return None
+    # Truncated: keep everything up to the last complete element, then close what is open
+    cut, open_stack = cuts[-1]
+    body = text[start:cut].rstrip().rstrip(",")
+    return _drop_trailing_commas(body + "".join(_CLOSERS[b] for b in reversed(open_stack)))
+
+def parse_json(text: str) -> Tuple[Any, bool]:
+    """(value, repaired). Raises json.JSONDecodeError when nothing parseable can be recovered."""
+    cleaned = _strip_fences(text)
+    try:
+        return json.loads(cleaned), False
+    except json.JSONDecodeError as e:
+        repaired = repair_json(cleaned)
+        if repaired is None:
+            raise e
+        return json.loads(repaired), True
+
+def _model_list_item(annotation) -> Optional[type]:
+    """The item model of a List[Model] field annotation, else None"""
+    if typing.get_origin(annotation) in (list, List):
+        args = typing.get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0]
+    return None
+
+def validate_partial(schema: type[BaseModel], data: Any) -> Tuple[BaseModel, int]:
+    """
+    Validate `data` against `schema`, salvaging what is usable: items of List[Model] fields
+    that fail validation are dropped. Missing scalars are not invented; a schema that can
+    derive one from the salvaged items does so in its own validator. Returns (model, dropped
+    item count). Raises ValidationError if a list of items ends up empty or the result is
+    still invalid.
+    """
+    try:
+        return schema(**data), 0
+    except (ValidationError, TypeError):
+        if not isinstance(data, dict):
+            raise
+    salvaged = dict(data)
+    dropped = 0
+    for name, field in schema.model_fields.items():
+        item_model = _model_list_item(field.annotation)
+        if item_model and isinstance(salvaged.get(name), list):
+            kept = []
+            for item in salvaged[name]:
+                try:
+                    kept.append(item_model.model_validate(item).model_dump())
+                except ValidationError:
+                    dropped += 1
+            if not kept:
+                # Nothing usable: let validation fail so the caller falls back
+                salvaged.pop(name)
+                break
+            salvaged[name] = kept
+    return schema(**salvaged), dropped
@@ -1,49 +1,209 @@
-import os
 import json
-from typing import Dict, Any, Optional
-import google.generativeai as genai
-from groq import Groq
-from pydantic import BaseModel
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from pydantic import BaseModel, ValidationError
 from app.core.config import settings
+from app.core.llm_providers import LLMProvider, build_provider, provider_api_key
+from app.core.cassette import RecordingProvider, ReplayProvider, get_cassette
+from app.core.metrics import Counter
+from app.core import ratelimit
+from app.core.json_repair import parse_json, validate_partial
+from app.core.resilience import CircuitOpenError, HALF_OPEN, get_breaker, is_retryable, backoff_delay, llm_retries, llm_timeouts
+from app.core.telemetry import llm_requests, llm_provider_latency, llm_prompt_tokens, llm_response_tokens, llm_parse_failures, llm_salvaged
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+llm_hedged_calls = Counter("llm_hedged_calls_total", "Calls re-issued to the secondary provider (reason: slow or error)")
+llm_hedge_wins = Counter("llm_hedge_wins_total", "Hedged calls answered first by each provider")
 
 class LLMClient:
     """
-    Unified LLM client supporting Google Gemini and Groq.
+    Unified LLM client supporting Google Gemini and Groq (and an offline stub for load tests).
     Handles structured JSON responses for agent workflows.
+    
+    Blocking SDK calls run in a worker thread (the stub and cassette replay sleep on the
+    event loop) under a per-attempt timeout.
+    Retryable errors are retried with jittered exponential backoff within an overall
+    deadline, and a per-provider circuit breaker fails calls fast while the provider is down.
+    
+    LLM_CASSETTE_MODE=record|replay records provider responses to, or serves them from,
+    an on-disk cassette keyed by prompt hash (app/core/cassette.py).
+    
+    With LLM_SECONDARY_PROVIDER set, calls are hedged: if the primary has not returned a
+    valid response within LLM_HEDGE_DELAY_SECONDS (or failed), the same request goes to the
+    secondary and the first valid answer wins; the other call is cancelled.
     """
     
-    def __init__(self):
+    def __init__(self, agent: str = "unknown", model: Optional[str] = None):
+        self.agent = agent # Telemetry label: which agent is calling
         self.provider = settings.LLM_PROVIDER
-        self.api_key = settings.LLM_API_KEY
+        self.api_key = provider_api_key(self.provider, primary=True)
+        self.secondary: Optional[LLMProvider] = None
+        cassette_mode = settings.LLM_CASSETTE_MODE
         
-        if not self.api_key:
-            # Fallback for local dev
-            self.api_key = os.getenv("GOOGLE_API_KEY")
+        if cassette_mode == "replay":
+            # Offline: recorded responses only, no key, no hedging
+            self.primary = ReplayProvider(self.provider, get_cassette())
+            self.model_name = self.primary.model_name
+            return
         
         if not self.api_key:
             raise ValueError("LLM_API_KEY not found in environment variables")
         
-        if self.provider == "gemini":
-            genai.configure(api_key=self.api_key)
-            self.model_name = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
-            self.model = genai.GenerativeModel(self.model_name)
-        elif self.provider == "groq":
-            self.client = Groq(api_key=self.api_key)
-            # Use the latest supported Groq model
-            self.model_name = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        # `model` overrides the primary's model only (e.g. a faster one for a cheap pass)
+        self.primary = build_provider(self.provider, self.api_key, model)
+        self.model_name = self.primary.model_name
+        
+        secondary = settings.LLM_SECONDARY_PROVIDER
+        if secondary and secondary != self.provider:
+            secondary_key = provider_api_key(secondary, primary=False)
+            if secondary_key:
+                self.secondary = build_provider(secondary, secondary_key)
+            else:
+                print(f"WARNING: LLM_SECONDARY_PROVIDER={secondary} has no API key; hedging disabled")
+        
+        if cassette_mode == "record":
+            self.primary = RecordingProvider(self.primary, get_cassette())
+            if self.secondary:
+                self.secondary = RecordingProvider(self.secondary, get_cassette())
     
-    def _clean_json_text(self, text: str) -> str:
-        """Remove markdown code blocks if present"""
-        text = text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        return text.strip()
+    async def _complete(
+        self,
+        provider: LLMProvider,
+        prompt: str,
+        temperature: float,
+        json_mode: bool = False,
+        schema_name: Optional[str] = None
+    ) -> str:
+        """
+        Call one provider with the retry/timeout/breaker policy. Raises CircuitOpenError
+        immediately while the breaker is open, so agents drop to their fallbacks at once.
+        """
+        breaker = get_breaker(provider.name)
+        deadline = time.monotonic() + settings.LLM_TOTAL_DEADLINE_SECONDS
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            started = None # Set once the provider call itself starts
+            try:
+                # Queue for provider quota inside the call's deadline (RateLimitTimeout if it can't fit)
+                await ratelimit.acquire(provider.name, prompt, deadline - time.monotonic())
+                timeout = min(settings.LLM_TIMEOUT_SECONDS, deadline - time.monotonic())
+                started = time.monotonic()
+                llm_prompt_tokens.inc(ratelimit.approx_tokens(prompt), provider=provider.name, model=provider.model_name, agent=self.agent)
+                text = await asyncio.wait_for(
+                    provider.acomplete(prompt, temperature, json_mode, timeout, schema_name),
+                    timeout
+                )
+            except asyncio.CancelledError:
+                # Hedge lost or request gone: says nothing about provider health
+                breaker.release()
+                raise
+            except Exception as e:
+                if started is not None:
+                    outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                    llm_provider_latency.observe(
+                        time.monotonic() - started, provider=provider.name, model=provider.model_name, outcome=outcome
+                    )
+                if isinstance(e, asyncio.TimeoutError):
+                    llm_timeouts.inc(provider=provider.name)
+                if not is_retryable(e):
+                    breaker.release()
+                    raise
+                delay = backoff_delay(attempt)
+                # Out of attempts, or no time left for a meaningful retry: give up now. The
+                # breaker counts the logical call once; a failed half-open probe is not retried.
+                if (breaker.state == HALF_OPEN or attempt > settings.LLM_MAX_RETRIES
+                        or time.monotonic() + delay + 1 >= deadline):
+                    breaker.record_failure()
+                    raise
+                breaker.release()
+                logger.warning(
+                    "LLM %s attempt %d failed (%s: %s), retrying in %.1fs",
+                    provider.name, attempt, type(e).__name__, e, delay
+                )
+                llm_retries.inc(provider=provider.name)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                llm_provider_latency.observe(
+                    time.monotonic() - started, provider=provider.name, model=provider.model_name, outcome="ok"
+                )
+                llm_response_tokens.inc(ratelimit.approx_tokens(text or ""), provider=provider.name, model=provider.model_name, agent=self.agent)
+                return text
+
+    async def _hedged(self, call: Callable[[LLMProvider], Awaitable[T]]) -> T:
+        """Run `call` on the primary, hedging to the secondary when it is slow or fails"""
+        if not self.secondary:
+            return await call(self.primary)
+        
+        primary = asyncio.create_task(call(self.primary))
+        tasks = {primary: self.primary}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=settings.LLM_HEDGE_DELAY_SECONDS)
+            if done and primary.exception() is None:
+                return primary.result()
+            
+            llm_hedged_calls.inc(provider=self.secondary.name, reason="error" if done else "slow")
+            tasks[asyncio.create_task(call(self.secondary))] = self.secondary
+            errors: Dict[str, BaseException] = {}
+            pending = set(task for task in tasks if not task.done())
+            if done:
+                errors[self.primary.name] = primary.exception()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        llm_hedge_wins.inc(provider=tasks[task].name)
+                        return task.result()
+                    errors[tasks[task].name] = task.exception()
+            # Both failed: report the primary's error, it is the configured provider
+            raise errors.get(self.primary.name) or next(iter(errors.values()))
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _structured(
+        self,
+        provider: LLMProvider,
+        prompt: str,
+        response_schema: Optional[type[BaseModel]],
+        temperature: float
+    ) -> Dict[str, Any]:
+        """One provider's answer, parsed and validated; a hedge only wins with a valid response"""
+        text_response = await self._complete(
+            provider, prompt, temperature, json_mode=True,
+            schema_name=response_schema.__name__ if response_schema else None
+        )
+        
+        # Parse JSON response, repairing near-misses (prose around it, trailing commas, truncation)
+        try:
+            result, repaired = parse_json(text_response)
+        except json.JSONDecodeError:
+            llm_parse_failures.inc(provider=provider.name, agent=self.agent, kind="json")
+            raise
+        if repaired:
+            llm_salvaged.inc(provider=provider.name, agent=self.agent, kind="repaired_json")
+        
+        # Validate against schema if provided, keeping the valid items of a partly invalid list
+        if response_schema:
+            try:
+                validated, dropped = validate_partial(response_schema, result)
+            except (ValidationError, TypeError):
+                llm_parse_failures.inc(provider=provider.name, agent=self.agent, kind="schema")
+                raise
+            if dropped:
+                logger.warning("LLM %s response: dropped %d invalid item(s) from %s", provider.name, dropped, response_schema.__name__)
+                llm_salvaged.inc(provider=provider.name, agent=self.agent, kind="dropped_items")
+            return validated.model_dump()
+        
+        return result
 
     async def generate_structured(
         self, 
@@ -54,80 +214,42 @@ class LLMClient:
         """
         Generate a structured JSON response from the LLM.
         """
+        started = time.monotonic()
+        outcome = "error"
         try:
             # Add JSON formatting instruction
             formatted_prompt = f"{prompt}\n\nRespond ONLY with valid JSON. No markdown, no explanations."
-            
-            if self.provider == "gemini":
-                response = self.model.generate_content(
-                    formatted_prompt,
-                    generation_config=genai.GenerationConfig(
-                        temperature=temperature
-                    )
-                )
-                text_response = response.text
-                
-            elif self.provider == "groq":
-                chat_completion = self.client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a helpful assistant that outputs JSON."
-                        },
-                        {
-                            "role": "user",
-                            "content": formatted_prompt
-                        }
-                    ],
-                    model=self.model_name,
-                    temperature=temperature,
-                    response_format={"type": "json_object"},
-                )
-                text_response = chat_completion.choices[0].message.content
-                
-            # Parse JSON response
-            cleaned_text = self._clean_json_text(text_response)
-            result = json.loads(cleaned_text)
-            
-            # Validate against schema if provided
-            if response_schema:
-                validated = response_schema(**result)
-                return validated.model_dump()
-            
+            result = await self._hedged(
+                lambda provider: self._structured(provider, formatted_prompt, response_schema, temperature)
+            )
+            outcome = "ok"
             return result
             
         except json.JSONDecodeError as e:
+            outcome = "invalid_json"
             raise ValueError(f"Failed to parse LLM response as JSON: {e}")
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
         except Exception as e:
-            print(f"DEBUG: LLM generation failed with error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            if isinstance(e, (ValidationError, TypeError)):
+                outcome = "invalid_schema"
+            logger.warning("LLM generation failed for %s: %s", self.agent, e, exc_info=logger.isEnabledFor(logging.DEBUG))
             raise RuntimeError(f"LLM generation failed: {e}")
+        finally:
+            llm_requests.observe(time.monotonic() - started, agent=self.agent, outcome=outcome)
     
     async def generate_text(self, prompt: str, temperature: float = 0.7) -> str:
         """
         Generate a plain text response from the LLM.
         """
+        started = time.monotonic()
+        outcome = "error"
         try:
-            if self.provider == "gemini":
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=genai.GenerationConfig(temperature=temperature)
-                )
-                return response.text
-                
-            elif self.provider == "groq":
-                chat_completion = self.client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    model=self.model_name,
-                    temperature=temperature,
-                )
-                return chat_completion.choices[0].message.content
-                
+            text = await self._hedged(lambda provider: self._complete(provider, prompt, temperature))
+            outcome = "ok"
+            return text
         except Exception as e:
             raise RuntimeError(f"LLM generation failed: {e}")
+        finally:
+            llm_requests.observe(time.monotonic() - started, agent=self.agent, outcome=outcome)
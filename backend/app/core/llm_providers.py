@@ -0,0 +1,156 @@
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+import google.generativeai as genai
+from groq import Groq
+from app.core.config import settings
+from app.core.llm_stub import synthesize
+
+class LLMProvider:
+    """
+    One LLM backend. `complete` is a blocking SDK call; LLMClient awaits `acomplete`, which
+    runs it in a worker thread unless the provider has a native async path.
+    """
+    name = ""
+
+    def __init__(self, api_key: str, model: Optional[str] = None):
+        self.api_key = api_key
+        self.model_name = model or ""
+
+    def complete(
+        self,
+        prompt: str,
+        temperature: float,
+        json_mode: bool,
+        timeout: float,
+        schema_name: Optional[str] = None
+    ) -> str:
+        """`schema_name` names the expected response model; real providers only need the prompt"""
+        raise NotImplementedError
+
+    async def acomplete(
+        self,
+        prompt: str,
+        temperature: float,
+        json_mode: bool,
+        timeout: float,
+        schema_name: Optional[str] = None
+    ) -> str:
+        return await asyncio.to_thread(self.complete, prompt, temperature, json_mode, timeout, schema_name)
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: Optional[str] = None):
+        super().__init__(api_key)
+        genai.configure(api_key=api_key)
+        self.model_name = model or os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def complete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        response = self.model.generate_content(
+            prompt,
+            generation_config=genai.GenerationConfig(
+                temperature=temperature
+            ),
+            request_options={"timeout": timeout}
+        )
+        return response.text
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self, api_key: str, model: Optional[str] = None):
+        super().__init__(api_key)
+        # Retries and timeouts are handled by LLMClient, not the SDK
+        self.client = Groq(api_key=api_key, max_retries=0, timeout=settings.LLM_TIMEOUT_SECONDS)
+        # Use the latest supported Groq model
+        self.model_name = model or os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+    def complete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        messages = [{"role": "user", "content": prompt}]
+        extra = {}
+        if json_mode:
+            messages.insert(0, {
+                "role": "system",
+                "content": "You are a helpful assistant that outputs JSON."
+            })
+            extra["response_format"] = {"type": "json_object"}
+        chat_completion = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model_name,
+            temperature=temperature,
+            timeout=timeout,
+            **extra
+        )
+        return chat_completion.choices[0].message.content
+
+class StubProviderError(RuntimeError):
+    status_code = 503 # Injected failures look like a provider outage: retried, counted by the breaker
+
+class StubProvider(LLMProvider):
+    """
+    Offline provider (LLM_PROVIDER=stub) for load tests and CI. Responses are synthesized
+    deterministically from the prompt (app/core/llm_stub.py); latency is log-normal around
+    LLM_STUB_LATENCY_MS plus output tokens / LLM_STUB_TOKENS_PER_SECOND, and
+    LLM_STUB_FAILURE_RATE of calls fail with a retryable 503.
+    """
+    name = "stub"
+
+    def __init__(self, api_key: str, model: Optional[str] = None):
+        super().__init__(api_key)
+        self.model_name = "stub"
+
+    def _draw_latency(self, text: str) -> float:
+        latency = 0.0
+        if settings.LLM_STUB_LATENCY_MS > 0:
+            latency = random.lognormvariate(0, settings.LLM_STUB_LATENCY_SIGMA) * settings.LLM_STUB_LATENCY_MS / 1000
+        if settings.LLM_STUB_TOKENS_PER_SECOND > 0:
+            latency += (len(text) / 4) / settings.LLM_STUB_TOKENS_PER_SECOND
+        return latency
+
+    def _finish(self, text: str, latency: float, timeout: float) -> str:
+        if latency >= timeout:
+            raise TimeoutError(f"Stub call exceeded {timeout:.1f}s")
+        if random.random() < settings.LLM_STUB_FAILURE_RATE:
+            raise StubProviderError("Injected stub failure")
+        return text
+
+    def complete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        text = synthesize(prompt, schema_name, json_mode)
+        latency = self._draw_latency(text)
+        time.sleep(min(latency, timeout))
+        return self._finish(text, latency, timeout)
+
+    async def acomplete(self, prompt, temperature, json_mode, timeout, schema_name=None) -> str:
+        # Simulated latency is a timer, not a worker thread: under load-test concurrency the
+        # default executor would otherwise be the bottleneck being measured
+        text = synthesize(prompt, schema_name, json_mode)
+        latency = self._draw_latency(text)
+        await asyncio.sleep(min(latency, timeout))
+        return self._finish(text, latency, timeout)
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    GroqProvider.name: GroqProvider,
+    StubProvider.name: StubProvider
+}
+
+def provider_api_key(name: str, primary: bool) -> Optional[str]:
+    """GEMINI_API_KEY / GROQ_API_KEY; the primary provider also accepts LLM_API_KEY (and GOOGLE_API_KEY for local dev)"""
+    if name == StubProvider.name:
+        return "offline" # The stub needs no key
+    key = {"gemini": settings.GEMINI_API_KEY, "groq": settings.GROQ_API_KEY}.get(name)
+    if not key and primary:
+        key = settings.LLM_API_KEY
+        if not key and name == "gemini":
+            key = os.getenv("GOOGLE_API_KEY")
+    return key
+
+def build_provider(name: str, api_key: str, model: Optional[str] = None) -> LLMProvider:
+    """`model` overrides the provider's configured model (GEMINI_MODEL / GROQ_MODEL)"""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {name}")
+    return PROVIDERS[name](api_key, model)
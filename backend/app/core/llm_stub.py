@@ -0,0 +1,150 @@
+"""
+Deterministic synthesis behind LLM_PROVIDER=stub. Each agent prompt is parsed for the facts
+it carries (project, candidates, task pool, remaining scope) and answered with schema-valid
+JSON derived from a hash of the prompt: the same prompt always yields the same response,
+so load tests and benchmarks are repeatable without network access.
+"""
+import hashlib
+import json
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+PHASES = [
+    ("Database Schema Design", ["PostgreSQL", "MongoDB"], "high"),
+    ("Authentication & Authorization", ["OAuth", "JWT"], "high"),
+    ("Core API Endpoints", ["FastAPI", "Python"], "high"),
+    ("Business Logic Services", ["Python"], "medium"),
+    ("Frontend UI Components", ["React", "CSS"], "medium"),
+    ("Frontend-API Integration", ["React", "REST"], "medium"),
+    ("Background Jobs & Notifications", ["Python", "Redis"], "medium"),
+    ("Automated Test Suite", ["Pytest", "Jest"], "medium"),
+    ("CI/CD Pipeline", ["Docker", "GitHub Actions"], "low"),
+    ("Production Deployment", ["Docker", "AWS"], "high")
+]
+
+def seeded(prompt: str) -> random.Random:
+    return random.Random(hashlib.sha256(prompt.encode()).hexdigest())
+
+def _field(prompt: str, label: str, default: str = "") -> str:
+    match = re.search(rf"^\s*-?\s*{re.escape(label)}:\s*(.*)$", prompt, re.MULTILINE)
+    return match.group(1).strip() if match else default
+
+def _section(prompt: str, start: str, end: str) -> str:
+    _, _, rest = prompt.partition(start)
+    return rest.partition(end)[0] if rest else ""
+
+def synthesize_plan(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    title = _field(prompt, "Project", "Project")
+    duration = re.search(r"Project Duration: (\d+) days", prompt)
+    overdue = "OVERDUE" in prompt
+    days = int(duration.group(1)) if duration else 7
+    phases = PHASES[:6] if overdue else PHASES
+
+    tasks = []
+    for i, (name, skills, priority) in enumerate(phases):
+        task_title = f"Recovery: {name}" if overdue else name
+        day = max(1, round(days * (i + 1) / len(phases)))
+        tasks.append({
+            "title": task_title,
+            "description": f"Implement {name.lower()} for {title}.",
+            "estimated_hours": float(rng.choice([4, 6, 8, 10, 12, 16])),
+            "required_skills": skills,
+            "priority": "critical" if overdue and i < 2 else priority,
+            "deadline": f"Day {day}",
+            # A chain with occasional parallel branches: depend on one of the two previous tasks
+            "depends_on": [tasks[max(0, i - rng.choice([1, 2]))]["title"]] if i else []
+        })
+    return {
+        "tasks": tasks,
+        "total_estimated_hours": sum(t["estimated_hours"] for t in tasks),
+        "recommended_team_size": rng.randint(3, 5)
+    }
+
+REMAINING_LINE = re.compile(
+    r"^- key=(?P<key>\S*) \| (?P<title>.*?) \| (?P<hours>[\d.]+)h \| (?P<priority>\w+) \| "
+    r"(?P<deadline>.*?) \| skills: (?P<skills>.*?)(?: \| after: (?P<after>.*))?$",
+    re.MULTILINE
+)
+
+def synthesize_replan(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    remaining = list(REMAINING_LINE.finditer(_section(prompt, "Remaining scope", "Revise ONLY")))
+    tasks = []
+    for i, line in enumerate(remaining):
+        skills = [] if line["skills"] == "-" else [s.strip() for s in line["skills"].split(",")]
+        tasks.append({
+            "key": line["key"],
+            "title": line["title"],
+            "description": "",
+            "estimated_hours": round(float(line["hours"]) * rng.uniform(0.7, 1.1), 1),
+            "required_skills": skills,
+            "priority": line["priority"],
+            "deadline": f"Day {i + 1}",
+            "depends_on": [s.strip() for s in line["after"].split(",")] if line["after"] else []
+        })
+    return {"tasks": tasks, "recommended_team_size": max(1, min(5, len(tasks)))}
+
+CANDIDATE = re.compile(
+    r"^\d+\. (?P<name>.*) \(ID: (?P<id>[^)]+)\)\n\s+Specialization: .*\n\s+Skills: (?P<skills>.*)$",
+    re.MULTILINE
+)
+POOL_TASK = re.compile(r"^\d+\. (?P<title>.*) \(Deadline: (?P<deadline>.*)\)$", re.MULTILINE)
+
+def synthesize_match(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    required = [
+        re.sub(r"\s*\(.*\)$", "", s).strip().lower()
+        for s in _field(prompt, "Required Skills").split(",") if s.strip()
+    ]
+    size = re.match(r"\d+", _field(prompt, "Target Team Size"))
+    team_size = int(size.group()) if size else 3
+    pool = list(POOL_TASK.finditer(_section(prompt, "Task Pool", "Available Candidates")))
+
+    scored = []
+    for cand in CANDIDATE.finditer(prompt):
+        skills = cand["skills"].lower()
+        matched = [r for r in required if r and r in skills]
+        score = min(20.0, 8.0 + 4 * len(matched) + round(rng.uniform(0, 3), 1)) if matched else 0.0
+        scored.append((score, cand, matched))
+    scored.sort(key=lambda row: -row[0])
+
+    compact = '"bench"' in prompt # MATCH_RESPONSE_MODE=compact
+    matches, bench = [], []
+    core = 0
+    for score, cand, matched in scored:
+        is_core = score > 0 and core < team_size
+        if compact and not is_core:
+            if score > 0:
+                bench.append({"employee_id": cand["id"], "match_score": score, "matched_skills": [m.title() for m in matched]})
+            continue
+        task = pool[core % len(pool)] if is_core and pool else None
+        core += 1 if is_core else 0
+        matches.append({
+            "employee_id": cand["id"],
+            "employee_name": cand["name"],
+            "match_score": score if is_core else 0.0,
+            "matched_skills": [m.title() for m in matched],
+            "suggested_task": task["title"] if task else ("General Integration" if is_core else "Backup Support"),
+            "suggested_description": f"Own {task['title']} end to end." if task else "Support the core team as needed.",
+            "suggested_deadline": task["deadline"] if task else "TBD",
+            "suggested_hours": float(rng.choice([4, 6, 8, 12])) if is_core else 0.0,
+            "reasoning": f"Covers {', '.join(matched)}." if matched else "No required skills matched."
+        })
+    if compact:
+        return {"matches": matches, "bench": bench, "total_candidates": len(scored)}
+    return {"matches": matches, "total_candidates": len(matches)}
+
+SYNTHESIZERS = {
+    "PlanResponse": synthesize_plan,
+    "ReplanResponse": synthesize_replan,
+    "MatchResponse": synthesize_match
+}
+
+def synthesize(prompt: str, schema_name: Optional[str], json_mode: bool) -> str:
+    """Response text for a prompt; JSON for structured calls, a short sentence otherwise"""
+    rng = seeded(prompt)
+    if schema_name in SYNTHESIZERS:
+        return json.dumps(SYNTHESIZERS[schema_name](prompt, rng))
+    if json_mode:
+        return "{}"
+    words: List[str] = re.findall(r"[A-Za-z]{4,}", prompt)
+    return "Stub response about " + " ".join(rng.sample(words, min(5, len(words)))) + "."
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+from beanie import PydanticObjectId
+from beanie.operators import In
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from app.agents.matcher_agent import MatcherAgent
+from app.core.config import settings
+from app.core.deadlines import normalize_project_schedule
+from app.core.planning import cached_plan_for, get_or_create_plan
+from app.core.health import refresh_health_snapshot
+from app.core.schedule import build_project_tasks, refresh_schedule
+from app.core.telemetry import record_fallback
+from app.core.workload import sync_project_workload, get_workloads
+from app.db.database import get_collection
+from app.models.employee import EmployeeProfile, Skill
+from app.models.match import MatchRun, RosterVersion, PlanHandoff
+from app.models.project import Project
+from app.models.user import User, UserRole
+
+ROSTER = "employees"
+MATCH_RUN_HISTORY = 5 # Runs kept per project
+
+async def load_candidates(profiles: List[EmployeeProfile]) -> List[dict]:
+    """Profiles with their skills and portfolio-wide workload, in two batched queries"""
+    profile_ids = [p.id for p in profiles]
+    skills = await Skill.find(In(Skill.employee_id, profile_ids)).to_list() if profile_ids else []
+    skills_by_employee = {}
+    for skill in skills:
+        skills_by_employee.setdefault(skill.employee_id, []).append(skill)
+    workloads = await get_workloads(profile_ids)
+
+    candidates = []
+    for profile in profiles:
+        workload = workloads.get(str(profile.id))
+        candidates.append({
+            "profile": profile,
+            "skills": skills_by_employee.get(profile.id, []),
+            "workload": {
+                "active_tasks": workload.active_tasks if workload else 0,
+                "open_hours": workload.open_hours if workload else 0.0
+            }
+        })
+    return candidates
+
+async def current_roster_version() -> int:
+    doc = await RosterVersion.find_one(RosterVersion.name == ROSTER)
+    return doc.version if doc else 0
+
+async def bump_roster_version() -> int:
+    """Invalidate every persisted match run (call after any profile/skill/signup write)"""
+    doc = await get_collection(RosterVersion).find_one_and_update(
+        {"name": ROSTER},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+def match_fingerprint(project: Project, roster_version: int) -> str:
+    """
+    Hash of everything the matcher reads from the project, plus the roster version.
+    Workload counters are deliberately left out: they move with every task update
+    portfolio-wide and would make runs stale almost immediately. So are task keys (legacy
+    tasks get a fresh one on every load until backfilled) and status, which the matcher
+    never reads.
+    """
+    payload = {
+        "title": project.title,
+        "description": project.description,
+        "required_skills": sorted((s.skill_name, s.level) for s in project.required_skills),
+        "experience_required": project.experience_required,
+        "team_size": project.team_size,
+        "assigned_team": sorted(str(e) for e in project.assigned_team),
+        "tasks": [
+            [t.title, t.description, t.estimated_hours, sorted(t.required_skills), t.priority, t.deadline]
+            for t in project.tasks
+        ],
+        "roster_version": roster_version
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def draft_fingerprint(project: Project) -> str:
+    """Hash of the draft fields a preview plan depends on"""
+    payload = {
+        "title": project.title,
+        "description": project.description,
+        "required_skills": sorted((s.skill_name, s.level) for s in project.required_skills),
+        "experience_required": project.experience_required,
+        "deadline": project.deadline or None
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+async def latest_match_run(project_id: PydanticObjectId) -> Optional[MatchRun]:
+    return await MatchRun.find(MatchRun.project_id == project_id).sort([("version", DESCENDING)]).first_or_none()
+
+async def run_match(project: Project, degraded: bool = False) -> Tuple[Any, bool]:
+    """
+    The LLM matching pass: (matches, cacheable). Plans and persists tasks first if the
+    project has none; a run built on the placeholder task (planning failed) is not cacheable.
+    `degraded` (admission overload) makes no LLM calls: cached plan only, keyword matching.
+    """
+    # If the project has an assigned team, we ONLY match those employees
+    if project.assigned_team:
+        profiles = await EmployeeProfile.find(In(EmployeeProfile.id, project.assigned_team)).to_list()
+    else:
+        # Get all employee users first to exclude admins
+        employees_users = await User.find(User.role == UserRole.EMPLOYEE).to_list()
+        employee_user_ids = [u.id for u in employees_users]
+        profiles = await EmployeeProfile.find(In(EmployeeProfile.user_id, employee_user_ids)).to_list()
+
+    candidates = await load_candidates(profiles)
+    if not candidates:
+        return {"matches": [], "total_candidates": 0}, False
+
+    # 1. Use existing tasks if available, otherwise generate
+    cacheable = True
+    tasks = project.tasks or []
+    if not tasks and degraded:
+        plan = await cached_plan_for(project)
+        if plan:
+            tasks = plan.get("tasks", [])
+        else:
+            record_fallback("planner", "degraded")
+            tasks = [{"title": "General System Integration", "description": "Execute core project modules", "required_skills": []}]
+    elif not tasks:
+        try:
+            plan = await get_or_create_plan(project)
+            tasks = plan.get("tasks", [])
+            # Persist these tasks so they stay consistent
+            project.tasks = build_project_tasks(tasks)
+            project.plan_start = datetime.utcnow()
+            normalize_project_schedule(project)
+            refresh_schedule(project)
+            await refresh_health_snapshot(project)
+            await project.save()
+            await sync_project_workload(project)
+        except Exception as e:
+            print(f"Warning: Task planning failed: {e}")
+            record_fallback("planner", "llm_error")
+            tasks = [{"title": "General System Integration", "description": "Execute core project modules", "required_skills": []}]
+            cacheable = False
+
+    # 2. Match with tasks
+    matcher = MatcherAgent()
+    result = await matcher.match(project=project, candidates=candidates, tasks=tasks, use_llm=not degraded)
+    if degraded:
+        cacheable = False
+
+    # Enrich matches with full profile data and filter for Core Team (score > 0)
+    candidates_by_id = {str(c["profile"].id): c for c in candidates}
+    enriched_matches = []
+    for match in result.get("matches", []):
+        if match["match_score"] <= 0:
+            continue
+        candidate = candidates_by_id.get(match["employee_id"])
+        if candidate:
+            enriched_matches.append({
+                "profile": candidate["profile"],
+                "skills": candidate["skills"],
+                "score": match["match_score"],
+                "matched_skills": match["matched_skills"],
+                "suggested_task": match["suggested_task"],
+                "suggested_description": match.get("suggested_description", ""),
+                "suggested_deadline": match.get("suggested_deadline", "TBD"),
+                "reasoning": match["reasoning"]
+            })
+
+    return jsonable_encoder(enriched_matches), cacheable
+
+async def compute_match_run(project: Project) -> Any:
+    """Run the matcher and persist the result as the project's next MatchRun"""
+    # Read before matching: a roster change mid-run leaves this run already stale
+    roster_version = await current_roster_version()
+    matches, cacheable = await run_match(project)
+    if cacheable:
+        await store_match_run(project, matches, roster_version)
+    return matches
+
+async def store_match_run(project: Project, matches: List[dict], roster_version: int) -> Optional[MatchRun]:
+    latest = await latest_match_run(project.id)
+    run = MatchRun(
+        project_id=project.id,
+        version=(latest.version + 1) if latest else 1,
+        fingerprint=match_fingerprint(project, roster_version),
+        roster_version=roster_version,
+        matches=matches
+    )
+    try:
+        await run.insert()
+    except DuplicateKeyError:
+        # A concurrent run took this version number; its result is as good as ours
+        return None
+    await MatchRun.find(
+        MatchRun.project_id == project.id,
+        MatchRun.version <= run.version - MATCH_RUN_HISTORY
+    ).delete()
+    return run
+
+async def refresh_match_run(project_id: PydanticObjectId):
+    """Background recompute entry point: re-reads the project so the run reflects its latest state"""
+    project = await Project.get(project_id)
+    if project:
+        await compute_match_run(project)
+
+async def create_plan_handoff(
+    user_id: PydanticObjectId,
+    draft: Project,
+    tasks: List[Any],
+    matches: List[dict],
+    roster_version: int,
+    planned: bool = True
+) -> str:
+    """Park a match-preview result for create_project; returns the claim token"""
+    now = datetime.utcnow()
+    handoff = PlanHandoff(
+        token=secrets.token_urlsafe(24),
+        created_by=user_id,
+        draft_fingerprint=draft_fingerprint(draft),
+        roster_version=roster_version,
+        planned=planned,
+        tasks=jsonable_encoder(tasks),
+        matches=jsonable_encoder(matches),
+        created_at=now,
+        expires_at=now + timedelta(minutes=settings.PLAN_HANDOFF_TTL_MINUTES)
+    )
+    await handoff.insert()
+    return handoff.token
+
+async def claim_plan_handoff(token: str, user_id: PydanticObjectId, project: Project) -> Optional[PlanHandoff]:
+    """
+    Atomically take a handoff (single use). None if it is unknown, expired, another user's,
+    or was computed for different requirements than the project being created.
+    """
+    doc = await get_collection(PlanHandoff).find_one_and_delete({
+        "token": token,
+        "created_by": user_id,
+        "expires_at": {"$gt": datetime.utcnow()} # The TTL monitor only runs once a minute
+    })
+    if not doc:
+        return None
+    handoff = PlanHandoff.model_validate(doc)
+    if handoff.draft_fingerprint != draft_fingerprint(project):
+        return None
+    return handoff
@@ -0,0 +1,80 @@
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+class Metric:
+    """
+    In-process metric in the Prometheus text format, one series per label set.
+    Values are per API/worker process; scrape each process separately.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        REGISTRY.append(self)
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    @staticmethod
+    def _labels(key: Tuple[Tuple[str, str], ...], *extra: Tuple[str, str]) -> str:
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{self._labels(key)} {value:g}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[Tuple[str, str], ...], list] = {} # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        series = self.series.setdefault(self._key(labels), [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in self.series.items():
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', f'{bound:g}'))} {count}")
+            lines.append(f"{self.name}_bucket{self._labels(key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{self._labels(key)} {series[-1]}")
+        return lines
+
+REGISTRY: List[Metric] = []
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from app.agents.planner_agent import PlannerAgent
+from app.core import background
+from app.core.config import settings
+from app.core.deadlines import planning_days
+from app.db.database import get_collection
+from app.models.project import Project, PlanCache
+
+# Speculative plans share the LLM with interactive requests; cap how many run at once
+_speculation_slots = asyncio.Semaphore(max(1, settings.SPECULATIVE_PLANNING_CONCURRENCY))
+_speculating = set() # Fingerprints whose speculative plan is calling the LLM right now
+
+def plan_inputs(project: Project) -> Dict[str, Any]:
+    """The exact keyword arguments PlannerAgent.plan receives for this project today"""
+    return {
+        "project_title": project.title,
+        "project_description": project.description,
+        "required_skills": [skill.skill_name for skill in project.required_skills],
+        "experience_required": project.experience_required,
+        "days_remaining": planning_days(project)
+    }
+
+def plan_fingerprint(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+def _job_key(fingerprint: str) -> str:
+    return f"plan:{fingerprint}"
+
+async def _cached_plan(fingerprint: str):
+    entry = await PlanCache.find_one(
+        PlanCache.fingerprint == fingerprint,
+        PlanCache.expires_at > datetime.utcnow()
+    )
+    return entry.plan if entry else None
+
+async def cached_plan_for(project: Project):
+    """Cached plan for the project's current inputs, or None; never calls the planner (degraded mode)"""
+    return await _cached_plan(plan_fingerprint(plan_inputs(project)))
+
+async def _plan_and_cache(inputs: Dict[str, Any], fingerprint: str) -> Dict[str, Any]:
+    plan = await PlannerAgent().plan(**inputs)
+    now = datetime.utcnow()
+    await get_collection(PlanCache).update_one(
+        {"fingerprint": fingerprint},
+        {"$set": {
+            "plan": plan,
+            "created_at": now,
+            "expires_at": now + timedelta(hours=settings.PLAN_CACHE_TTL_HOURS)
+        }},
+        upsert=True
+    )
+    return plan
+
+async def get_or_create_plan(project: Project, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Plan for the project's current inputs: from the cache, by joining a speculative run
+    already in flight for the same inputs, or by calling the planner now. `refresh`
+    (explicit regenerate actions) always calls the planner and replaces the cached plan.
+    """
+    inputs = plan_inputs(project)
+    fingerprint = plan_fingerprint(inputs)
+    if refresh:
+        return await _plan_and_cache(inputs, fingerprint)
+
+    plan = await _cached_plan(fingerprint)
+    # Join a speculative run only once it holds a slot; one still queued is overtaken
+    if plan is None and fingerprint in _speculating and await background.join(_job_key(fingerprint)):
+        plan = await _cached_plan(fingerprint)
+    if plan is not None:
+        print(f"PLAN CACHE: hit for '{project.title}'")
+        return plan
+    return await _plan_and_cache(inputs, fingerprint)
+
+async def _speculate(inputs: Dict[str, Any], fingerprint: str):
+    async with _speculation_slots:
+        if await _cached_plan(fingerprint) is not None:
+            return
+        _speculating.add(fingerprint)
+        try:
+            await _plan_and_cache(inputs, fingerprint)
+        finally:
+            _speculating.discard(fingerprint)
+
+def speculate_plan(project: Project) -> bool:
+    """
+    Start planning in the background so /plan, /decompose and /match find the result cached.
+    Deduplicated per fingerprint; returns False when disabled or already running.
+    """
+    if settings.SPECULATIVE_PLANNING_CONCURRENCY <= 0:
+        return False
+    inputs = plan_inputs(project)
+    fingerprint = plan_fingerprint(inputs)
+    return background.spawn(_job_key(fingerprint), _speculate, inputs, fingerprint)
@@ -0,0 +1,131 @@
+import asyncio
+import math
+import random
+import time
+from typing import Dict, List
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.db.database import get_collection
+from app.models.ratelimit import RateLimitBucket
+
+llm_rate_limited = Counter("llm_rate_limited_total", "LLM calls that had to wait for quota (outcome: queued or rejected)")
+llm_queue_wait = Histogram("llm_queue_wait_seconds", "Time LLM calls spent queued for provider quota")
+
+class RateLimitTimeout(RuntimeError):
+    """The provider quota will not free up within the caller's remaining deadline"""
+
+def approx_tokens(text: str) -> int:
+    """~4 characters per token; close enough for quotas and telemetry across providers"""
+    return math.ceil(len(text) / 4)
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough prompt + response size charged against the token quota"""
+    return approx_tokens(prompt) + settings.LLM_RESPONSE_TOKENS_ESTIMATE
+
+def _buckets(prompt: str) -> List[tuple]:
+    """(capacity per minute, cost) for the request and token buckets; a disabled limit has 0/0"""
+    rpm, tpm = settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE
+    return [
+        (rpm, 1) if rpm > 0 else (0, 0),
+        # A single call larger than the whole minute's quota waits for a full bucket
+        (tpm, min(tpm, estimate_tokens(prompt))) if tpm > 0 else (0, 0)
+    ]
+
+def _wait_seconds(levels: List[float], buckets: List[tuple]) -> float:
+    return max(
+        [(cost - level) * 60 / capacity for level, (capacity, cost) in zip(levels, buckets) if capacity and level < cost],
+        default=0
+    )
+
+class MemoryBuckets:
+    """Per-process buckets (single worker, or when quotas are split per process)"""
+
+    def __init__(self):
+        self._state: Dict[str, tuple] = {} # provider -> (requests, tokens, refilled_at)
+
+    async def take(self, provider: str, buckets: List[tuple]) -> float:
+        now = time.monotonic()
+        requests, tokens, refilled_at = self._state.get(provider, (buckets[0][0], buckets[1][0], now))
+        levels = [
+            min(capacity, level + (now - refilled_at) * capacity / 60)
+            for level, (capacity, _) in zip((requests, tokens), buckets)
+        ]
+        wait = _wait_seconds(levels, buckets)
+        if wait <= 0:
+            levels = [level - cost for level, (_, cost) in zip(levels, buckets)]
+        self._state[provider] = (levels[0], levels[1], now)
+        return wait
+
+class MongoBuckets:
+    """Buckets in one RateLimitBucket document per provider, shared by every process"""
+
+    async def take(self, provider: str, buckets: List[tuple]) -> float:
+        (req_capacity, req_cost), (tok_capacity, tok_cost) = buckets
+        elapsed_ms = {"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}
+
+        def refill(field: str, capacity: float):
+            return {"$min": [capacity, {"$add": [
+                {"$ifNull": [f"${field}", capacity]},
+                {"$multiply": [capacity / 60000, elapsed_ms]}
+            ]}]}
+
+        def spend(field: str, cost: float):
+            return {"$cond": ["$granted", {"$subtract": [f"${field}", cost]}, f"${field}"]}
+
+        update = [
+            {"$set": {
+                "requests": refill("requests", req_capacity),
+                "tokens": refill("tokens", tok_capacity),
+                "updated_at": "$$NOW"
+            }},
+            {"$set": {"granted": {"$and": [
+                {"$gte": ["$requests", req_cost]},
+                {"$gte": ["$tokens", tok_cost]}
+            ]}}},
+            {"$set": {"requests": spend("requests", req_cost), "tokens": spend("tokens", tok_cost)}}
+        ]
+        collection = get_collection(RateLimitBucket)
+        try:
+            doc = await collection.find_one_and_update(
+                {"key": provider}, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another process created the provider's document first: it exists now, update it
+            doc = await collection.find_one_and_update(
+                {"key": provider}, update, return_document=ReturnDocument.AFTER
+            )
+        if doc["granted"]:
+            return 0
+        return _wait_seconds([doc["requests"], doc["tokens"]], buckets)
+
+_memory = MemoryBuckets()
+_mongo = MongoBuckets()
+
+async def acquire(provider: str, prompt: str, max_wait: float) -> float:
+    """
+    Take one request and the prompt's estimated tokens from the provider's quota, queueing
+    until they are available. Raises RateLimitTimeout when that would take longer than
+    `max_wait`; returns the seconds spent waiting.
+    """
+    buckets = _buckets(prompt)
+    if not any(capacity for capacity, _ in buckets):
+        return 0
+    backend = _mongo if settings.LLM_RATE_LIMIT_BACKEND == "mongo" else _memory
+    started = time.monotonic()
+    queued = False
+    while True:
+        wait = await backend.take(provider, buckets)
+        waited = time.monotonic() - started
+        if wait <= 0:
+            if queued:
+                llm_rate_limited.inc(provider=provider, outcome="queued")
+            llm_queue_wait.observe(waited, provider=provider)
+            return waited
+        if waited + wait > max_wait:
+            llm_rate_limited.inc(provider=provider, outcome="rejected")
+            raise RateLimitTimeout(f"LLM quota for '{provider}' exhausted; next slot in {wait:.1f}s")
+        # Jitter so processes woken together don't all race for the same refill
+        queued = True
+        await asyncio.sleep(wait + random.uniform(0, min(1.0, wait * 0.1)))
@@ -0,0 +1,206 @@
+import difflib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from beanie import PydanticObjectId
+from app.core.schedule import build_project_tasks, normalize_title
+from app.models.project import Project, ProjectTask, ReplanPatch, TaskChange, TaskMove, TASK_PATCH_FIELDS
+
+# Tasks in these states are never sent back to the planner
+FIXED_STATUSES = {"completed", "in_progress"}
+# Plan fields compared by the diff; status and assignee are handled separately
+DIFF_FIELDS = TASK_PATCH_FIELDS
+FUZZY_TITLE_CUTOFF = 0.75 # difflib similarity for aligning renamed tasks
+
+def split_for_replan(project: Project) -> Tuple[List[ProjectTask], List[ProjectTask]]:
+    """(fixed, remaining): work already done or underway vs. scope the planner may revise"""
+    fixed = [t for t in project.tasks if t.status in FIXED_STATUSES]
+    remaining = [t for t in project.tasks if t.status not in FIXED_STATUSES]
+    return fixed, remaining
+
+def replan_inputs(project: Project) -> Dict[str, List[Dict[str, Any]]]:
+    """Compact planner inputs: one line per fixed task, remaining tasks with keys and prerequisites"""
+    fixed, remaining = split_for_replan(project)
+    titles = {t.key: t.title for t in project.tasks}
+    return {
+        "fixed_tasks": [{"title": t.title, "status": t.status} for t in fixed],
+        "remaining_tasks": [
+            {
+                "key": t.key,
+                "title": t.title,
+                "estimated_hours": t.estimated_hours,
+                "priority": t.priority,
+                "deadline": t.deadline,
+                "required_skills": t.required_skills,
+                "depends_on_titles": [titles[k] for k in t.depends_on if k in titles]
+            }
+            for t in remaining
+        ]
+    }
+
+def _pinned_deadline(task: ProjectTask) -> str:
+    """
+    Relative labels ("Day 3") count from plan_start, which moves when a replan is applied;
+    fixed tasks keep their absolute due date instead.
+    """
+    if task.due_at:
+        return task.due_at.date().isoformat()
+    return task.deadline
+
+def merge_incremental_plan(project: Project, revised: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge a remaining-scope replan back into the full task list by task key.
+
+    Fixed tasks pass through untouched (keys, status, assignee). A revised task carrying a
+    known key updates that task in place; an empty description keeps the existing one and
+    an empty depends_on keeps the existing prerequisites. Tasks without a (known) key are new.
+    Remaining tasks the planner left out are dropped. `depends_on` may mix kept keys and the
+    planner's titles; build_project_tasks resolves both to keys.
+    """
+    fixed, remaining = split_for_replan(project)
+    existing = {t.key: t for t in remaining}
+
+    merged = []
+    for task in fixed:
+        data = task.model_dump(exclude={"due_at"})
+        data["deadline"] = _pinned_deadline(task)
+        merged.append(data)
+
+    for item in revised:
+        key = item.get("key") or ""
+        old = existing.pop(key, None)
+        if old:
+            data = old.model_dump(exclude={"due_at"})
+            data.update({
+                "title": item.get("title") or old.title,
+                "description": item.get("description") or old.description,
+                "estimated_hours": item.get("estimated_hours", old.estimated_hours),
+                "required_skills": item.get("required_skills") or old.required_skills,
+                "priority": item.get("priority") or old.priority,
+                "deadline": item.get("deadline") or old.deadline,
+                "depends_on": item.get("depends_on") or old.depends_on
+            })
+        else:
+            data = {k: v for k, v in item.items() if k != "key"}
+            data.setdefault("description", data.get("title", ""))
+            data["status"] = "backlog"
+        merged.append(data)
+
+    return merged
+
+def _align(current: List[ProjectTask], proposed: List[ProjectTask]) -> Dict[str, str]:
+    """
+    proposed key -> current key. Keys first, then exact (normalised) titles, both via dict
+    lookups; only what is still unmatched after that is aligned by fuzzy title similarity.
+    """
+    current_by_key = {t.key: t for t in current}
+    current_by_title = {}
+    for task in current:
+        current_by_title.setdefault(normalize_title(task.title), task.key)
+
+    mapping = {}
+    taken = set()
+    for task in proposed:
+        if task.key in current_by_key and task.key not in taken:
+            mapping[task.key] = task.key
+            taken.add(task.key)
+    for task in proposed:
+        if task.key in mapping:
+            continue
+        key = current_by_title.get(normalize_title(task.title))
+        if key and key not in taken:
+            mapping[task.key] = key
+            taken.add(key)
+
+    leftover = {normalize_title(t.title): t.key for t in current if t.key not in taken}
+    for task in proposed:
+        if task.key in mapping or not leftover:
+            continue
+        close = difflib.get_close_matches(normalize_title(task.title), list(leftover), n=1, cutoff=FUZZY_TITLE_CUTOFF)
+        if close:
+            mapping[task.key] = leftover.pop(close[0])
+    return mapping
+
+def diff_plans(
+    current: List[ProjectTask],
+    proposed: List[Any],
+    assignments: Optional[Dict[str, PydanticObjectId]] = None,
+    base_updated_at: Optional[datetime] = None
+) -> ReplanPatch:
+    """
+    Patch turning `current` into `proposed`. `assignments` maps normalised task titles to the
+    proposed assignee (the matcher's suggestions); a proposed task's own `assigned_to` is
+    used otherwise, and no assignee means the current one is kept. Status is never diffed.
+    """
+    assignments = assignments or {}
+    proposed_tasks = build_project_tasks(proposed)
+    mapping = _align(current, proposed_tasks)
+    current_by_key = {t.key: t for t in current}
+
+    patch = ReplanPatch(base_updated_at=base_updated_at)
+    for task in proposed_tasks:
+        key = mapping.get(task.key, task.key)
+        depends_on = [mapping.get(k, k) for k in task.depends_on]
+        assignee = assignments.get(normalize_title(task.title)) or task.assigned_to
+        patch.order.append(key)
+
+        old = current_by_key.get(key) if task.key in mapping else None
+        if old is None:
+            task.depends_on = depends_on
+            task.status = "backlog"
+            task.assigned_to = assignee
+            task.due_at = None
+            patch.added.append(task)
+            continue
+
+        fields = {}
+        for field in DIFF_FIELDS:
+            value = depends_on if field == "depends_on" else getattr(task, field)
+            if value != getattr(old, field):
+                fields[field] = value
+        if fields:
+            patch.changed.append(TaskChange(key=key, fields=fields))
+        else:
+            patch.unchanged += 1
+        if assignee and assignee != old.assigned_to:
+            patch.moves.append(TaskMove(key=key, from_employee=old.assigned_to, to_employee=assignee))
+
+    kept = set(mapping.values())
+    patch.removed = [t.key for t in current if t.key not in kept]
+    return patch
+
+def apply_patch(project: Project, patch: ReplanPatch) -> Dict[str, Any]:
+    """
+    Apply a ReplanPatch to the project's tasks through a key map (the caller saves).
+    Returns who gained which tasks and which previous assignees lost one, for notifications.
+    """
+    by_key = {t.key: t for t in project.tasks}
+    removed = set(patch.removed)
+
+    for change in patch.changed:
+        task = by_key.get(change.key)
+        if task:
+            fields = {field: value for field, value in change.fields.items() if field in DIFF_FIELDS}
+            # Re-validated as a whole task: a bad value raises instead of being saved
+            by_key[change.key] = ProjectTask.model_validate({**task.model_dump(), **fields})
+
+    assigned: Dict[PydanticObjectId, List[str]] = {}
+    rerouted = []
+    for move in patch.moves:
+        task = by_key.get(move.key)
+        if not task or move.key in removed:
+            continue
+        if task.assigned_to and task.assigned_to != move.to_employee:
+            rerouted.append((task.assigned_to, task.title))
+        task.assigned_to = move.to_employee
+        assigned.setdefault(move.to_employee, []).append(task.title)
+
+    for task in patch.added:
+        by_key[task.key] = task
+        if task.assigned_to:
+            assigned.setdefault(task.assigned_to, []).append(task.title)
+
+    ordered = [k for k in patch.order if k in by_key and k not in removed]
+    listed = set(ordered)
+    ordered += [k for k in by_key if k not in listed and k not in removed]
+    project.tasks = build_project_tasks([by_key[k] for k in ordered])
+    return {"assigned": assigned, "rerouted": rerouted, "added": len(patch.added)}
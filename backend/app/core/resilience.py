@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict
+from pymongo.errors import PyMongoError
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+logger = logging.getLogger(__name__)
+
+llm_circuit_state = Gauge("llm_circuit_state", "Circuit breaker state per provider (0 closed, 1 half-open, 2 open)")
+llm_circuit_rejections = Counter("llm_circuit_rejections_total", "LLM calls short-circuited by an open breaker")
+llm_retries = Counter("llm_retries_total", "LLM call attempts retried after a retryable error")
+llm_timeouts = Counter("llm_timeouts_total", "LLM call attempts that hit their deadline")
+
+class CircuitOpenError(RuntimeError):
+    """The provider's breaker is open: fail fast so callers take their fallback"""
+
+class CircuitBreaker:
+    """
+    Per-provider breaker. After LLM_BREAKER_FAILURE_THRESHOLD consecutive failed calls (each
+    counted once, after its retries are exhausted) it opens and rejects calls for LLM_BREAKER_RESET_SECONDS; then one probe call is let
+    through (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        llm_circuit_state.set(0, provider=provider)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning("LLM circuit for '%s': %s -> %s", self.provider, self.state, state)
+        self.state = state
+        llm_circuit_state.set(_STATE_VALUES[state], provider=self.provider)
+
+    def before_call(self):
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < settings.LLM_BREAKER_RESET_SECONDS:
+                llm_circuit_rejections.inc(provider=self.provider)
+                raise CircuitOpenError(f"LLM provider '{self.provider}' is unavailable (circuit open)")
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                llm_circuit_rejections.inc(provider=self.provider)
+                raise CircuitOpenError(f"LLM provider '{self.provider}' is recovering (circuit half-open)")
+            self._probing = True
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= settings.LLM_BREAKER_FAILURE_THRESHOLD:
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release(self):
+        """End a call whose outcome says nothing about provider health (e.g. a 400)"""
+        self._probing = False
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection problems, throttling and 5xx: the same call may succeed later"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None and not isinstance(error, PyMongoError):
+        # Google API errors carry the HTTP status as `code`; pymongo's `code` is a server error number
+        status = getattr(error, "code", None)
+    if isinstance(status, int):
+        return status == 408 or status == 429 or status >= 500
+    # SDK transport errors without a status (groq.APIConnectionError / APITimeoutError)
+    return type(error).__name__ in {"APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded"}
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)"""
+    ceiling = min(settings.LLM_RETRY_MAX_DELAY_SECONDS, settings.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
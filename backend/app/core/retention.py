@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.errors import OperationFailure
+from app.core.config import settings
+from app.core.scheduler import scheduler
+from app.db.database import get_collection
+from app.models.notification import Notification, ArchivedNotification
+
+READ_TTL_INDEX = "read_ttl"
+
+async def ensure_notification_ttl_index():
+    """
+    Create (or retune) the TTL index that expires read notifications.
+    Done at startup rather than in the model so NOTIFICATION_READ_TTL_DAYS can change
+    without an index-options conflict: an existing index is adjusted in place with collMod.
+    """
+    collection = get_collection(Notification)
+    expire_after = settings.NOTIFICATION_READ_TTL_DAYS * 24 * 3600
+
+    existing = await collection.index_information()
+    if READ_TTL_INDEX in existing:
+        if existing[READ_TTL_INDEX].get("expireAfterSeconds") != expire_after:
+            await collection.database.command({
+                "collMod": collection.name,
+                "index": {"name": READ_TTL_INDEX, "expireAfterSeconds": expire_after}
+            })
+        return
+
+    try:
+        await collection.create_index(
+            [("read_at", ASCENDING)],
+            name=READ_TTL_INDEX,
+            expireAfterSeconds=expire_after
+        )
+    except OperationFailure as e:
+        print(f"RETENTION: could not create TTL index on notifications: {e}")
+
+async def archive_stale_notifications() -> int:
+    """
+    Move unread notifications older than NOTIFICATION_ARCHIVE_AFTER_DAYS to the archive
+    collection in batches (one bulk upsert + one delete_many per batch).
+    Upserting by _id makes a batch safe to redo if the job dies between the two writes.
+    """
+    live = get_collection(Notification)
+    archive = get_collection(ArchivedNotification)
+    now = datetime.utcnow()
+
+    # Read notifications written before read_at existed would never expire; stamp them now
+    await live.update_many(
+        {"read": True, "read_at": None},
+        {"$set": {"read_at": now}}
+    )
+
+    cutoff = now - timedelta(days=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS)
+    batch_size = max(1, settings.NOTIFICATION_ARCHIVE_BATCH_SIZE)
+    archived = 0
+
+    while True:
+        batch = await live.find(
+            {"read": False, "created_at": {"$lt": cutoff}}
+        ).sort("created_at", ASCENDING).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            doc["archived_at"] = now
+            operations.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        await archive.bulk_write(operations, ordered=False)
+
+        ids = [doc["_id"] for doc in batch]
+        result = await live.delete_many({"_id": {"$in": ids}})
+        archived += result.deleted_count
+
+        if len(batch) < batch_size:
+            break
+
+    if archived:
+        print(f"RETENTION: archived {archived} stale unread notifications")
+    return archived
+
+scheduler.add_job(
+    "notification_archival",
+    archive_stale_notifications,
+    seconds=settings.NOTIFICATION_ARCHIVE_INTERVAL_MINUTES * 60,
+    initial_delay=30
+)
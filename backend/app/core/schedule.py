@@ -0,0 +1,263 @@
+import heapq
+import re
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from app.core.deadlines import project_deadline
+from app.models.project import Project, ProjectTask
+
+HOURS_PER_DAY = 8 # One assignee-day of focused work
+IN_PROGRESS_REMAINING = 0.5 # Share of an in-progress task's estimate still assumed outstanding
+
+def _next_working_start(dt: datetime) -> datetime:
+    """`dt`, or midnight of the next weekday if it falls on a weekend"""
+    while dt.weekday() >= 5:
+        dt = datetime.combine(dt.date() + timedelta(days=1), datetime.min.time())
+    return dt
+
+def add_working_days(origin: datetime, days: float) -> datetime:
+    """`origin` plus `days` working days (Mon-Fri); schedule times are in working days"""
+    current = _next_working_start(origin)
+    weeks, rest = divmod(max(days, 0.0), 5)
+    current += timedelta(weeks=int(weeks))
+    while rest > 0:
+        midnight = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+        left_today = (midnight - current).total_seconds() / 86400
+        if rest <= left_today:
+            return current + timedelta(days=rest)
+        rest -= left_today
+        current = _next_working_start(midnight)
+    return current
+
+def working_days_between(start: datetime, end: datetime) -> float:
+    """Working days from `start` to `end` (negative if `end` is earlier); inverse of add_working_days"""
+    if end < start:
+        return -working_days_between(end, start)
+    weeks = (end - start).days // 7
+    total = weeks * 5.0
+    current = start + timedelta(weeks=weeks)
+    while current < end:
+        midnight = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+        if current.weekday() < 5:
+            total += (min(midnight, end) - current).total_seconds() / 86400
+        current = midnight
+    return total
+
+def normalize_title(title: str) -> str:
+    return re.sub(r"\s+", " ", (title or "").strip().lower())
+
+def build_project_tasks(raw_tasks: List[Any]) -> List[ProjectTask]:
+    """
+    Turn planner/client task dicts into ProjectTask models with stable keys, resolving
+    `depends_on` entries given as task titles (what the planner emits) or keys into keys.
+    Unknown references and self-dependencies are dropped.
+    """
+    tasks = [t if isinstance(t, ProjectTask) else ProjectTask(**t) for t in raw_tasks]
+    by_key = {t.key: t.key for t in tasks}
+    by_title = {normalize_title(t.title): t.key for t in tasks}
+
+    for task in tasks:
+        resolved = []
+        for ref in task.depends_on:
+            key = by_key.get(ref) or by_title.get(normalize_title(ref))
+            if key and key != task.key and key not in resolved:
+                resolved.append(key)
+        task.depends_on = resolved
+    return tasks
+
+def remaining_days(task: ProjectTask) -> float:
+    if task.status == "completed":
+        return 0.0
+    days = (task.estimated_hours or 0) / HOURS_PER_DAY
+    if task.status == "in_progress":
+        days *= IN_PROGRESS_REMAINING
+    return days
+
+class CriticalPathSchedule:
+    """
+    Critical path method over the task dependency DAG, in O(V + E).
+
+    Times are in working days from `origin`. A forward pass gives earliest start/finish,
+    a backward pass from the project finish gives latest start/finish; slack = LS - ES and
+    zero-slack tasks form the critical path. Dependency cycles (possible with LLM plans)
+    are broken by ignoring the edges that close them.
+    """
+
+    def __init__(self, tasks: List[ProjectTask], origin: Optional[datetime] = None):
+        self.origin = origin or datetime.utcnow()
+        self.titles = {t.key: t.title for t in tasks}
+        self.duration: Dict[str, float] = {t.key: remaining_days(t) for t in tasks}
+        self.preds: Dict[str, List[str]] = {t.key: [d for d in t.depends_on if d in self.duration] for t in tasks}
+        self.succs: Dict[str, List[str]] = {t.key: [] for t in tasks}
+        for key, preds in self.preds.items():
+            for pred in preds:
+                self.succs[pred].append(key)
+
+        self.order = self._topological_order([t.key for t in tasks])
+        self.position = {key: i for i, key in enumerate(self.order)}
+        self.es: Dict[str, float] = {}
+        self.ef: Dict[str, float] = {}
+        self.ls: Dict[str, float] = {}
+        self.lf: Dict[str, float] = {}
+        self.finish = 0.0
+        self.cycles_broken = 0
+
+    def _topological_order(self, keys: List[str]) -> List[str]:
+        """Kahn's algorithm; leftover (cyclic) nodes lose the back edges into them"""
+        indegree = {k: len(self.preds[k]) for k in keys}
+        ready = deque(k for k in keys if indegree[k] == 0)
+        order = []
+        seen = set()
+        while ready:
+            key = ready.popleft()
+            order.append(key)
+            seen.add(key)
+            for succ in self.succs[key]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    ready.append(succ)
+
+        leftovers = [k for k in keys if k not in seen]
+        if leftovers:
+            self.cycles_broken = len(leftovers)
+            for key in leftovers:
+                # Keep only edges from nodes already placed before this one
+                kept = [p for p in self.preds[key] if p in seen]
+                for dropped in set(self.preds[key]) - set(kept):
+                    self.succs[dropped].remove(key)
+                self.preds[key] = kept
+                order.append(key)
+                seen.add(key)
+        return order
+
+    def compute(self) -> "CriticalPathSchedule":
+        for key in self.order:
+            self.es[key] = max((self.ef[p] for p in self.preds[key]), default=0.0)
+            self.ef[key] = self.es[key] + self.duration[key]
+        self.finish = max(self.ef.values(), default=0.0)
+        self._backward(self.order)
+        return self
+
+    def _backward(self, keys: List[str]):
+        for key in reversed(keys):
+            self.lf[key] = min((self.ls[s] for s in self.succs[key]), default=self.finish)
+            self.ls[key] = self.lf[key] - self.duration[key]
+
+    def update_task(self, key: str, duration: float) -> "CriticalPathSchedule":
+        """
+        Incremental recompute after one task's remaining duration changes: the forward
+        pass is re-run only over descendants whose earliest finish actually moves, and
+        the backward pass only over ancestors, unless the project finish itself moved.
+        """
+        if key not in self.duration or self.duration[key] == duration:
+            return self
+        self.duration[key] = duration
+
+        # Forward: process affected nodes in topological order via a heap on position
+        heap = [(self.position[key], key)]
+        queued = {key}
+        while heap:
+            _, node = heapq.heappop(heap)
+            queued.discard(node)
+            es = max((self.ef[p] for p in self.preds[node]), default=0.0)
+            ef = es + self.duration[node]
+            if node != key and es == self.es[node] and ef == self.ef[node]:
+                continue
+            self.es[node], self.ef[node] = es, ef
+            for succ in self.succs[node]:
+                if succ not in queued:
+                    heapq.heappush(heap, (self.position[succ], succ))
+                    queued.add(succ)
+
+        finish = max(self.ef.values(), default=0.0)
+        if finish != self.finish:
+            self.finish = finish
+            self._backward(self.order)
+            return self
+
+        # Backward: only `key` and its ancestors can have a different latest start
+        heap = [(-self.position[key], key)]
+        queued = {key}
+        while heap:
+            _, node = heapq.heappop(heap)
+            queued.discard(node)
+            lf = min((self.ls[s] for s in self.succs[node]), default=self.finish)
+            ls = lf - self.duration[node]
+            if node != key and lf == self.lf[node] and ls == self.ls[node]:
+                continue
+            self.lf[node], self.ls[node] = lf, ls
+            for pred in self.preds[node]:
+                if pred not in queued:
+                    heapq.heappush(heap, (-self.position[pred], pred))
+                    queued.add(pred)
+        return self
+
+    def slack(self, key: str) -> float:
+        return round(self.ls[key] - self.es[key], 6)
+
+    def critical_path(self) -> List[str]:
+        """Zero-slack tasks with remaining work, in topological order"""
+        return [k for k in self.order if self.slack(k) <= 0 and self.duration[k] > 0]
+
+    @property
+    def projected_finish(self) -> datetime:
+        return add_working_days(self.origin, self.finish)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "projected_finish": self.projected_finish,
+            "finish_days": round(self.finish, 3),
+            "critical_path": self.critical_path(),
+            "cycles_broken": self.cycles_broken,
+            "tasks": {
+                key: {
+                    "es": round(self.es[key], 3),
+                    "ef": round(self.ef[key], 3),
+                    "ls": round(self.ls[key], 3),
+                    "lf": round(self.lf[key], 3),
+                    "slack": round(self.slack(key), 3)
+                }
+                for key in self.order
+            }
+        }
+
+    @classmethod
+    def from_cache(cls, tasks: List[ProjectTask], cached: Dict[str, Any]) -> Optional["CriticalPathSchedule"]:
+        """Rehydrate a stored schedule; None if the task set no longer matches it"""
+        cached_tasks = cached.get("tasks") or {}
+        if set(cached_tasks) != {t.key for t in tasks}:
+            return None
+        schedule = cls(tasks, origin=cached.get("origin"))
+        schedule.finish = cached.get("finish_days", 0.0)
+        for key, times in cached_tasks.items():
+            schedule.es[key], schedule.ef[key] = times["es"], times["ef"]
+            schedule.ls[key], schedule.lf[key] = times["ls"], times["lf"]
+        return schedule
+
+def refresh_schedule(project: Project, changed_task_key: Optional[str] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Recompute and attach the cached schedule (the caller saves). With `changed_task_key`,
+    a same-day cache is updated incrementally; otherwise the DAG is recomputed in full.
+    """
+    now = now or datetime.utcnow()
+    schedule = None
+    cached = project.schedule
+    if changed_task_key and cached and cached.get("origin") and cached["origin"].date() == now.date():
+        schedule = CriticalPathSchedule.from_cache(project.tasks, cached)
+        if schedule:
+            task = next(t for t in project.tasks if t.key == changed_task_key)
+            schedule.update_task(changed_task_key, remaining_days(task))
+    if schedule is None:
+        schedule = CriticalPathSchedule(project.tasks, origin=now).compute()
+
+    project.schedule = schedule.to_dict()
+    return project.schedule
+
+def schedule_slippage_days(project: Project) -> Optional[float]:
+    """How many days the projected finish lands after the deadline (negative = buffer)"""
+    deadline_at = project_deadline(project)
+    if not project.schedule or not deadline_at:
+        return None
+    delta = project.schedule["projected_finish"] - deadline_at
+    return round(delta.total_seconds() / 86400, 1)
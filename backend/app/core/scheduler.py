@@ -0,0 +1,64 @@
+import asyncio
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional
+
+class PeriodicJob:
+    """A coroutine function run every `interval_seconds` inside the app's event loop"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        interval_seconds: float,
+        initial_delay: float = 0
+    ):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.initial_delay = initial_delay
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def run_forever(self):
+        if self.initial_delay:
+            await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await self.func()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A failing sweep must never kill the loop; try again next interval
+                self.last_error = str(e)
+                print(f"SCHEDULER: job '{self.name}' failed: {e}")
+                traceback.print_exc()
+            self.last_run = asyncio.get_running_loop().time()
+            await asyncio.sleep(self.interval_seconds)
+
+class Scheduler:
+    """
+    Minimal in-process scheduler for background maintenance work.
+    Jobs are registered at import/startup time and started with the app.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, PeriodicJob] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[None]], seconds: float, initial_delay: float = 0):
+        self.jobs[name] = PeriodicJob(name, func, seconds, initial_delay)
+
+    def start(self):
+        for job in self.jobs.values():
+            if job.interval_seconds <= 0:
+                continue
+            self._tasks.append(asyncio.create_task(job.run_forever(), name=f"scheduler:{job.name}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+scheduler = Scheduler()
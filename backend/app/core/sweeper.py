@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from beanie.operators import In
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.core.deadlines import normalize_project_schedule
+from app.core.health import compute_project_health
+from app.core.scheduler import scheduler
+from app.core.workload import get_workloads, portfolio_hours
+from app.db.database import get_collection
+from app.models.employee import EmployeeProfile
+from app.models.notification import Notification, NotificationType
+from app.models.project import Project, ProjectStatus
+from app.models.user import User, UserRole
+
+# Alert once per project/employee as the deadline crosses each of these thresholds
+DEADLINE_BUCKETS = [(1, "1d"), (3, "3d"), (7, "7d")]
+ALERT_HEALTH_STATES = {"critical", "overdue"}
+
+def deadline_bucket(days_left: int) -> Optional[str]:
+    if days_left < 0:
+        return "overdue"
+    for limit, label in DEADLINE_BUCKETS:
+        if days_left <= limit:
+            return label
+    return None
+
+async def backfill_schedules(limit: int = 200) -> int:
+    """
+    Normalise projects written before deadline_at / tasks.due_at / task keys existed.
+    Only the derived fields are $set (per task index), never the task list itself.
+    """
+    projects = await Project.find({"$or": [
+        {"deadline_at": {"$exists": False}},
+        {"tasks": {"$elemMatch": {"due_at": {"$exists": False}}}},
+        {"tasks": {"$elemMatch": {"key": {"$exists": False}}}}
+    ]}).limit(limit).to_list()
+    operations = []
+    for project in projects:
+        normalize_project_schedule(project)
+        fields = {"deadline_at": project.deadline_at, "plan_start": project.plan_start}
+        for index, task in enumerate(project.tasks):
+            fields[f"tasks.{index}.due_at"] = task.due_at
+            fields[f"tasks.{index}.key"] = task.key # Freshly generated defaults become permanent
+        operations.append(UpdateOne({"_id": project.id}, {"$set": fields}))
+    if operations:
+        await get_collection(Project).bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def _admin_profile_ids() -> List:
+    admins = await User.find(User.role == UserRole.ADMIN).to_list()
+    if not admins:
+        return []
+    profiles = await EmployeeProfile.find(In(EmployeeProfile.user_id, [u.id for u in admins])).to_list()
+    return [p.id for p in profiles]
+
+def _alert(employee_id, project: Project, notification_type: str, title: str, message: str, dedupe_key: str, now: datetime) -> UpdateOne:
+    """Insert-if-absent keyed on dedupe_key, so overlapping sweeps and retries are harmless"""
+    doc = Notification(
+        employee_id=employee_id,
+        project_id=project.id,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        dedupe_key=dedupe_key,
+        created_at=now
+    ).model_dump(exclude={"id", "revision_id"})
+    return UpdateOne({"dedupe_key": dedupe_key}, {"$setOnInsert": doc}, upsert=True)
+
+async def sweep_deadlines_and_health(now: Optional[datetime] = None) -> dict:
+    """
+    One scheduled pass over active projects due within DEADLINE_ALERT_DAYS (or overdue):
+    an indexed range scan on (status, deadline_at), health evaluated in batch with a single
+    workload lookup, snapshots and deduplicated alerts written with one bulk write each.
+    """
+    now = now or datetime.utcnow()
+    await backfill_schedules()
+
+    horizon = now + timedelta(days=settings.DEADLINE_ALERT_DAYS + 1)
+    projects = await Project.find(
+        Project.status == ProjectStatus.FINALIZED,
+        {"deadline_at": {"$ne": None, "$lt": horizon}}
+    ).to_list()
+    if not projects:
+        return {"projects": 0, "alerts": 0}
+
+    assignees = {str(t.assigned_to) for p in projects for t in p.tasks if t.assigned_to}
+    workloads = await get_workloads(assignees)
+    admin_ids = await _admin_profile_ids()
+
+    snapshot_ops = []
+    alert_ops = []
+    for project in projects:
+        snapshot = compute_project_health(project, now, portfolio_hours(workloads, project))
+        snapshot_ops.append(UpdateOne(
+            {"_id": project.id},
+            {"$set": {"health_snapshot": snapshot.model_dump()}}
+        ))
+
+        days_left = (project.deadline_at.date() - now.date()).days
+        bucket = deadline_bucket(days_left)
+        if bucket:
+            if bucket == "overdue":
+                title = f"⚠️ Deadline Missed - {project.title}"
+                message = f"'{project.title}' passed its deadline ({project.deadline}) with work still open."
+            else:
+                title = f"⏳ Deadline Approaching - {project.title}"
+                message = f"'{project.title}' is due in {days_left} day{'s' if days_left != 1 else ''} ({project.deadline})."
+            deadline_key = project.deadline_at.isoformat()
+            for employee_id in project.assigned_team:
+                alert_ops.append(_alert(
+                    employee_id, project, NotificationType.DEADLINE_APPROACHING, title, message,
+                    f"deadline:{project.id}:{deadline_key}:{bucket}:{employee_id}", now
+                ))
+
+        if snapshot.health in ALERT_HEALTH_STATES:
+            issues = ", ".join(sorted(snapshot.issues)) or "unknown"
+            for admin_id in admin_ids:
+                alert_ops.append(_alert(
+                    admin_id, project, NotificationType.HEALTH_ALERT,
+                    f"🔴 Project {snapshot.health.title()} - {project.title}",
+                    f"Health check flagged '{project.title}' as {snapshot.health} (risk score {snapshot.metrics.get('risk_score', 0)}): {issues}.",
+                    f"health:{project.id}:{snapshot.health}:{now.date().isoformat()}:{admin_id}", now
+                ))
+
+    await get_collection(Project).bulk_write(snapshot_ops, ordered=False)
+    alerts = 0
+    if alert_ops:
+        try:
+            result = await get_collection(Notification).bulk_write(alert_ops, ordered=False)
+            alerts = result.upserted_count
+        except BulkWriteError as e:
+            # A concurrent sweep (another worker) inserted some of the same keys first
+            alerts = e.details.get("nUpserted", 0)
+
+    if alerts:
+        print(f"SWEEP: {len(projects)} projects evaluated, {alerts} alerts sent")
+    return {"projects": len(projects), "alerts": alerts}
+
+scheduler.add_job(
+    "deadline_health_sweep",
+    sweep_deadlines_and_health,
+    seconds=settings.DEADLINE_SWEEP_INTERVAL_MINUTES * 60,
+    initial_delay=60
+)
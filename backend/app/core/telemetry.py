@@ -0,0 +1,21 @@
+from app.core.metrics import Counter, Gauge, Histogram
+
+# Per-call LLM instrumentation (exposed at /metrics). Breaker, retry and hedge counters live
+# next to the code that drives them (resilience.py, llm.py, ratelimit.py).
+
+llm_requests = Histogram("llm_request_duration_seconds", "End-to-end agent LLM calls incl. queueing, retries and hedging (agent, outcome)")
+llm_provider_latency = Histogram("llm_provider_latency_seconds", "Single provider call attempts (provider, model, outcome)")
+llm_prompt_tokens = Counter("llm_prompt_tokens_total", "Prompt tokens sent, estimated at ~4 characters per token")
+llm_response_tokens = Counter("llm_response_tokens_total", "Response tokens received, estimated at ~4 characters per token")
+llm_parse_failures = Counter("llm_parse_failures_total", "Responses rejected as invalid JSON (kind=json) or not matching the schema (kind=schema)")
+llm_salvaged = Counter("llm_salvaged_responses_total", "Responses accepted after JSON repair (kind=repaired_json) or dropping invalid list items (kind=dropped_items)")
+llm_fallbacks = Counter("llm_fallbacks_total", "Agent results produced without the LLM (agent, reason)")
+
+# Admission gates (app/core/admission.py): load per LLM-backed endpoint and what it sheds
+admission_in_flight = Gauge("admission_in_flight", "Requests and jobs holding an admission slot (endpoint)")
+admission_queued = Gauge("admission_queued", "Requests waiting in an admission gate's bounded queue (endpoint)")
+admission_rejected = Counter("admission_rejected_total", "Requests shed by a full or timed-out admission queue (endpoint)")
+
+def record_fallback(agent: str, reason: str):
+    """Count a deterministic fallback taken instead of (or after) an LLM call"""
+    llm_fallbacks.inc(agent=agent, reason=reason)
@@ -0,0 +1,99 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+from beanie import PydanticObjectId
+from beanie.operators import In
+from pymongo import UpdateOne
+from app.db.database import get_collection
+from app.models.employee import EmployeeWorkload
+from app.models.project import Project
+
+def _get(task, key, default=None):
+    if isinstance(task, dict):
+        return task.get(key, default)
+    return getattr(task, key, default)
+
+def project_contributions(project: Project) -> Dict[PydanticObjectId, Tuple[int, float]]:
+    """Open (not completed) task count and hours each assignee carries in this project"""
+    contributions: Dict[PydanticObjectId, Tuple[int, float]] = {}
+    for t in project.tasks:
+        assignee = _get(t, "assigned_to")
+        if not assignee or _get(t, "status") == "completed":
+            continue
+        assignee = PydanticObjectId(assignee)
+        count, hours = contributions.get(assignee, (0, 0.0))
+        contributions[assignee] = (count + 1, hours + float(_get(t, "estimated_hours", 8) or 0))
+    return contributions
+
+def _replace_project_entry(project_id: PydanticObjectId, entry: List[dict], now: datetime) -> List[dict]:
+    """
+    Update pipeline swapping this project's entry in `projects` and re-deriving the totals.
+    Idempotent, so resyncing a project any number of times never drifts the counters.
+    """
+    return [
+        {"$set": {"projects": {"$concatArrays": [
+            {"$filter": {
+                "input": {"$ifNull": ["$projects", []]},
+                "as": "p",
+                "cond": {"$ne": ["$$p.project_id", project_id]}
+            }},
+            entry
+        ]}}},
+        {"$set": {
+            "active_tasks": {"$sum": "$projects.active_tasks"},
+            "open_hours": {"$sum": "$projects.open_hours"},
+            "project_ids": "$projects.project_id",
+            "updated_at": now
+        }}
+    ]
+
+async def sync_project_workload(project: Project, removed: bool = False):
+    """
+    Bring the workload index in line with one project's current tasks.
+    Touches only employees who carry work in the project now or did before: one indexed
+    lookup plus one bulk write, independent of portfolio size.
+    """
+    collection = get_collection(EmployeeWorkload)
+    contributions = {} if removed else project_contributions(project)
+
+    previous = await collection.find({"project_ids": project.id}, {"employee_id": 1}).to_list(length=None)
+    affected = set(contributions) | {PydanticObjectId(doc["employee_id"]) for doc in previous}
+    if not affected:
+        return
+
+    now = datetime.utcnow()
+    operations = []
+    for employee_id in affected:
+        entry = []
+        if employee_id in contributions:
+            count, hours = contributions[employee_id]
+            entry = [{"project_id": project.id, "active_tasks": count, "open_hours": hours}]
+        operations.append(UpdateOne(
+            {"employee_id": employee_id},
+            _replace_project_entry(project.id, entry, now),
+            upsert=True
+        ))
+    await collection.bulk_write(operations, ordered=False)
+
+async def get_workloads(employee_ids: Iterable) -> Dict[str, EmployeeWorkload]:
+    """O(1)-per-employee lookup of portfolio-wide load, keyed by employee id string"""
+    ids = [PydanticObjectId(e) for e in employee_ids]
+    if not ids:
+        return {}
+    docs = await EmployeeWorkload.find(In(EmployeeWorkload.employee_id, ids)).to_list()
+    return {str(doc.employee_id): doc for doc in docs}
+
+def portfolio_hours(workloads: Dict[str, EmployeeWorkload], project: Project) -> Dict[str, float]:
+    """
+    Each assignee's open hours across all projects, with this project's (possibly not yet
+    synced) contribution taken from the in-memory tasks rather than the index.
+    """
+    current = {str(eid): hours for eid, (_, hours) in project_contributions(project).items()}
+    totals = {}
+    for eid in set(current) | set(workloads):
+        workload = workloads.get(eid)
+        other = 0.0
+        if workload:
+            this_project = next((p.open_hours for p in workload.projects if p.project_id == project.id), 0.0)
+            other = workload.open_hours - this_project
+        totals[eid] = other + current.get(eid, 0.0)
+    return totals
@@ -1,12 +1,20 @@
+from typing import Any, Awaitable, Callable, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from app.models.user import User
-from app.models.employee import EmployeeProfile, Skill
-from app.models.project import Project
-from app.models.notification import Notification
+from app.models.employee import EmployeeProfile, Skill, EmployeeWorkload
+from app.models.project import Project, ReplanApplication, PlanCache
+from app.models.notification import Notification, ArchivedNotification
+from app.models.match import MatchRun, RosterVersion, PlanHandoff, BriefingCache
+from app.models.job import Job
+from app.models.ratelimit import RateLimitBucket
 from app.core.config import settings
 
+client: Optional[AsyncIOMotorClient] = None
+_transactions_supported: Optional[bool] = None
+
 async def init_db():
+    global client
     client = AsyncIOMotorClient(settings.MONGODB_URL)
     await init_beanie(
         database=client[settings.DATABASE_NAME],
@@ -14,7 +22,43 @@ async def init_db():
             User,
             EmployeeProfile,
             Skill,
+            EmployeeWorkload,
             Project,
-            Notification
+            ReplanApplication,
+            PlanCache,
+            Notification,
+            ArchivedNotification,
+            MatchRun,
+            RosterVersion,
+            PlanHandoff,
+            BriefingCache,
+            Job,
+            RateLimitBucket
         ]
     )
+
+def get_collection(document_model):
+    """Raw driver collection for a Beanie model (bulk writes, aggregations, index admin)"""
+    getter = getattr(document_model, "get_pymongo_collection", None) or document_model.get_motor_collection
+    return getter()
+
+async def transactions_supported() -> bool:
+    """Multi-document transactions need a replica set or sharded cluster, not a standalone mongod"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        if not _transactions_supported:
+            print("DB: standalone MongoDB detected, multi-document writes run without transactions")
+    return _transactions_supported
+
+async def run_in_transaction(callback: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Run `callback(session)` inside a transaction (retried by the driver on transient errors).
+    On a standalone server it runs once with session=None, so callers must order their
+    writes to be safe without atomicity.
+    """
+    if not await transactions_supported():
+        return await callback(None)
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
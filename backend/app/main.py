@@ -1,7 +1,15 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, employees, projects, notifications
+from app.api import auth, employees, projects, notifications, jobs
 from app.db.database import init_db
+from app.core.scheduler import scheduler
+from app.core import background
+from app.core.config import settings
+from app.core import metrics
+from app.core.jobs import job_queue
+from app.core.retention import ensure_notification_ttl_index
+from app.core import sweeper # noqa: F401  (registers the deadline/health sweep)
 
 app = FastAPI(
     title="Nexo – Autonomous AI Agent Manager API",
@@ -16,17 +24,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Match-Run-Status", "X-Plan-Handoff-Token", "X-Degraded", "Retry-After"],
 )
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    await ensure_notification_ttl_index()
+    scheduler.start()
+    job_queue.start(settings.JOB_WORKERS)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    await job_queue.stop()
+    await background.shutdown()
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(employees.router, prefix="/employees", tags=["Employee"])
 app.include_router(projects.router, prefix="/projects", tags=["Project"])
 app.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
 
 @app.get("/")
 async def root():
@@ -35,3 +54,8 @@ async def root():
         "docs": "/docs",
         "status": "operational"
     }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text format; values are for this process only"""
+    return metrics.render()
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, List
-from beanie import Document, Link, PydanticObjectId
+from beanie import Document, Indexed, Link, PydanticObjectId
 from pydantic import Field, BaseModel, ConfigDict
 from enum import Enum
 
@@ -28,6 +28,29 @@ class EmployeeProfile(Document):
     class Settings:
         name = "user_profiles"
 
+class ProjectLoad(BaseModel):
+    project_id: PydanticObjectId
+    active_tasks: int = 0
+    open_hours: float = 0.0
+
+class EmployeeWorkload(Document):
+    """
+    Open work per employee across all projects, maintained by app/core/workload.py
+    whenever a project's tasks or assignments change. Totals are derived from `projects`.
+    """
+    employee_id: Indexed(PydanticObjectId, unique=True)
+    active_tasks: int = 0
+    open_hours: float = 0.0
+    projects: List[ProjectLoad] = []
+    project_ids: List[PydanticObjectId] = [] # Which projects contribute, for resyncs
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "employee_workloads"
+        indexes = [
+            "project_ids"
+        ]
+
 # For API responses and requests
 class SkillCreate(BaseModel):
     model_config = ConfigDict(extra='forbid')
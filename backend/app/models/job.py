@@ -0,0 +1,49 @@
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from datetime import datetime
+from typing import Any, Optional
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Job(Document):
+    """
+    Queued agent work (app/core/jobs.py). Workers claim the highest-priority due job with an
+    atomic update and hold it under a lease; a job whose lease runs out (worker crashed or
+    hung) becomes claimable again until `max_attempts` is used up.
+    """
+    kind: str # Registered handler name, e.g. "plan", "match"
+    payload: dict = {}
+    priority: int = 5 # Higher runs first
+    status: str = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime = Field(default_factory=datetime.utcnow) # Retry backoff
+    lease_expires_at: Optional[datetime] = None
+    worker_id: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_by: Optional[PydanticObjectId] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None # Set when finished; TTL removes old jobs
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            # Claim scan: queued jobs by priority, oldest first, that are due (equality, sort, range)
+            IndexModel(
+                [("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING), ("run_after", ASCENDING)],
+                name="job_claim"
+            ),
+            # Lease recovery: running jobs whose worker stopped renewing
+            IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="job_lease"),
+            IndexModel([("created_by", ASCENDING), ("created_at", DESCENDING)], name="job_owner"),
+            IndexModel([("expires_at", ASCENDING)], name="job_ttl", expireAfterSeconds=0)
+        ]
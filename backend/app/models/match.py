@@ -0,0 +1,76 @@
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from datetime import datetime
+from typing import List
+
+class RosterVersion(Document):
+    """
+    Monotonic counter bumped whenever the matchable roster changes (signups, profile or
+    skill edits). Match runs record the version they were computed against.
+    """
+    name: Indexed(str, unique=True)
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "roster_versions"
+
+class MatchRun(Document):
+    """
+    Persisted result of GET /projects/{id}/match. Valid while `fingerprint` (project
+    requirements, task pool and roster version) still matches the live project.
+    """
+    project_id: PydanticObjectId
+    version: int = 1 # Per-project run counter
+    fingerprint: str
+    roster_version: int = 0
+    matches: List[dict] = [] # Response body as served
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "match_runs"
+        indexes = [
+            IndexModel([("project_id", ASCENDING), ("version", DESCENDING)], name="project_runs", unique=True)
+        ]
+
+class PlanHandoff(Document):
+    """
+    Plan and matches computed by /projects/match-preview for an unsaved draft, claimable
+    once by create_project via `token`. Expired handoffs are removed by a TTL index.
+    """
+    token: Indexed(str, unique=True)
+    created_by: PydanticObjectId
+    draft_fingerprint: str # Requirements the plan was made for; a changed draft can't claim it
+    roster_version: int = 0
+    planned: bool = True # False when the planner failed and tasks are the placeholder
+    tasks: List[dict] = []
+    matches: List[dict] = []
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "plan_handoffs"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], name="handoff_ttl", expireAfterSeconds=0)
+        ]
+
+
+class BriefingCache(Document):
+    """
+    Task briefing (`suggested_description`) written for one project's task and one skill set,
+    keyed by their fingerprint so re-matches reuse it for anyone with the same skills on the
+    same task of the same project.
+    Expired entries are removed by a TTL index.
+    """
+    fingerprint: Indexed(str, unique=True)
+    task_title: str
+    briefing: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "briefing_cache"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], name="briefing_cache_ttl", expireAfterSeconds=0)
+        ]
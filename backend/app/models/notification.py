@@ -1,5 +1,6 @@
 from beanie import Document, PydanticObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime
 from typing import Optional
 
@@ -10,6 +11,8 @@ class NotificationType:
     DEADLINE_APPROACHING = "deadline_approaching"
     REPLANNING_APPLIED = "replanning_applied"
     DEADLINE_EXTENDED = "deadline_extended"
+    HEALTH_ALERT = "health_alert"
+    TASK_REROUTED = "task_rerouted"
 
 class Notification(Document):
     """
@@ -22,14 +25,50 @@ class Notification(Document):
     title: str
     message: str
     read: bool = False
-    created_at: datetime = datetime.utcnow()
-    
+    read_at: Optional[datetime] = None # Drives the TTL index (see app/core/retention.py)
+    dedupe_key: Optional[str] = None # Set by automated alerts so a sweep never repeats itself
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
     class Settings:
         name = "notifications"
         indexes = [
             "employee_id",
             "read",
-            "created_at"
+            "created_at",
+            # Serves the inbox queries: by employee, optionally unread only, newest first
+            IndexModel(
+                [("employee_id", ASCENDING), ("read", ASCENDING), ("created_at", DESCENDING)],
+                name="employee_inbox"
+            ),
+            IndexModel(
+                [("dedupe_key", ASCENDING)],
+                name="alert_dedupe",
+                unique=True,
+                partialFilterExpression={"dedupe_key": {"$type": "string"}}
+            )
+        ]
+
+class ArchivedNotification(Document):
+    """
+    Unread notifications moved out of the live collection by the retention job.
+    Kept for audit; never served by the inbox endpoints.
+    """
+    employee_id: PydanticObjectId
+    project_id: Optional[PydanticObjectId] = None
+    task_title: Optional[str] = None
+    notification_type: str
+    title: str
+    message: str
+    read: bool = False
+    read_at: Optional[datetime] = None
+    dedupe_key: Optional[str] = None
+    created_at: datetime
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "notifications_archive"
+        indexes = [
+            IndexModel([("employee_id", ASCENDING), ("created_at", DESCENDING)], name="employee_history")
         ]
 
 class NotificationCreate(BaseModel):
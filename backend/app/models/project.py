@@ -1,7 +1,9 @@
 from datetime import datetime
+from uuid import uuid4
 from typing import List, Optional
-from beanie import Document, PydanticObjectId
-from pydantic import Field, BaseModel, ConfigDict
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import Field, BaseModel, ConfigDict, TypeAdapter, field_validator
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from enum import Enum
 from app.models.employee import SkillLevel
 
@@ -15,7 +17,11 @@ class RequiredSkill(BaseModel):
     skill_name: str
     level: SkillLevel
 
+def _task_key() -> str:
+    return uuid4().hex[:12]
+
 class ProjectTask(BaseModel):
+    key: str = Field(default_factory=_task_key) # Stable identity; titles can change between plans
     title: str
     description: str
     estimated_hours: float = 8.0
@@ -24,7 +30,16 @@ class ProjectTask(BaseModel):
     deadline: Optional[str] = "TBD"
     assigned_to: Optional[PydanticObjectId] = None
     status: str = "backlog" # backlog, in_progress, completed
+    due_at: Optional[datetime] = None # `deadline` resolved against the project's plan_start
+    depends_on: List[str] = [] # Keys of tasks that must finish before this one starts
 
+class HealthSnapshot(BaseModel):
+    """Health evaluation persisted on the project when its tasks or deadline change"""
+    health: str # stable | warning | critical | overdue
+    issues: List[str] = []
+    metrics: dict = {}
+    computed_at: datetime
+    valid_until: datetime # Date-dependent metrics must be recomputed after this
 
 class Project(Document):
     title: str
@@ -36,15 +51,26 @@ class Project(Document):
     tasks: List[ProjectTask] = []
     assigned_team: List[PydanticObjectId] = []
     deadline: Optional[str] = None
+    deadline_at: Optional[datetime] = None # Parsed `deadline` (naive UTC), set on every write
+    plan_start: Optional[datetime] = None # When the current task list was generated; task due dates count from here
 
     optimization_cycles: int = 0
     optimization_history: List[dict] = [] # {"date": datetime, "reason": str, "changes_summary": str}
 
+    health_snapshot: Optional[HealthSnapshot] = None
+    schedule: Optional[dict] = None # Cached critical-path schedule (app/core/schedule.py)
+
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "projects"
+        indexes = [
+            # Deadline sweeps: active projects due within a window
+            IndexModel([("status", ASCENDING), ("deadline_at", ASCENDING)], name="status_deadline"),
+            # "Due soon" lookups per assignee
+            IndexModel([("tasks.assigned_to", ASCENDING), ("tasks.due_at", ASCENDING)], name="task_due")
+        ]
 
 class ProjectCreate(BaseModel):
     model_config = ConfigDict(extra='forbid')
@@ -58,6 +84,7 @@ class ProjectCreate(BaseModel):
     tasks: Optional[List[ProjectTask]] = []
     assigned_team: Optional[List[PydanticObjectId]] = []
     deadline: Optional[str] = None
+    handoff_token: Optional[str] = None # From /projects/match-preview (X-Plan-Handoff-Token); not stored
 
 
 class ProjectUpdate(BaseModel):
@@ -73,3 +100,77 @@ class ProjectUpdate(BaseModel):
     assigned_team: Optional[List[PydanticObjectId]] = None
     deadline: Optional[str] = None
 
+# Task fields a replan may change; status, assignee (see TaskMove) and due_at are not patchable
+TASK_PATCH_FIELDS = ("title", "description", "estimated_hours", "required_skills", "priority", "deadline", "depends_on")
+
+class TaskChange(BaseModel):
+    key: str
+    fields: dict # Only the fields that differ, with their proposed values
+
+    @field_validator("fields")
+    @classmethod
+    def _patchable_fields(cls, fields: dict) -> dict:
+        """Patches come back from the client: only allow-listed fields, typed as on ProjectTask"""
+        unknown = set(fields) - set(TASK_PATCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Fields not patchable: {', '.join(sorted(unknown))}")
+        return {
+            name: TypeAdapter(ProjectTask.model_fields[name].annotation).validate_python(value)
+            for name, value in fields.items()
+        }
+
+class TaskMove(BaseModel):
+    key: str
+    from_employee: Optional[PydanticObjectId] = None
+    to_employee: PydanticObjectId
+
+class ReplanPatch(BaseModel):
+    """Compact difference between a project's task list and a replan proposal (app/core/replan.py)"""
+    base_updated_at: Optional[datetime] = None # Project.updated_at the patch was computed against
+    added: List[ProjectTask] = []
+    removed: List[str] = [] # Task keys
+    changed: List[TaskChange] = []
+    moves: List[TaskMove] = []
+    order: List[str] = [] # Final task order, by key
+    unchanged: int = 0
+
+class ReplanApplication(Document):
+    """
+    One applied replan: the patch, its outcome, and the client's Idempotency-Key.
+    Written in the same transaction as the project update, so a retried request finds
+    it and gets the stored result instead of applying the patch twice.
+    """
+    project_id: PydanticObjectId
+    idempotency_key: str
+    patch: dict
+    result: dict
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "replan_applications"
+        indexes = [
+            IndexModel(
+                [("project_id", ASCENDING), ("idempotency_key", ASCENDING)],
+                name="replan_idempotency",
+                unique=True
+            ),
+            IndexModel([("project_id", ASCENDING), ("created_at", DESCENDING)], name="replan_history")
+        ]
+
+class PlanCache(Document):
+    """
+    Planner output cached per plan fingerprint (the exact planner inputs), filled on demand
+    or speculatively in the background (app/core/planning.py). Expired entries are removed
+    by a TTL index.
+    """
+    fingerprint: Indexed(str, unique=True)
+    plan: dict
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "plan_cache"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], name="plan_cache_ttl", expireAfterSeconds=0)
+        ]
+
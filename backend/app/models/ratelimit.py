@@ -0,0 +1,18 @@
+from beanie import Document, Indexed
+from pydantic import Field
+from datetime import datetime
+
+class RateLimitBucket(Document):
+    """
+    Shared token buckets for one LLM provider (LLM_RATE_LIMIT_BACKEND=mongo). Every API and
+    worker process takes from the same document with a single atomic pipeline update that
+    refills by elapsed server time ($$NOW), so the quota holds across processes.
+    """
+    key: Indexed(str, unique=True) # Provider name
+    requests: float = 0 # Request allowance left
+    tokens: float = 0 # Token allowance left
+    granted: bool = False # Outcome of the last take
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "rate_limit_buckets"
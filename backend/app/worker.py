@@ -0,0 +1,20 @@
+"""
+Standalone job worker: `python -m app.worker [workers]`.
+Claims from the same Mongo queue as the in-process workers, so agent throughput can be
+scaled separately from the API (set JOB_WORKERS=0 on the API to run no workers there).
+"""
+import asyncio
+import sys
+from app.core.config import settings
+from app.core.jobs import job_queue
+from app.db.database import init_db
+from app.api import projects # noqa: F401  (registers the agent job handlers)
+
+async def main(workers: int):
+    await init_db()
+    print(f"WORKER: starting {workers} job workers for {sorted(job_queue.handlers)}")
+    await job_queue.serve(workers)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else max(1, settings.JOB_WORKERS)
+    asyncio.run(main(count))
@@ -154,11 +154,12 @@ const NeuralMappingPage = () => {
         fetchProjectDetails(projectId);
     }, [projectId, fetchProjectDetails]);
 
-    const handleDecompose = async () => {
+    // refresh=true (the agent button) asks for a new plan; the auto-trigger accepts the cached one
+    const handleDecompose = async (refresh = false) => {
         setIsDecomposing(true);
         setError(null);
         try {
-            const response = await fetch(`${API_BASE_URL}/projects/${projectId}/decompose`, {
+            const response = await fetch(`${API_BASE_URL}/projects/${projectId}/decompose${refresh ? '?refresh=true' : ''}`, {
                 method: 'POST',
                 headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` }
             });
@@ -500,7 +501,7 @@ const NeuralMappingPage = () => {
                                 <div className="h-full flex flex-col items-center justify-center text-center">
                                     <p className="text-xs text-slate-500 mb-4">No tasks generated. Use the Decomposition Agent to start.</p>
                                     <button
-                                        onClick={handleDecompose}
+                                        onClick={() => handleDecompose(true)}
                                         disabled={isDecomposing}
                                         className="px-6 py-2 bg-primary/20 text-primary border border-primary/30 rounded-lg text-xs font-bold hover:bg-primary/30 transition-all flex items-center gap-2"
                                     >
@@ -19,6 +19,7 @@ const ProjectDetailsPage = () => {
         { id: 3, type: 'milestone', title: 'MILESTONE REACHED', desc: 'Core Architecture mapping completed for Node Segment Alpha.', time: '11:15:00 UTC' }
     ]);
     const [healthData, setHealthData] = React.useState({ health: 'stable', issues: [], metrics: {} });
+    const [forecastData, setForecastData] = React.useState(null);
     const [simulationData, setSimulationData] = React.useState(null);
     const [isSimulating, setIsSimulating] = React.useState(false);
     const [isApplying, setIsApplying] = React.useState(false);
@@ -57,6 +58,7 @@ const ProjectDetailsPage = () => {
                 setProjectData(data.project);
                 setTeam(data.team);
                 fetchHealth();
+                fetchForecast();
             }
         } catch (error) {
             console.error('Error fetching project details:', error);
@@ -79,6 +81,20 @@ const ProjectDetailsPage = () => {
         }
     };
 
+    const fetchForecast = async () => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/projects/${projectId}/forecast`, {
+                headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` }
+            });
+            if (response.ok) {
+                const data = await response.json();
+                setForecastData(data);
+            }
+        } catch (error) {
+            console.error('Error fetching forecast:', error);
+        }
+    };
+
     const handleSimulateReplan = async () => {
         setIsSimulating(true);
         try {
@@ -88,7 +104,8 @@ const ProjectDetailsPage = () => {
             });
             if (response.ok) {
                 const data = await response.json();
-                setSimulationData(data);
+                // One key per simulation, so a retried apply is not applied twice
+                setSimulationData({ ...data, idempotencyKey: crypto.randomUUID() });
                 setShowSimulation(true);
             }
         } catch (error) {
@@ -141,12 +158,12 @@ const ProjectDetailsPage = () => {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${localStorage.getItem('token')}`
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`,
+                    'Idempotency-Key': dataToApply.idempotencyKey
                 },
-                body: JSON.stringify({
-                    tasks: dataToApply.proposed_tasks,
-                    assignments: dataToApply.proposed_assignments
-                })
+                body: JSON.stringify(dataToApply.patch
+                    ? { patch: dataToApply.patch }
+                    : { tasks: dataToApply.proposed_tasks, assignments: dataToApply.proposed_assignments })
             });
             if (response.ok) {
                 const result = await response.json();
@@ -465,6 +482,25 @@ const ProjectDetailsPage = () => {
                                         <div className="text-2xl font-black text-white">{healthData.metrics?.max_load || 0}</div>
                                         <div className="text-[10px] text-slate-500 uppercase tracking-widest font-bold">Max Load</div>
                                     </div>
+                                    {forecastData?.percentiles && (
+                                        <>
+                                            <div className="w-px h-12 bg-white/10"></div>
+                                            <div className="text-center">
+                                                <div className="text-2xl font-black text-white">
+                                                    {new Date(forecastData.percentiles.p80.date).toLocaleDateString()}
+                                                </div>
+                                                <div className="text-[10px] text-slate-500 uppercase tracking-widest font-bold">P80 Finish</div>
+                                                <div className="text-[9px] text-slate-600 mt-0.5">
+                                                    P50 {new Date(forecastData.percentiles.p50.date).toLocaleDateString()} · P95 {new Date(forecastData.percentiles.p95.date).toLocaleDateString()}
+                                                </div>
+                                                {forecastData.on_time_probability !== null && (
+                                                    <div className="text-[9px] text-slate-600">
+                                                        On time: {Math.round(forecastData.on_time_probability * 100)}%
+                                                    </div>
+                                                )}
+                                            </div>
+                                        </>
+                                    )}
 
                                     {/* Action Buttons */}
                                     {(healthData.health === 'critical' || healthData.health === 'warning' || healthData.health === 'overdue') && (
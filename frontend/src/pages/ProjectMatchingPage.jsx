@@ -25,6 +25,7 @@ const ProjectMatchingPage = () => {
     const [isMatching, setIsMatching] = useState(false);
     const [lockedIds, setLockedIds] = useState([]); // User manually selected/locked IDs
     const [projectId, setProjectId] = useState(null);
+    const [handoffToken, setHandoffToken] = useState(null); // Lets project creation reuse the preview's plan
 
 
     const fetchEmployees = React.useCallback(async () => {
@@ -58,6 +59,7 @@ const ProjectMatchingPage = () => {
             required_skills: skills.map(s => ({ skill_name: s, level: 'mid' })),
             experience_required: parseFloat(experienceRequired),
             team_size: parseInt(teamSize),
+            deadline: deadline || null,
             assigned_team: []
         };
 
@@ -77,6 +79,7 @@ const ProjectMatchingPage = () => {
             if (response.ok) {
                 const matches = await response.json();
                 console.log('✅ Received match results:', matches);
+                setHandoffToken(response.headers.get('X-Plan-Handoff-Token'));
 
                 // Merge matches into the full employee list
                 setEmployees(prevEmployees => {
@@ -124,7 +127,7 @@ const ProjectMatchingPage = () => {
         } finally {
             setIsMatching(false);
         }
-    }, [title, description, skills, experienceRequired, teamSize]);
+    }, [title, description, skills, experienceRequired, teamSize, deadline]);
 
     // Handle manual toggle
     const handleToggleEmployee = (empid) => {
@@ -282,7 +285,8 @@ const ProjectMatchingPage = () => {
                 team_size: parseInt(teamSize),
                 status: 'draft',
                 deadline: deadline,
-                assigned_team: selectedIds
+                assigned_team: selectedIds,
+                ...(!projectId && handoffToken ? { handoff_token: handoffToken } : {})
             };
 
             const url = projectId ? `${API_BASE_URL}/projects/${projectId}` : `${API_BASE_URL}/projects/`;